@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import openai
+import image_summarizer
+from openai_client import get_client
+from response_cache import get_cache, cache_key, is_complete
+from telemetry import get_telemetry
+from summary_hierarchy import read_summaries, group_summaries, build_prompt, summary_path, load_manifest, save_manifest, interval_fingerprint, HIERARCHY_LEVELS
+
+# Batch API input limits, kept slightly under the documented maximums
+BATCH_MAX_REQUESTS = 50000
+BATCH_MAX_BYTES = 190 * 1024 * 1024
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+FINISHED_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+# Function to build one line of a batch input file
+def make_request(custom_id, messages, model, max_tokens):
+    """Builds a Batch API request for one chat completion."""
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {"model": model, "messages": messages, "max_tokens": max_tokens},
+    }
+
+# Function to split requests into batch input files under the size limits
+def write_batch_files(requests, work_dir, prefix):
+    """Writes requests to one or more JSONL files, starting a new file before either batch limit is reached."""
+    os.makedirs(work_dir, exist_ok=True)
+    paths = []
+    f = None
+    count = size = 0
+
+    for request in requests:
+        line = (json.dumps(request) + "\n").encode("utf-8")
+        if f is None or count >= BATCH_MAX_REQUESTS or size + len(line) > BATCH_MAX_BYTES:
+            if f:
+                f.close()
+            paths.append(os.path.join(work_dir, f"{prefix}_batch_{len(paths)}.jsonl"))
+            f = open(paths[-1], "wb")
+            count = size = 0
+        f.write(line)
+        count += 1
+        size += len(line)
+
+    if f:
+        f.close()
+    return paths
+
+# Function to upload a batch input file and start the job
+def submit_batch(path):
+    """Uploads a JSONL file and creates a batch job for it. Returns the batch ID."""
+    with open(path, "rb") as f:
+        input_file = get_client().files.create(file=f, purpose="batch")
+
+    batch = get_client().batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h"
+    )
+    print(f"Submitted batch {batch.id} from {path}")
+    return batch.id
+
+# Function to wait for a set of batch jobs to finish
+def wait_for_batches(batch_ids, poll_seconds=60):
+    """Polls until every batch reaches a final status. Returns the final batch objects."""
+    pending = list(batch_ids)
+    finished = {}
+
+    while pending:
+        for batch_id in list(pending):
+            try:
+                batch = get_client().batches.retrieve(batch_id)
+            except openai.OpenAIError as e:
+                print(f"Error checking batch {batch_id}, will retry: {e}")
+                continue
+
+            counts = batch.request_counts
+            if counts:
+                print(f"Batch {batch_id}: {batch.status} ({counts.completed}/{counts.total} done, {counts.failed} failed)")
+            else:
+                print(f"Batch {batch_id}: {batch.status}")
+
+            if batch.status in FINISHED_STATUSES:
+                finished[batch_id] = batch
+                pending.remove(batch_id)
+
+        if pending:
+            time.sleep(poll_seconds)
+
+    return [finished[batch_id] for batch_id in batch_ids]
+
+# Function to collect the results of a finished batch
+def download_results(batch):
+    """Returns {custom_id: (summary text, finish_reason)} for a finished batch.
+
+    Failed requests get the error placeholder and a finish_reason of None.
+    """
+    results = {}
+    usage = {"prompt_tokens": 0, "completion_tokens": 0}
+    model = None
+
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in get_client().files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") == 200:
+                body = response["body"]
+                choice = body["choices"][0]
+                results[record["custom_id"]] = (choice["message"]["content"], choice.get("finish_reason"))
+                model = model or body.get("model")
+                for field in usage:
+                    usage[field] += (body.get("usage") or {}).get(field) or 0
+            else:
+                print(f"Batch request {record['custom_id']} failed: {record.get('error') or response.get('body')}")
+                results.setdefault(record["custom_id"], ("Error generating summary", None))
+
+    # One telemetry entry per batch job, timed from submission to completion
+    finished_at = batch.completed_at or batch.failed_at or batch.expired_at or batch.cancelled_at or time.time()
+    get_telemetry().record_api_call("batch", model, finished_at - batch.created_at, usage,
+                                    error=None if batch.status == "completed" else RuntimeError(batch.status))
+
+    if batch.status != "completed":
+        print(f"Batch {batch.id} ended with status '{batch.status}'")
+
+    return results
+
+# Function to run a list of requests through the Batch API
+def run_batch(requests, work_dir, prefix, poll_seconds=60):
+    """Submits requests as one or more batch jobs, waits for them and returns {custom_id: summary text}.
+
+    `requests` can be a generator: each request is written to its batch file as it is produced, so only one is in memory.
+    """
+    cache = get_cache()
+    keys = {}
+    results = {}
+
+    # Answer what we can from the response cache and only submit the rest
+    def uncached():
+        for request in requests:
+            key = keys[request["custom_id"]] = cache_key(request["body"]["model"], request["body"]["messages"], request["body"]["max_tokens"])
+            cached = cache.get(key)
+            image_summarizer.settle_payloads(request["body"]["messages"], sent=cached is None)
+            if cached is None:
+                yield request
+            else:
+                results[request["custom_id"]] = cached
+
+    paths = write_batch_files(uncached(), work_dir, prefix)
+    if not paths:
+        return results
+    print(f"Submitting {len(keys) - len(results)} request(s) in {len(paths)} batch(es), {len(results)} answered from cache...")
+
+    batch_ids = [submit_batch(path) for path in paths]
+    for batch in wait_for_batches(batch_ids, poll_seconds):
+        for custom_id, (summary, finish_reason) in download_results(batch).items():
+            results[custom_id] = summary
+            if is_complete(finish_reason, summary):
+                cache.put(keys[custom_id], summary)
+
+    missing = [custom_id for custom_id in keys if custom_id not in results]
+    if missing:
+        print(f"{len(missing)} request(s) returned no result.")
+    return results
+
+# Batch version of image_summarizer.process_images
+def batch_process_images(image_folder, poll_seconds=60):
+    """Summarizes every frame that doesn't have a summary yet through the Batch API. Returns the number that failed."""
+    output_folder = image_summarizer.get_output_folder(image_folder)
+    os.makedirs(output_folder, exist_ok=True)
+
+    image_files, duplicates = image_summarizer.get_image_files(image_folder)
+
+    # The custom_id is the frame's filename, so results map straight back to raw_summaries/<timestamp>.txt
+    pending = [f for f in image_files if not os.path.exists(os.path.join(output_folder, f"{os.path.splitext(f)[0]}.txt"))]
+    print(f"{len(pending)} frame(s) pending summarization.")
+
+    # A generator, so each frame's base64 payload is built, written to the batch file and dropped before the next
+    requests = (
+        make_request(img_file, image_summarizer.build_messages(os.path.join(image_folder, img_file)), image_summarizer.model_to_use, 150)
+        for img_file in pending
+    )
+    results = run_batch(requests, os.path.join(os.path.dirname(image_folder), "batches"), "images", poll_seconds)
+
+    # Failed frames are left without a summary file, so the next run submits them again
+    failed = 0
+    for img_file, summary in results.items():
+        if summary == "Error generating summary":
+            failed += 1
+            continue
+        image_summarizer.save_summary(output_folder, img_file, summary, duplicates)
+
+    if failed:
+        print(f"{failed} frame(s) failed and will be resubmitted next run.")
+    print(f"All summaries saved in '{output_folder}/'")
+    image_summarizer.report_payload_savings()
+    return failed
+
+# Batch version of summary_hierarchy.process_summaries, covering the same level for many days at once
+def batch_process_summaries(folder_pairs, interval_minutes, summary_type, work_dir, poll_seconds=60):
+    """Summarizes every changed interval group for a list of (input_folder, output_folder) pairs in one batch run."""
+    requests = []
+    outputs = {}
+    manifests = {}
+
+    for input_folder, output_folder in folder_pairs:
+        if not os.path.exists(input_folder):
+            print(f"Skipping missing folder: {input_folder}")
+            continue
+
+        timestamps, summaries = read_summaries(input_folder)
+        os.makedirs(output_folder, exist_ok=True)
+
+        # Intervals whose inputs are unchanged since the last run are left alone, as in process_summaries
+        old_manifest = load_manifest(output_folder)
+        manifest = manifests[output_folder] = {}
+
+        for start_time, group, group_timestamps in group_summaries(summaries, interval_minutes):
+            summary_filename = summary_path(output_folder, start_time)
+            output_name = os.path.basename(summary_filename)
+            fingerprint = interval_fingerprint(group, group_timestamps, summary_type)
+
+            if old_manifest.get(output_name) == fingerprint and os.path.exists(summary_filename):
+                manifest[output_name] = fingerprint
+                continue
+
+            # If there's exactly 1 summary in this group, just copy it (avoid unnecessary API calls)
+            if len(group) == 1:
+                with open(summary_filename, "w") as f:
+                    f.write(group[0])
+                manifest[output_name] = fingerprint
+                continue
+
+            custom_id = f"{summary_type}-{len(requests)}"
+            outputs[custom_id] = (output_folder, output_name, fingerprint)
+            prompt = build_prompt(group, group_timestamps, summary_type)
+            requests.append(make_request(custom_id, [{"role": "user", "content": prompt}], "gpt-4o-mini", 1000))
+
+        # Remove outputs for intervals that no longer exist
+        current = set(manifest) | {name for folder, name, _ in outputs.values() if folder == output_folder}
+        for output_name in old_manifest.keys() - current:
+            stale_path = os.path.join(output_folder, output_name)
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+
+    results = run_batch(requests, work_dir, summary_type, poll_seconds)
+
+    for custom_id, (output_folder, output_name, fingerprint) in outputs.items():
+        if custom_id in results:
+            summary_filename = os.path.join(output_folder, output_name)
+            with open(summary_filename, "w") as f:
+                f.write(results[custom_id])
+            print(f"Saved summarized text: {summary_filename}")
+            if results[custom_id] != "Error generating summary":
+                manifests[output_folder][output_name] = fingerprint
+
+    for output_folder, manifest in manifests.items():
+        save_manifest(output_folder, manifest)
+
+# Batch version of the whole summary_hierarchy pipeline: one batch run per level, spanning all days
+def batch_generate_hierarchy(main_directory, days, poll_seconds=60):
+    """Generates minute, ten-minute, hour and day summaries for all days, one batch run per level."""
+    work_dir = os.path.join(main_directory, "batches")
+
+    for input_name, output_name, interval_minutes, summary_type in HIERARCHY_LEVELS:
+        print(f"Generating {summary_type} summaries...")
+        folder_pairs = [(os.path.join(main_directory, day, input_name), os.path.join(main_directory, day, output_name)) for day in days]
+        batch_process_summaries(folder_pairs, interval_minutes, summary_type, work_dir, poll_seconds)
+
+    # Day summaries: one request per day over all of its hour summaries
+    print("Generating day summaries...")
+    day_summaries_dir = os.path.join(main_directory, "day_summaries")
+    os.makedirs(day_summaries_dir, exist_ok=True)
+
+    requests = []
+    for day in days:
+        hour_summaries = os.path.join(main_directory, day, "hour_summaries")
+        if not os.path.exists(hour_summaries):
+            print(f"No hour summaries found for {day}, skipping.")
+            continue
+
+        timestamps, summaries = read_summaries(hour_summaries)
+        if summaries:
+            prompt = build_prompt([text for _, text in summaries], timestamps, "day")
+            requests.append(make_request(day, [{"role": "user", "content": prompt}], "gpt-4o-mini", 1000))
+
+    for day, summary in run_batch(requests, work_dir, "day", poll_seconds).items():
+        summary_filename = os.path.join(day_summaries_dir, f"{day}.txt")
+        with open(summary_filename, "w") as f:
+            f.write(summary)
+        print(f"Day summary saved: {summary_filename}")
+
+    print("Summarization pipeline completed!")
+
+# Run the script
+if __name__ == "__main__":
+    main_directory = "/Users/keeganh/Documents"
+    days_to_process = ["Monday"]  # Days to process
+
+    for day in days_to_process:
+        batch_process_images(os.path.join(main_directory, day, "extracted_frames"))
+
+    batch_generate_hierarchy(main_directory, days_to_process)
+    get_telemetry().report()
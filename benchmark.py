@@ -0,0 +1,501 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+import numpy as np
+from datetime import datetime
+from email.parser import BytesParser
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Synthetic workload: one day folder holding DURATION_MINUTES of video, sampled every INTERVAL_SECONDS
+BENCH_DAY = "BenchDay"
+DURATION_MINUTES = 120
+VIDEO_FPS = 2
+VIDEO_SIZE = (640, 360)
+INTERVAL_SECONDS = 30
+
+# Mock API behaviour
+MOCK_LATENCY_SECONDS = 0.05
+MOCK_RATE_LIMIT_FRACTION = 0.0  # Fraction of chat requests answered with a 429
+MOCK_JOB_POLLS = 3  # Fine-tuning jobs report "succeeded" after this many status checks
+
+RESULTS_FILE = "benchmark_results.json"
+
+# Function to write a synthetic screen-recording-like video
+def make_synthetic_video(path, duration_minutes=DURATION_MINUTES, fps=VIDEO_FPS, size=VIDEO_SIZE):
+    """Writes an MP4 of moving blocks and a running frame counter, changing enough that frames aren't identical."""
+    import cv2
+
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+    for i in range(int(duration_minutes * 60 * fps)):
+        frame = background.copy()
+        x = (i * 7) % (width - 80)
+        y = (i * 3) % (height - 60)
+        cv2.rectangle(frame, (x, y), (x + 80, y + 60), (i % 255, 255 - i % 255, 128), -1)
+        cv2.putText(frame, f"frame {i}", (10, height - 20), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        writer.write(frame)
+    writer.release()
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """Answers the chat, files, batches, uploads and fine-tuning endpoints the pipeline uses, after a fixed delay."""
+
+    latency = MOCK_LATENCY_SECONDS
+    rate_limit_fraction = MOCK_RATE_LIMIT_FRACTION
+    job_polls = MOCK_JOB_POLLS
+    stats = {"requests": 0, "rate_limited": 0}
+    lock = threading.Lock()
+    job_checks = {}
+    job_events = {}  # Creation time of each job event, oldest first
+    files = {}
+    batches = {}
+    uploads = {}
+    events_per_check = 1  # Job events added each time a job's status is checked
+    finish_reason = "stop"  # Set to "length" to answer as if every reply was cut off at max_tokens
+    failing_requests = set()  # Batch custom_ids answered with a server error instead of a completion
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        body = self.read_body()
+        with self.lock:
+            self.stats["requests"] += 1
+        time.sleep(self.latency)
+        path = self.path.split("?")[0].rstrip("/")
+        now = int(time.time())
+
+        if path.endswith("/chat/completions"):
+            if random.random() < self.rate_limit_fraction:
+                with self.lock:
+                    self.stats["rate_limited"] += 1
+                self.send_json({"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                               status=429, headers={"Retry-After": "0.2"})
+                return
+            self.send_json(self.chat_completion(json.loads(body)))
+        elif path.endswith("/files"):
+            content = self.read_multipart_file(body)
+            with self.lock:
+                file_id = f"file-{len(self.files)}"
+                self.files[file_id] = content
+            self.send_json(self.file(file_id, len(content)))
+        elif path.endswith("/batches"):
+            request = json.loads(body)
+            with self.lock:
+                batch_id = f"batch_{len(self.batches)}"
+                self.batches[batch_id] = {"input_file_id": request["input_file_id"], "checks": 0, "created_at": int(time.time())}
+            self.send_json(self.batch(batch_id))
+        elif path.endswith("/uploads"):
+            with self.lock:
+                upload_id = f"upload_{len(self.uploads)}"
+                self.uploads[upload_id] = {"status": "pending", "parts": [], "created_at": now}
+            self.send_json(self.upload(upload_id))
+        elif "/uploads/" in path:
+            upload_id, action = path.split("/")[-2:]
+            upload = self.uploads.get(upload_id)
+            if upload is None or upload["status"] != "pending":
+                # Parts can only be added to, and only completed or cancelled from, a pending upload
+                self.send_json({"error": {"message": f"Upload {upload_id} is not pending", "type": "invalid_request_error"}}, status=400)
+                return
+            if action == "parts":
+                with self.lock:
+                    part_id = f"part_{upload_id}_{len(upload['parts'])}"
+                    upload["parts"].append(part_id)
+                self.send_json({"id": part_id, "object": "upload.part", "created_at": now, "upload_id": upload_id})
+            elif action == "complete":
+                with self.lock:
+                    upload["status"] = "completed"
+                    upload["completed_parts"] = json.loads(body)["part_ids"]
+                    file_id = f"file-{len(self.files)}"
+                    self.files[file_id] = b""
+                self.send_json({**self.upload(upload_id), "file": self.file(file_id, 0)})
+            else:
+                upload["status"] = "cancelled"
+                self.send_json(self.upload(upload_id))
+        elif path.endswith("/fine_tuning/jobs"):
+            with self.lock:
+                job_id = f"ftjob-{len(self.job_checks)}"
+                self.job_checks[job_id] = 0
+            self.send_json(self.job(job_id, "validating_files"))
+        else:
+            self.send_json({"error": {"message": f"Unknown endpoint {path}"}}, status=404)
+
+    def do_GET(self):
+        with self.lock:
+            self.stats["requests"] += 1
+        time.sleep(self.latency)
+        path = self.path.split("?")[0].rstrip("/")
+        now = int(time.time())
+
+        if path.startswith("/v1/files/") and path.endswith("/content"):
+            content = self.files.get(path.split("/")[-2])
+            if content is None:
+                self.send_json({"error": {"message": f"No such file {path}"}}, status=404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        elif "/batches/" in path:
+            batch_id = path.split("/")[-1]
+            with self.lock:
+                if batch_id in self.batches:
+                    self.batches[batch_id]["checks"] += 1
+            if batch_id not in self.batches:
+                self.send_json({"error": {"message": f"No such batch {batch_id}"}}, status=404)
+                return
+            self.send_json(self.batch(batch_id))
+        elif "/fine_tuning/jobs/" in path and path.endswith("/events"):
+            # Newest first, paged with `limit` and an `after` cursor like the real endpoint
+            job_id = path.split("/")[-2]
+            query = parse_qs(urlparse(self.path).query)
+            limit = int(query.get("limit", ["20"])[0])
+            created = self.job_events.get(job_id, [])
+            ids = [f"ftevent-{job_id}-{i}" for i in range(len(created) - 1, -1, -1)]
+            start = ids.index(query["after"][0]) + 1 if "after" in query else 0
+            events = [{"id": event_id, "object": "fine_tuning.job.event", "created_at": created[int(event_id.rsplit('-', 1)[1])],
+                       "level": "info", "message": f"Step {event_id.rsplit('-', 1)[1]}"} for event_id in ids[start:start + limit]]
+            self.send_json({"object": "list", "data": events, "has_more": start + limit < len(ids)})
+        elif "/fine_tuning/jobs/" in path:
+            job_id = path.split("/")[-1]
+            with self.lock:
+                self.job_checks[job_id] = self.job_checks.get(job_id, 0) + 1
+                self.job_events.setdefault(job_id, []).extend([now] * self.events_per_check)
+                checks = self.job_checks[job_id]
+            self.send_json(self.job(job_id, "succeeded" if checks >= self.job_polls else "running"))
+        else:
+            self.send_json({"error": {"message": f"Unknown endpoint {path}"}}, status=404)
+
+    def read_multipart_file(self, body):
+        """Returns the contents of the "file" field of a multipart/form-data upload."""
+        message = BytesParser().parsebytes(f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + body)
+        for part in message.get_payload() if message.is_multipart() else []:
+            if part.get_param("name", header="content-disposition") == "file":
+                return part.get_payload(decode=True)
+        return b""
+
+    def chat_completion(self, request):
+        prompt_tokens = len(json.dumps(request["messages"])) // 4
+        content = f"Keegan was working at his computer ({prompt_tokens} prompt tokens, request {self.stats['requests']})."
+        if (request.get("response_format") or {}).get("type") == "json_object":
+            # Multi-frame requests: one description per image, in the shape image_summarizer asks for
+            images = sum(1 for part in request["messages"][-1]["content"] if part.get("type") == "image_url")
+            content = json.dumps({"frames": [{"frame": i, "description": f"{content} Frame {i}."} for i in range(1, images + 1)]})
+        return {
+            "id": f"chatcmpl-{self.stats['requests']}", "object": "chat.completion", "created": int(time.time()), "model": request["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": self.finish_reason}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 20, "total_tokens": prompt_tokens + 20},
+        }
+
+    def file(self, file_id, size):
+        return {"id": file_id, "object": "file", "bytes": size, "created_at": int(time.time()),
+                "filename": "input.jsonl", "purpose": "fine-tune", "status": "processed"}
+
+    def batch(self, batch_id):
+        """Returns a batch, which completes after `job_polls` status checks by answering every request in its input file."""
+        with self.lock:
+            state = self.batches[batch_id]
+            requests = [json.loads(line) for line in self.files[state["input_file_id"]].splitlines() if line.strip()]
+            done = state["checks"] >= self.job_polls
+            if done and "output_file_id" not in state:
+                output = [{"id": f"batch_req_{i}", "custom_id": request["custom_id"], "error": None,
+                           "response": {"status_code": 500, "request_id": f"req_{i}", "body": {"error": {"message": "Server error"}}}
+                           if request["custom_id"] in self.failing_requests else
+                           {"status_code": 200, "request_id": f"req_{i}", "body": self.chat_completion(request["body"])}}
+                          for i, request in enumerate(requests)]
+                state["output_file_id"] = f"file-{len(self.files)}"
+                self.files[state["output_file_id"]] = "".join(json.dumps(record) + "\n" for record in output).encode("utf-8")
+                state["completed_at"] = int(time.time())
+
+        now = int(time.time())
+        return {"id": batch_id, "object": "batch", "endpoint": "/v1/chat/completions", "errors": None,
+                "input_file_id": state["input_file_id"], "completion_window": "24h", "status": "completed" if done else "in_progress",
+                "output_file_id": state.get("output_file_id"), "error_file_id": None, "created_at": state["created_at"],
+                "completed_at": state.get("completed_at"), "expires_at": now + 86400,
+                "request_counts": {"total": len(requests), "completed": len(requests) if done else 0, "failed": 0}}
+
+    def upload(self, upload_id):
+        upload = self.uploads[upload_id]
+        return {"id": upload_id, "object": "upload", "bytes": 0, "created_at": upload["created_at"], "filename": "training.jsonl",
+                "purpose": "fine-tune", "status": upload["status"], "expires_at": upload["created_at"] + 3600}
+
+    def job(self, job_id, status):
+        return {"id": job_id, "object": "fine_tuning.job", "created_at": int(time.time()), "model": "gpt-4o-mini-2024-07-18",
+                "status": status, "training_file": "file-bench", "fine_tuned_model": "ft:gpt-4o-mini:bench" if status == "succeeded" else None,
+                "hyperparameters": {"n_epochs": 3}, "organization_id": "org-bench", "result_files": [], "seed": 0}
+
+class MockServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops connections (and the client waits a second to retry) once many requests are in flight
+    request_queue_size = 256
+
+# Function to start the mock server on a free local port
+def start_mock_server(latency=MOCK_LATENCY_SECONDS, rate_limit_fraction=MOCK_RATE_LIMIT_FRACTION):
+    """Returns (server, base URL); the server runs on a daemon thread until shutdown() is called."""
+    MockOpenAIHandler.latency = latency
+    MockOpenAIHandler.rate_limit_fraction = rate_limit_fraction
+    server = MockServer(("127.0.0.1", 0), MockOpenAIHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+# Function to wrap a module-level function so every call's duration is recorded
+def timed(func, latencies):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return wrapper
+
+def timed_async(func, latencies):
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return wrapper
+
+def peak_rss_mb():
+    # On Linux ru_maxrss survives exec, so a spawned stage would report its parent's peak; VmHWM is per process
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+# Stage runners: each runs in a fresh process so peak RSS belongs to that stage alone.
+# They return (items, latencies in seconds, what one latency measures).
+def bench_extract_frames(day_dir, interval_seconds, mode):
+    import frame_extracter
+
+    latencies = []
+    frames_folder = os.path.join(day_dir, "extracted_frames")
+    os.makedirs(frames_folder, exist_ok=True)
+    for video in frame_extracter.get_sorted_videos(day_dir):
+        last = time.perf_counter()
+        for frame_timestamp, frame in frame_extracter.iter_frames(video, interval_seconds, mode):
+            frame_extracter.save_frame(frame, frames_folder, frame_timestamp)
+            now = time.perf_counter()
+            latencies.append(now - last)
+            last = now
+    return len(latencies), latencies, "frame"
+
+def bench_process_images(day_dir, frames_per_request=1):
+    import image_summarizer
+
+    latencies = []
+    image_summarizer.generate_summary = timed(image_summarizer.generate_summary, latencies)
+    image_summarizer.generate_summaries = timed(image_summarizer.generate_summaries, latencies)
+    image_summarizer.REQUEST_DELAY_SECONDS = 0
+    image_summarizer.FRAMES_PER_REQUEST = frames_per_request
+    image_summarizer.process_images(os.path.join(day_dir, "extracted_frames"))
+    return len(latencies), latencies, "request"
+
+def bench_process_images_async(day_dir, concurrency, frames_per_request=1):
+    import image_summarizer
+
+    latencies = []
+    image_summarizer.generate_summary_async = timed_async(image_summarizer.generate_summary_async, latencies)
+    image_summarizer.generate_summaries_async = timed_async(image_summarizer.generate_summaries_async, latencies)
+    image_summarizer.FRAMES_PER_REQUEST = frames_per_request
+    asyncio.run(image_summarizer.process_images_async(os.path.join(day_dir, "extracted_frames"), concurrency=concurrency))
+    return len(latencies), latencies, "request"
+
+def bench_process_summaries(main_directory, day):
+    import summary_hierarchy
+
+    latencies = []
+    summary_hierarchy.summarize_text = timed(summary_hierarchy.summarize_text, latencies)
+    summary_hierarchy.generate_minute_summaries(main_directory, [day])
+    summary_hierarchy.generate_ten_minute_summaries(main_directory, [day])
+    summary_hierarchy.generate_hour_summaries(main_directory, [day])
+    summary_hierarchy.generate_day_summaries(main_directory, [day])
+    return len(latencies), latencies, "request"
+
+def bench_generate_jsonl(main_directory, day, output_path):
+    import generate_jsonl
+
+    latencies = []
+    generate_jsonl.main_directory = main_directory
+    generate_jsonl.days_to_process = [day]
+    generate_jsonl.extract_summaries = timed(generate_jsonl.extract_summaries, latencies)
+    all_data = (generate_jsonl.extract_ten_minute_summaries() + generate_jsonl.extract_hourly_summaries()
+                + generate_jsonl.extract_daily_summaries() + generate_jsonl.extract_minute_summaries())
+    generate_jsonl.save_jsonl(all_data, output_path)
+    return len(all_data), latencies, "summary folder"
+
+def bench_fine_tune(training_path, log_path):
+    import fine_tune
+
+    latencies = []
+    fine_tune.LOG_FILE = log_path
+    fine_tune.MIN_POLL_SECONDS = 0.01
+    fine_tune.MAX_POLL_SECONDS = 0.05
+    file_id = timed(fine_tune.upload_training_file, latencies)(training_path)
+    job_id = timed(fine_tune.start_fine_tuning, latencies)(file_id) if file_id else None
+    if job_id:
+        timed(fine_tune.check_fine_tuning_status, latencies)(job_id)
+    with open(training_path, "r") as f:
+        examples = sum(1 for line in f if line.strip())
+    return examples, latencies, "upload / start / monitor"
+
+def run_stage(func, *args):
+    start = time.perf_counter()
+    items, latencies, latency_of = func(*args)
+    return {"items": items, "seconds": time.perf_counter() - start, "latencies": latencies,
+            "latency_of": latency_of, "peak_rss_mb": peak_rss_mb()}
+
+# Function to turn one stage's raw timings into the reported metrics
+def summarize_stage(raw):
+    latencies = np.array(raw["latencies"]) * 1000
+    return {
+        "items": raw["items"],
+        "seconds": round(raw["seconds"], 3),
+        "items_per_sec": round(raw["items"] / raw["seconds"], 3) if raw["seconds"] else None,
+        "latency_of": raw["latency_of"],
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None,
+        "peak_rss_mb": round(raw["peak_rss_mb"], 1),
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Function to run every stage against the synthetic day and the mock server
+def run_benchmark(work_dir, duration_minutes=DURATION_MINUTES, interval_seconds=INTERVAL_SECONDS, mode="sequential",
+                  latency=MOCK_LATENCY_SECONDS, rate_limit_fraction=MOCK_RATE_LIMIT_FRACTION, concurrency=16, frames_per_request=1):
+    """Runs extract -> describe -> summarize -> dataset -> fine-tune on synthetic data and returns the results dict."""
+    day_dir = os.path.join(work_dir, BENCH_DAY)
+    os.makedirs(day_dir, exist_ok=True)
+
+    print(f"Writing {duration_minutes} minutes of synthetic video...")
+    make_synthetic_video(os.path.join(day_dir, "synthetic.mp4"), duration_minutes)
+
+    server, base_url = start_mock_server(latency, rate_limit_fraction)
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_KEY"] = "mock"
+    # Keep the stages' video catalog and telemetry out of the user's ~/.cache (both are read when the modules are imported)
+    os.environ["KEEGANGPT_CATALOG"] = os.path.join(work_dir, "video_catalog.sqlite")
+    os.environ["KEEGANGPT_TELEMETRY"] = os.path.join(work_dir, "telemetry.jsonl")
+    training_path = os.path.join(work_dir, "training.jsonl")
+
+    stages = [
+        ("extract_frames", bench_extract_frames, (day_dir, interval_seconds, mode)),
+        ("process_images", bench_process_images, (day_dir, frames_per_request)),
+        ("process_images_async", bench_process_images_async, (day_dir, concurrency, frames_per_request)),
+        ("process_summaries", bench_process_summaries, (work_dir, BENCH_DAY)),
+        ("generate_jsonl", bench_generate_jsonl, (work_dir, BENCH_DAY, training_path)),
+        ("fine_tune", bench_fine_tune, (training_path, os.path.join(work_dir, "fine_tuning_log.txt"))),
+    ]
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {"duration_minutes": duration_minutes, "interval_seconds": interval_seconds, "mode": mode,
+                   "mock_latency_seconds": latency, "mock_rate_limit_fraction": rate_limit_fraction, "concurrency": concurrency,
+                   "frames_per_request": frames_per_request},
+        "stages": {},
+    }
+
+    try:
+        for name, func, args in stages:
+            # A fresh cache per stage so every request reaches the mock server
+            os.environ["KEEGANGPT_CACHE"] = os.path.join(work_dir, f"cache_{name}.sqlite")
+            if name == "process_images_async":
+                shutil.rmtree(os.path.join(day_dir, "raw_summaries"), ignore_errors=True)
+
+            print(f"Running {name}...")
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                results["stages"][name] = summarize_stage(executor.submit(run_stage, func, *args).result())
+    finally:
+        server.shutdown()
+
+    results["mock_server"] = dict(MockOpenAIHandler.stats)
+    return results
+
+# Function to print results, with the change against a previous run if one is given
+def print_results(results, baseline=None):
+    print(f"\nBenchmark at {results['commit'] or 'unknown commit'} ({results['timestamp']})")
+    print(f"{'stage':<22}{'items':>7}{'items/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'peak MB':>9}  vs baseline")
+    for name, stage in results["stages"].items():
+        line = f"{name:<22}{stage['items']:>7}{stage['items_per_sec'] or 0:>10.2f}{stage['p50_ms'] or 0:>10.1f}{stage['p99_ms'] or 0:>10.1f}{stage['peak_rss_mb']:>9.1f}"
+        old = (baseline or {}).get("stages", {}).get(name)
+        if old and old.get("items_per_sec") and stage["items_per_sec"]:
+            line += f"  {stage['items_per_sec'] / old['items_per_sec']:.2f}x throughput"
+        print(line)
+    print(f"Mock server: {results['mock_server']['requests']} requests, {results['mock_server']['rate_limited']} rate limited")
+
+# Run the script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage against synthetic video and a mock OpenAI server.")
+    parser.add_argument("--minutes", type=float, default=DURATION_MINUTES, help="Length of the synthetic video")
+    parser.add_argument("--interval", type=int, default=INTERVAL_SECONDS, help="Frame sampling interval in seconds")
+    parser.add_argument("--mode", default="sequential", help="Frame extraction mode")
+    parser.add_argument("--latency", type=float, default=MOCK_LATENCY_SECONDS, help="Mock API latency in seconds")
+    parser.add_argument("--rate-limit", type=float, default=MOCK_RATE_LIMIT_FRACTION, help="Fraction of chat requests answered with 429")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrency for the async image stage")
+    parser.add_argument("--frames-per-request", type=int, default=1, help="Frames described per vision request")
+    parser.add_argument("--output", default=RESULTS_FILE, help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic data directory")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="keegangpt_bench_")
+    try:
+        results = run_benchmark(work_dir, args.minutes, args.interval, args.mode, args.latency, args.rate_limit, args.concurrency,
+                                args.frames_per_request)
+    finally:
+        if args.keep:
+            print(f"Synthetic data kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved: {args.output}")
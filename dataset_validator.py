@@ -0,0 +1,152 @@
+import os
+import json
+import hashlib
+from minhash import minhash_signature, estimated_similarity, NUM_PERMUTATIONS
+
+# Tokenizer for token accounting; falls back to a ~4 characters per token estimate without tiktoken
+try:
+    import tiktoken
+    encoding = tiktoken.get_encoding("o200k_base")
+except ImportError:
+    encoding = None
+
+# Fine-tuning limits and pricing for gpt-4o-mini (check the current pricing page before relying on the estimate)
+MAX_TOKENS_PER_EXAMPLE = 65536
+TRAINING_PRICE_PER_MILLION_TOKENS = 3.00
+DEFAULT_EPOCHS = 3
+
+# Assistant turns starting with this are failed summaries, not training data
+ERROR_PLACEHOLDER = "Error generating summary"
+
+# Near-duplicate detection: MinHash over word shingles, bucketed with LSH bands
+SHINGLE_SIZE = 5
+LSH_BANDS = 16
+NEAR_DUPLICATE_THRESHOLD = 0.9
+
+# Stop before uploading if more than this fraction of examples were invalid, malformed or too long
+# (duplicates are dropped on purpose and don't count; repetitive days easily have many)
+MAX_REJECTED_FRACTION = 0.2
+
+def count_tokens(text):
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(text) // 4 + 1
+
+# Function to count the tokens of one chat example the way the fine-tuning API bills them
+def count_example_tokens(messages):
+    """Counts tokens for a list of chat messages, including per-message and reply-priming overhead."""
+    return sum(3 + count_tokens(message.get("content") or "") for message in messages) + 3
+
+# Function to check the structure of one example
+def validate_example(example):
+    """Returns a reason string if the example is malformed or unusable, or None if it looks fine."""
+    messages = example.get("messages")
+    if not isinstance(messages, list) or not messages:
+        return "missing messages"
+
+    for message in messages:
+        if message.get("role") not in ("system", "user", "assistant"):
+            return "invalid role"
+        if not isinstance(message.get("content"), str) or not message["content"].strip():
+            return "empty content"
+
+    if messages[-1]["role"] != "assistant":
+        return "no assistant turn"
+
+    if any(m["role"] == "assistant" and m["content"].strip().startswith(ERROR_PLACEHOLDER) for m in messages):
+        return "error placeholder"
+
+    return None
+
+# Function to validate, deduplicate and account for a training file in one streaming pass
+def validate_dataset(input_path, output_path=None, epochs=DEFAULT_EPOCHS):
+    """Validates a fine-tuning JSONL file and writes the usable, deduplicated examples to `output_path`.
+
+    Returns a stats dict; stats["ok"] is False if the job shouldn't be started. Unusable examples are counted
+    in stats["rejected"] and dropped duplicates in stats["duplicates"], both by reason.
+    """
+    stats = {"examples": 0, "kept": 0, "rejected": {}, "duplicates": {}, "tokens": 0, "max_example_tokens": 0}
+    seen_hashes = set()
+    band_index = {}
+    signatures = []
+    rows_per_band = NUM_PERMUTATIONS // LSH_BANDS
+
+    def reject(reason, kind="rejected"):
+        stats[kind][reason] = stats[kind].get(reason, 0) + 1
+
+    out = open(output_path, "w") if output_path else None
+    try:
+        with open(input_path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                stats["examples"] += 1
+
+                try:
+                    example = json.loads(line)
+                except json.JSONDecodeError:
+                    reject("invalid json")
+                    continue
+
+                reason = validate_example(example)
+                if reason:
+                    reject(reason)
+                    continue
+
+                messages = example["messages"]
+                tokens = count_example_tokens(messages)
+                if tokens > MAX_TOKENS_PER_EXAMPLE:
+                    reject("too many tokens")
+                    continue
+
+                # Exact duplicates: same conversation after whitespace normalization
+                text = "\n".join(f"{m['role']}: {' '.join(m['content'].split())}" for m in messages)
+                digest = hashlib.sha256(text.encode("utf-8")).digest()
+                if digest in seen_hashes:
+                    reject("exact duplicate", "duplicates")
+                    continue
+                seen_hashes.add(digest)
+
+                # Near duplicates: any earlier example sharing an LSH band and agreeing on most MinHash values
+                signature = minhash_signature(" ".join(m["content"] for m in messages if m["role"] != "system"), SHINGLE_SIZE)
+                bands = [(b, signature[b * rows_per_band:(b + 1) * rows_per_band].tobytes()) for b in range(LSH_BANDS)]
+                candidates = {i for band in bands for i in band_index.get(band, ())}
+                if any(estimated_similarity(signatures[i], signature) >= NEAR_DUPLICATE_THRESHOLD for i in candidates):
+                    reject("near duplicate", "duplicates")
+                    continue
+                for band in bands:
+                    band_index.setdefault(band, []).append(len(signatures))
+                signatures.append(signature)
+
+                stats["kept"] += 1
+                stats["tokens"] += tokens
+                stats["max_example_tokens"] = max(stats["max_example_tokens"], tokens)
+                if out:
+                    out.write(json.dumps(example) + "\n")
+    finally:
+        if out:
+            out.close()
+
+    rejected = sum(stats["rejected"].values())
+    stats["cost_per_epoch"] = stats["tokens"] / 1_000_000 * TRAINING_PRICE_PER_MILLION_TOKENS
+    stats["ok"] = stats["kept"] > 0 and rejected <= MAX_REJECTED_FRACTION * stats["examples"]
+
+    print(f"Validated {input_path}: kept {stats['kept']} of {stats['examples']} examples")
+    for reason, count in sorted(stats["rejected"].items()):
+        print(f"  rejected {count}: {reason}")
+    for reason, count in sorted(stats["duplicates"].items()):
+        print(f"  removed {count}: {reason}")
+    print(f"  {stats['tokens']} training tokens per epoch (largest example: {stats['max_example_tokens']} tokens)")
+    print(f"  estimated cost: ${stats['cost_per_epoch']:.2f} per epoch, ${stats['cost_per_epoch'] * epochs:.2f} for {epochs} epochs")
+    if not stats["ok"]:
+        print("  Dataset failed validation; fix it before starting a fine-tuning job.")
+    elif output_path:
+        print(f"  Clean dataset saved: {output_path}")
+
+    return stats
+
+# Run the script
+if __name__ == "__main__":
+    input_path = "/Users/keeganh/Documents/keegangpt_training_minute_Monday.jsonl"
+    root, ext = os.path.splitext(input_path)
+    validate_dataset(input_path, f"{root}_clean{ext}")
@@ -1,15 +1,12 @@
 import openai
 import time
 import os
-import dotenv
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-
-# Load API key
-dotenv.load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-
-# Initialize OpenAI Client
-client = openai.OpenAI(api_key=api_key)
+from openai_client import get_client
+from dataset_validator import validate_dataset
+from telemetry import get_telemetry
 
 # Set the last training day
 day = "Monday"  # Change this to match the latest training day
@@ -24,9 +21,27 @@ else:
     TRAINING_FILE_PATH = f"/Users/keeganh/Documents/keegangpt_training_{day}.jsonl"
     LOG_FILE = f"/Users/keeganh/Documents/fine_tuning_log_{day}.txt"
 
-def log_fine_tuning_details(job_id, model_id=None, status="started"):
-    """Logs fine-tuning details into a text file."""
-    with open(LOG_FILE, "a") as f:
+# Files larger than this are sent through the Uploads API in parallel parts that can be resumed after a failure
+MULTIPART_THRESHOLD = 32 * 1024 * 1024
+PART_SIZE = 16 * 1024 * 1024  # The Uploads API accepts parts of up to 64 MB
+UPLOAD_WORKERS = 4
+UPLOAD_EXPIRY_SECONDS = 3600  # Uploads that aren't completed within an hour expire
+MAX_RETRIES = 5
+
+# Job monitoring polls quickly while events are arriving and backs off up to MAX_POLL_SECONDS when idle
+MIN_POLL_SECONDS = 5
+MAX_POLL_SECONDS = 120
+
+# Errors that are worth retrying rather than giving up on
+TRANSIENT_ERRORS = (openai.APIConnectionError, openai.APITimeoutError, openai.RateLimitError, openai.InternalServerError)
+
+# Errors meaning a saved upload can't take more parts (it expired, was cancelled or was already completed)
+STALE_UPLOAD_ERRORS = (openai.BadRequestError, openai.NotFoundError, openai.ConflictError)
+
+def log_fine_tuning_details(job_id, model_id=None, status="started", log_file=None):
+    """Logs fine-tuning details into a text file (LOG_FILE by default)."""
+    log_file = log_file or LOG_FILE
+    with open(log_file, "a") as f:
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         f.write(f"Timestamp: {timestamp}\n")
         f.write(f"Job ID: {job_id}\n")
@@ -34,15 +49,110 @@ def log_fine_tuning_details(job_id, model_id=None, status="started"):
         if model_id:
             f.write(f"Fine-Tuned Model ID: {model_id}\n")
         f.write("=" * 40 + "\n")
-    print(f"Fine-tuning details logged in {LOG_FILE}")
+    print(f"Fine-tuning details logged in {log_file}")
+
+def with_retries(description, func, *args, **kwargs):
+    """Calls `func`, retrying transient API errors with exponential backoff."""
+    endpoint = func.__qualname__.lower()
+    for attempt in range(MAX_RETRIES):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            get_telemetry().record_api_call(endpoint, None, time.perf_counter() - start, retries=attempt)
+            return result
+        except TRANSIENT_ERRORS as e:
+            if attempt == MAX_RETRIES - 1:
+                get_telemetry().record_api_call(endpoint, None, time.perf_counter() - start, retries=attempt, error=e)
+                raise
+            wait = min(2 ** attempt, 60)
+            print(f"Transient error {description}, retrying in {wait}s: {e}")
+            time.sleep(wait)
+
+def load_upload_state(state_path, file_size, file_mtime):
+    """Returns the saved state of an unfinished multipart upload of this exact file, or None."""
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path, "r") as f:
+        state = json.load(f)
+    if state["size"] != file_size or state["mtime"] != file_mtime or state["part_size"] != PART_SIZE:
+        return None
+    if time.time() > state.get("expires_at", state["created_at"] + UPLOAD_EXPIRY_SECONDS):
+        return None
+    return state
+
+def save_upload_state(state_path, state):
+    with open(state_path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(state_path + ".tmp", state_path)
+
+def create_upload(file_path, state_path, file_size, file_mtime):
+    """Starts a new multipart upload and saves its state. Returns the state."""
+    upload = with_retries("creating upload", get_client().uploads.create,
+        purpose="fine-tune", filename=os.path.basename(file_path), bytes=file_size, mime_type="text/jsonl")
+    state = {"upload_id": upload.id, "size": file_size, "mtime": file_mtime, "part_size": PART_SIZE,
+             "created_at": time.time(), "expires_at": upload.expires_at or time.time() + UPLOAD_EXPIRY_SECONDS, "parts": {}}
+    save_upload_state(state_path, state)
+    return state
+
+def send_upload_parts(file_path, state_path, state):
+    """Sends the parts of an upload that haven't been sent yet, then completes it. Returns the file ID."""
+    num_parts = (state["size"] + PART_SIZE - 1) // PART_SIZE
+    missing = [index for index in range(num_parts) if str(index) not in state["parts"]]
+
+    def send_part(index):
+        with open(file_path, "rb") as f:
+            f.seek(index * PART_SIZE)
+            data = f.read(PART_SIZE)
+        part = with_retries(f"uploading part {index + 1}/{num_parts}", get_client().uploads.parts.create,
+            upload_id=state["upload_id"], data=data)
+        return index, part.id
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+        for future in as_completed([executor.submit(send_part, index) for index in missing]):
+            index, part_id = future.result()
+            # Record each part as soon as it lands so an interrupted upload only resends the missing ones
+            state["parts"][str(index)] = part_id
+            save_upload_state(state_path, state)
+            print(f"Uploaded part {len(state['parts'])}/{num_parts}")
+
+    part_ids = [state["parts"][str(index)] for index in range(num_parts)]
+    upload = with_retries("completing upload", get_client().uploads.complete, upload_id=state["upload_id"], part_ids=part_ids)
+    os.remove(state_path)
+    return upload.file.id
+
+def upload_training_file_multipart(file_path):
+    """Uploads a large file in parallel parts through the Uploads API, resuming a previous attempt if possible.
 
-def upload_training_file():
+    Returns the file ID of the completed upload.
+    """
+    file_size = os.path.getsize(file_path)
+    file_mtime = os.path.getmtime(file_path)
+    state_path = file_path + ".upload.json"
+
+    state = load_upload_state(state_path, file_size, file_mtime)
+    if state:
+        print(f"Resuming upload {state['upload_id']} ({len(state['parts'])} part(s) already sent)")
+        try:
+            return send_upload_parts(file_path, state_path, state)
+        except STALE_UPLOAD_ERRORS as e:
+            # The Uploads API can't look an upload up, so one that was cancelled or expired early shows up as its next call failing
+            print(f"Upload {state['upload_id']} can no longer be resumed ({e}), starting a new one")
+
+    return send_upload_parts(file_path, state_path, create_upload(file_path, state_path, file_size, file_mtime))
+
+def upload_training_file(file_path=TRAINING_FILE_PATH):
     """Uploads the training JSONL file and returns the file ID."""
-    print(f"Uploading training file: {TRAINING_FILE_PATH}")
+    print(f"Uploading training file: {file_path}")
 
     try:
-        with open(TRAINING_FILE_PATH, "rb") as f:
-            response = client.files.create(
+        if os.path.getsize(file_path) > MULTIPART_THRESHOLD:
+            file_id = upload_training_file_multipart(file_path)
+            print(f"Training file uploaded! File ID: {file_id}")
+            return file_id
+
+        with open(file_path, "rb") as f:
+            response = get_telemetry().timed_call(
+                "files.create", get_client().files.create,
                 file=f,
                 purpose="fine-tune"
             )
@@ -53,12 +163,13 @@ def upload_training_file():
         print(f"Error uploading training file: {e}")
         return None
 
-def start_fine_tuning(file_id):
+def start_fine_tuning(file_id, log_file=None):
     """Starts a fine-tuning job and returns the job ID."""
     print(f"Starting fine-tuning job for {day}...")
 
     try:
-        response = client.fine_tuning.jobs.create(
+        response = get_telemetry().timed_call(
+            "fine_tuning.jobs.create", get_client().fine_tuning.jobs.create,
             training_file=file_id,
             model="gpt-4o-mini-2024-07-18"
         )
@@ -66,53 +177,111 @@ def start_fine_tuning(file_id):
         print(f"Fine-tuning started! Job ID: {job_id}")
 
         # Log initial details
-        log_fine_tuning_details(job_id, status="started")
+        log_fine_tuning_details(job_id, status="started", log_file=log_file)
 
         return job_id
     except openai.OpenAIError as e:
         print(f"Error starting fine-tuning: {e}")
         return None
 
-def check_fine_tuning_status(job_id):
+def print_new_events(job_id, seen_event_ids):
+    """Prints job events that haven't been shown yet, oldest first. Returns how many were new.
+
+    Events are listed newest first, so pages are fetched with the `after` cursor until one reaches an event that
+    was already shown, or there are no more.
+    """
+    new_events = []
+    after = {}
+    while True:
+        page = get_telemetry().timed_call("fine_tuning.jobs.list_events", get_client().fine_tuning.jobs.list_events,
+                                          fine_tuning_job_id=job_id, limit=100, **after)
+        unseen = [e for e in page.data if e.id not in seen_event_ids]
+        new_events += unseen
+        if not page.has_more or not page.data or len(unseen) < len(page.data):
+            break
+        after = {"after": page.data[-1].id}
+
+    # Reversed first, so events sharing a timestamp also come out oldest first
+    for event in sorted(reversed(new_events), key=lambda e: e.created_at):
+        seen_event_ids.add(event.id)
+        event_time = datetime.fromtimestamp(event.created_at).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[{event_time}] {event.message}")
+    return len(new_events)
+
+def check_fine_tuning_status(job_id, log_file=None):
     """Monitors the fine-tuning job until completion and logs the result."""
     print(f"Monitoring fine-tuning job: {job_id}")
 
+    seen_event_ids = set()
+    poll_seconds = MIN_POLL_SECONDS
+    consecutive_errors = 0
+    last_status = None
+
     while True:
         try:
-            job_status = client.fine_tuning.jobs.retrieve(job_id)
+            new_events = print_new_events(job_id, seen_event_ids)
+            job_status = get_telemetry().timed_call("fine_tuning.jobs.retrieve", get_client().fine_tuning.jobs.retrieve, job_id)
+            consecutive_errors = 0
 
             # Print status update
-            print(f"Status: {job_status.status}")
+            if job_status.status != last_status:
+                print(f"Status: {job_status.status}")
+                last_status = job_status.status
 
             if job_status.status == "succeeded":
                 model_id = job_status.fine_tuned_model
                 print(f"Fine-tuning complete! Model ID: {model_id}")
 
                 # Log completion details
-                log_fine_tuning_details(job_id, model_id, status="completed")
+                log_fine_tuning_details(job_id, model_id, status="completed", log_file=log_file)
 
                 return model_id
             elif job_status.status in ["failed", "cancelled"]:
                 print("Fine-tuning failed or was cancelled.")
 
                 # Log failure
-                log_fine_tuning_details(job_id, status="failed")
+                log_fine_tuning_details(job_id, status="failed", log_file=log_file)
 
                 return None
 
-            # Wait before checking again
-            time.sleep(60)
+            # Poll again soon while the job is making progress, back off while it's quiet
+            poll_seconds = MIN_POLL_SECONDS if new_events else min(poll_seconds * 2, MAX_POLL_SECONDS)
+            time.sleep(poll_seconds)
+
+        except TRANSIENT_ERRORS as e:
+            consecutive_errors += 1
+            if consecutive_errors > MAX_RETRIES:
+                print(f"Error checking fine-tuning status, giving up: {e}")
+                return None
+            wait = min(MIN_POLL_SECONDS * 2 ** consecutive_errors, MAX_POLL_SECONDS)
+            print(f"Transient error checking fine-tuning status, retrying in {wait}s: {e}")
+            time.sleep(wait)
 
         except openai.OpenAIError as e:
             print(f"Error checking fine-tuning status: {e}")
             return None
 
-# Run fine-tuning process
-if __name__ == "__main__":
-    file_id = upload_training_file()
+# Function to run the whole fine-tuning process for one training file
+def run_fine_tune(training_file_path=TRAINING_FILE_PATH, log_file=None):
+    """Validates, uploads and fine-tunes on a training file. Returns the fine-tuned model ID, or None."""
+    # The validated, deduplicated copy that actually gets uploaded (splitext, so a non-.jsonl name never maps onto itself)
+    root, ext = os.path.splitext(training_file_path)
+    clean_file_path = f"{root}_clean{ext}"
+
+    # Check the dataset locally before spending upload and queue time on it
+    stats = validate_dataset(training_file_path, clean_file_path)
+    file_id = upload_training_file(clean_file_path) if stats["ok"] else None
     if file_id:
-        job_id = start_fine_tuning(file_id)
+        job_id = start_fine_tuning(file_id, log_file)
         if job_id:
-            fine_tuned_model = check_fine_tuning_status(job_id)
+            fine_tuned_model = check_fine_tuning_status(job_id, log_file)
             if fine_tuned_model:
-                print(f"Your fine-tuned model is ready: {fine_tuned_model}")
\ No newline at end of file
+                print(f"Your fine-tuned model is ready: {fine_tuned_model}")
+                return fine_tuned_model
+    return None
+
+# Run fine-tuning process
+if __name__ == "__main__":
+    with get_telemetry().stage("fine_tune"):
+        run_fine_tune()
+    get_telemetry().report()
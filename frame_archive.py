@@ -0,0 +1,243 @@
+import os
+import mmap
+import fcntl
+import cv2
+import numpy as np
+from timestamps import to_seconds, from_seconds
+
+# Packed frame store kept inside an extracted_frames folder: JPEG bytes appended back to back in one blob file,
+# plus an index of fixed-size (timestamp, offset, length) records
+ARCHIVE_FILENAME = "frames.pack"
+INDEX_FILENAME = "frames.idx"
+MAGIC = b"KGPTFRM1"
+
+RECORD = np.dtype([("time", "<i8"), ("offset", "<i8"), ("length", "<i8")])
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+def frame_name(seconds):
+    """Returns the filename a frame has in the per-file layout."""
+    return f"{from_seconds(seconds).strftime('%Y-%m-%d_%H-%M-%S')}.jpg"
+
+def archive_exists(folder):
+    return os.path.exists(os.path.join(folder, INDEX_FILENAME))
+
+class FrameArchiveWriter:
+    """Appends frames to a folder's archive. Safe to use from several processes at once."""
+
+    def __init__(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        self.index_path = os.path.join(folder, INDEX_FILENAME)
+        # The blob file is never replaced, so its lock also guards the index
+        self.pack = open(os.path.join(folder, ARCHIVE_FILENAME), "ab")
+        self.index = None
+
+    def _open_index(self):
+        # sort_index swaps in a new index file, so reopen if the path no longer points at ours
+        if self.index is None or not os.path.exists(self.index_path) or os.fstat(self.index.fileno()).st_ino != os.stat(self.index_path).st_ino:
+            if self.index is not None:
+                self.index.close()
+            self.index = open(self.index_path, "ab")
+            if self.index.tell() == 0:
+                self.index.write(MAGIC)
+
+    def append(self, frame_timestamp, jpeg_bytes):
+        """Appends one encoded frame. A later frame with the same timestamp replaces it."""
+        fcntl.flock(self.pack, fcntl.LOCK_EX)
+        try:
+            self._open_index()
+            offset = self.pack.seek(0, os.SEEK_END)
+            self.pack.write(jpeg_bytes)
+            self.pack.flush()
+            # The record is only written once its bytes are in place, so a crash never indexes a partial frame
+            record = np.array([(to_seconds(frame_timestamp), offset, len(jpeg_bytes))], dtype=RECORD)
+            self.index.write(record.tobytes())
+            self.index.flush()
+        finally:
+            fcntl.flock(self.pack, fcntl.LOCK_UN)
+
+    def close(self):
+        self.pack.close()
+        if self.index is not None:
+            self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _read_records(buffer):
+    """Returns the index records in a buffer, ignoring a trailing partial record."""
+    count = (len(buffer) - len(MAGIC)) // RECORD.itemsize
+    return np.frombuffer(buffer, dtype=RECORD, count=max(count, 0), offset=len(MAGIC))
+
+def _latest_sorted(records):
+    """Sorts records by timestamp, keeping only the last-appended record for each timestamp."""
+    if len(records) and np.all(np.diff(records["time"]) > 0):
+        return records
+    order = np.argsort(records["time"], kind="stable")
+    records = records[order]
+    keep = np.ones(len(records), dtype=bool)
+    keep[:-1] = records["time"][:-1] != records["time"][1:]
+    return records[keep]
+
+# Function to rewrite an archive's index in timestamp order once writing has finished
+def sort_index(folder):
+    """Sorts the index by timestamp and drops records superseded by a later frame with the same timestamp."""
+    index_path = os.path.join(folder, INDEX_FILENAME)
+    if not os.path.exists(index_path):
+        return
+    with open(os.path.join(folder, ARCHIVE_FILENAME), "ab") as pack:
+        fcntl.flock(pack, fcntl.LOCK_EX)
+        try:
+            with open(index_path, "rb") as f:
+                records = _read_records(f.read())
+            sorted_records = _latest_sorted(records)
+            if sorted_records is records:
+                return
+            with open(index_path + ".tmp", "wb") as f:
+                f.write(MAGIC)
+                f.write(sorted_records.tobytes())
+            os.replace(index_path + ".tmp", index_path)
+        finally:
+            fcntl.flock(pack, fcntl.LOCK_UN)
+
+class FrameArchive:
+    """Read-only, memory-mapped view of a folder's archive. Frames come back as memoryviews into the mapping."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.index_file = open(os.path.join(folder, INDEX_FILENAME), "rb")
+        self.pack_file = open(os.path.join(folder, ARCHIVE_FILENAME), "rb")
+        self.index_mm = mmap.mmap(self.index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.index_mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{folder} does not contain a frame archive index")
+
+        # An empty blob file can't be mapped, and holds nothing to read anyway
+        pack_size = os.fstat(self.pack_file.fileno()).st_size
+        self.pack_mm = mmap.mmap(self.pack_file.fileno(), 0, access=mmap.ACCESS_READ) if pack_size else b""
+
+        # Records for bytes beyond the mapped blob were appended after it was opened, so leave them out
+        records = _read_records(self.index_mm)
+        self.records = _latest_sorted(records[records["offset"] + records["length"] <= pack_size])
+        self.names = [frame_name(seconds) for seconds in self.records["time"]]
+        self.positions = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.positions
+
+    def get(self, name):
+        """Returns the JPEG bytes of a frame, by its per-file name, without copying them.
+
+        The view keeps the mapping open, so release it once done (e.g. `with archive.get(name) as view:`).
+        """
+        record = self.records[self.positions[name]]
+        start = int(record["offset"])
+        return memoryview(self.pack_mm)[start:start + int(record["length"])]
+
+    def close(self):
+        """Unmaps and closes the archive. Raises BufferError, leaving it open, while a view from get() is still alive."""
+        if isinstance(self.pack_mm, mmap.mmap):
+            self.pack_mm.close()
+        self.records = None
+        self.index_mm.close()
+        self.index_file.close()
+        self.pack_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+_archives = {}
+
+# Archives replaced by a newer version while some of their views were still alive; closed once those are released
+_retired = []
+
+def _retire(archive):
+    _retired.append(archive)
+    for old in list(_retired):
+        try:
+            old.close()
+        except BufferError:
+            continue
+        _retired.remove(old)
+
+# Function to get a folder's archive, reopening it if it has been written to since
+def get_archive(folder):
+    """Returns the FrameArchive for a folder, or None if the folder has no archive."""
+    index_path = os.path.join(folder, INDEX_FILENAME)
+    try:
+        stat_result = os.stat(index_path)
+    except FileNotFoundError:
+        return None
+
+    version = (stat_result.st_ino, stat_result.st_size, os.path.getsize(os.path.join(folder, ARCHIVE_FILENAME)))
+    cached = _archives.get(folder)
+    if cached is None or cached[0] != version:
+        if cached is not None:
+            _retire(cached[1])
+        _archives[folder] = (version, FrameArchive(folder))
+    return _archives[folder][1]
+
+# Function to list every frame in a folder, archived or not
+def list_frames(folder, extensions=IMAGE_EXTENSIONS):
+    """Returns the sorted names of the folder's image files and archived frames."""
+    names = {f for f in os.listdir(folder) if f.lower().endswith(extensions)}
+    archive = get_archive(folder)
+    if archive is not None:
+        names.update(archive.names)
+    return sorted(names)
+
+# Function to read a frame's encoded bytes from its file or from the folder's archive
+def read_frame_bytes(image_path):
+    """Returns the bytes of an image file, or of the archived frame with that name. Files take precedence.
+
+    An archived frame comes back as a memoryview into the archive; drop or release it once decoded.
+    """
+    if os.path.exists(image_path):
+        with open(image_path, "rb") as f:
+            return f.read()
+    archive = get_archive(os.path.dirname(image_path))
+    name = os.path.basename(image_path)
+    if archive is None or name not in archive:
+        raise FileNotFoundError(image_path)
+    return archive.get(name)
+
+# Function to decode a frame from its file or from the folder's archive
+def decode_frame(image_path, flags=cv2.IMREAD_COLOR):
+    """Decodes an image like cv2.imread, also finding archived frames. Returns None if it can't be read."""
+    try:
+        data = read_frame_bytes(image_path)
+    except OSError:
+        return None
+    if not len(data):
+        return None
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+
+# Function to write an archive back out as one JPEG per frame
+def export_frames(folder, output_dir=None):
+    """Writes every archived frame as <timestamp>.jpg in `output_dir` (the archive's own folder by default)."""
+    output_dir = output_dir or folder
+    os.makedirs(output_dir, exist_ok=True)
+    archive = get_archive(folder)
+    if archive is None:
+        print(f"No frame archive in '{folder}'.")
+        return 0
+
+    for name in archive.names:
+        with open(os.path.join(output_dir, name), "wb") as f, archive.get(name) as view:
+            f.write(view)
+    print(f"Exported {len(archive)} frames from '{folder}' to '{output_dir}'")
+    return len(archive)
+
+# Run the script
+if __name__ == "__main__":
+    day_list = ["Monday"]
+    for day in day_list:
+        export_frames(f"/Users/keeganh/Documents/{day}/extracted_frames")
@@ -0,0 +1,121 @@
+import os
+import json
+import cv2
+import numpy as np
+from frame_archive import list_frames, decode_frame
+
+# Manifest written next to the frames, mapping each representative frame to the frames it stands in for
+MANIFEST_FILENAME = "dedup_manifest.json"
+
+# Function to load frames as small grayscale thumbnails, stacked into one array
+def load_thumbnails(image_paths, size):
+    """Loads each image as a `size` (width, height) grayscale thumbnail. Returns (thumbnails, valid mask)."""
+    thumbnails = np.zeros((len(image_paths), size[1], size[0]), dtype=np.float32)
+    valid = np.zeros(len(image_paths), dtype=bool)
+
+    for i, image_path in enumerate(image_paths):
+        # Let the JPEG decoder downscale by 8 while decoding, which is much cheaper than a full decode
+        image = decode_frame(image_path, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if image is None:
+            print(f"Could not read {image_path}, keeping it as its own group.")
+            continue
+        thumbnails[i] = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        valid[i] = True
+
+    return thumbnails, valid
+
+def _dct_matrix(n):
+    """Returns the orthonormal DCT-II matrix of size n x n."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+# Function to compute difference hashes for a batch of thumbnails
+def dhash(thumbnails):
+    """Computes dHash bits for (N, h, h + 1) thumbnails. Returns an (N, h * h / 8) uint8 array."""
+    bits = thumbnails[:, :, 1:] > thumbnails[:, :, :-1]
+    return np.packbits(bits.reshape(len(thumbnails), -1), axis=1)
+
+# Function to compute DCT-based perceptual hashes for a batch of thumbnails
+def phash(thumbnails, hash_size=8):
+    """Computes pHash bits for (N, 4h, 4h) thumbnails. Returns an (N, h * h / 8) uint8 array."""
+    dct = _dct_matrix(thumbnails.shape[1])
+    coefficients = (dct @ thumbnails @ dct.T)[:, :hash_size, :hash_size].reshape(len(thumbnails), -1)
+
+    # Compare each low-frequency coefficient against the median, ignoring the DC term
+    medians = np.median(coefficients[:, 1:], axis=1, keepdims=True)
+    return np.packbits(coefficients > medians, axis=1)
+
+def compute_hashes(image_paths, method="dhash", hash_size=8):
+    """Computes perceptual hashes for a list of images. Returns (hashes, valid mask)."""
+    if method == "dhash":
+        thumbnails, valid = load_thumbnails(image_paths, (hash_size + 1, hash_size))
+        return dhash(thumbnails), valid
+    elif method == "phash":
+        thumbnails, valid = load_thumbnails(image_paths, (hash_size * 4, hash_size * 4))
+        return phash(thumbnails, hash_size), valid
+    raise ValueError(f"Unknown hash method '{method}', expected 'dhash' or 'phash'")
+
+def hamming_distance(hashes, reference):
+    """Returns the Hamming distance between every hash in `hashes` and a single `reference` hash."""
+    return np.unpackbits(np.bitwise_xor(hashes, reference), axis=-1).sum(axis=-1)
+
+# Function to group consecutive near-identical frames
+def group_near_duplicates(hashes, valid, threshold=5):
+    """Groups consecutive frames whose hash is within `threshold` bits of the group's first frame.
+
+    Returns a list of (start, end) index ranges, end exclusive.
+    """
+    groups = []
+    start = 0
+    for i in range(1, len(hashes)):
+        # Compare against the representative rather than the previous frame, so slow drift still splits groups
+        if not (valid[i] and valid[start]) or hamming_distance(hashes[i], hashes[start]) > threshold:
+            groups.append((start, i))
+            start = i
+    if len(hashes):
+        groups.append((start, len(hashes)))
+    return groups
+
+def dedup_frames(image_folder, threshold=5, method="dhash"):
+    """Hashes every frame in a folder and writes a manifest of near-duplicate groups. Returns the manifest.
+
+    Frames rejected by frame_quality are left out, so an unusable frame never stands in for the usable ones after it.
+    """
+    # Imported here because frame_quality builds on this module's thumbnail loader
+    from frame_quality import load_rejected
+    rejected = load_rejected(image_folder)
+    image_files = [f for f in list_frames(image_folder) if f not in rejected]
+    image_paths = [os.path.join(image_folder, f) for f in image_files]
+
+    hashes, valid = compute_hashes(image_paths, method)
+    groups = group_near_duplicates(hashes, valid, threshold)
+
+    manifest = {
+        "method": method,
+        "threshold": threshold,
+        "groups": {image_files[start]: image_files[start + 1:end] for start, end in groups},
+    }
+
+    manifest_path = os.path.join(image_folder, MANIFEST_FILENAME)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    skipped = len(image_files) - len(groups)
+    print(f"Kept {len(groups)} of {len(image_files)} frames ({skipped} near-duplicates skipped). Manifest saved: {manifest_path}")
+    return manifest
+
+def load_manifest(image_folder):
+    """Returns the {representative: [duplicates]} mapping for a folder, or None if it has not been deduplicated."""
+    manifest_path = os.path.join(image_folder, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r") as f:
+        return json.load(f)["groups"]
+
+# Run the script
+if __name__ == "__main__":
+    image_folder = "/Users/keeganh/Documents/Monday/extracted_frames"
+    dedup_frames(image_folder, threshold=5, method="dhash")
@@ -1,69 +1,282 @@
 import os
-import glob
+import bisect
+import shutil
+import tempfile
+import time
+import traceback
 import cv2
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from telemetry import get_telemetry
+from video_catalog import get_catalog, probe_video
+from frame_archive import FrameArchiveWriter, archive_exists, sort_index
+
+# Extraction modes for extract_frames:
+#   "seek"       - seek to every sample with CAP_PROP_POS_FRAMES (original behaviour)
+#   "sequential" - decode the video once, grab() past skipped frames, retrieve() only sampled ones
+#   "keyframe"   - fast path that samples the nearest preceding keyframe for each target
+EXTRACTION_MODES = ("seek", "sequential", "keyframe")
+
+# Where extracted frames go:
+#   "files"   - one <timestamp>.jpg per frame (original behaviour)
+#   "archive" - appended to one packed file per folder (see frame_archive.py), avoiding a file per frame
+FRAME_STORES = ("files", "archive")
 
 def get_sorted_videos(directory):
-    """Retrieve and sort videos by their true creation time."""
+    """Retrieve and sort videos by their true creation time, from the video catalog."""
     if not os.path.exists(directory):
         print(f"Error: Directory '{directory}' does not exist.")
         return []
 
-    # Get all MP4 files (case insensitive)
-    video_files = glob.glob(os.path.join(directory, "*.mp4")) + glob.glob(os.path.join(directory, "*.MP4"))
+    # Only new or changed MP4 files (case insensitive) are opened; the rest, and the ordering, come from the catalog
+    video_files = get_catalog().refresh(directory)
 
     if not video_files:
         print(f"Warning: No MP4 files found in '{directory}'.")
 
-    # Sort by true creation time
-    video_files.sort(key=lambda x: os.stat(x).st_birthtime)
-
     return video_files
 
-def extract_frames(video_path, output_dir, interval_seconds=60):
-    """ Extracts a frame every `interval_seconds` from the given video with accurate timestamps in filenames. """
+def get_video_info(video_path):
+    """Returns the video's catalog entry, probing the file directly if it isn't catalogued."""
+    row = get_catalog().get(video_path)
+    if row:
+        return row
+    created_at, fps, frame_count, duration = probe_video(video_path, os.stat(video_path))
+    return {"created_at": created_at, "fps": fps, "frame_count": frame_count, "duration": duration}
+
+def get_video_start_time(video_path):
+    """Returns the datetime the video started recording."""
+    return datetime.fromtimestamp(get_video_info(video_path)["created_at"])
+
+def get_video_duration(video_path):
+    """Returns the video's length in seconds, or 0 if it can't be read."""
+    return get_video_info(video_path)["duration"]
+
+def save_frame(frame, output_dir, frame_timestamp):
+    """Saves a frame named after its timestamp. Returns True on success."""
+    formatted_timestamp = frame_timestamp.strftime("%Y-%m-%d_%H-%M-%S")
+
+    # Save frame with only timestamp in the filename
+    frame_filename = os.path.join(output_dir, f"{formatted_timestamp}.jpg")
+    return cv2.imwrite(frame_filename, frame)
+
+def get_keyframe_indices(video_path):
+    """Returns the sorted frame indices of all keyframes, or None if the backend can't report them."""
+    cap = cv2.VideoCapture(video_path)
+
+    # Raw stream mode hands back demuxed packets without decoding them
+    if not cap.set(cv2.CAP_PROP_FORMAT, -1):
+        cap.release()
+        return None
+
+    keyframes = []
+    frame_number = 0
+    while cap.grab():
+        if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+            keyframes.append(frame_number)
+        frame_number += 1
+
+    cap.release()
+    return keyframes or None
+
+def iter_frames(video_path, interval_seconds=60, mode="seek"):
+    """Yields (frame timestamp, frame) for a frame every `interval_seconds` of the given video, in order."""
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode '{mode}', expected one of {EXTRACTION_MODES}")
+
     cap = cv2.VideoCapture(video_path)
     fps = cap.get(cv2.CAP_PROP_FPS)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     duration = total_frames / fps  # Duration in seconds
 
+    # Get video creation timestamp
+    video_creation_time = get_video_start_time(video_path)
+
+    # Sample offsets (seconds) and the frame each one maps to
+    sample_times = list(range(0, int(duration), interval_seconds))
+    target_frames = [int(t * fps) for t in sample_times]
+
+    if mode == "keyframe":
+        keyframes = get_keyframe_indices(video_path)
+        if keyframes is None:
+            print(f"Keyframe index unavailable for {video_path}, falling back to sequential decoding.")
+            mode = "sequential"
+        else:
+            # Snap each target back to the keyframe that starts its GOP, so every seek decodes a single frame
+            target_frames = [keyframes[max(bisect.bisect_right(keyframes, f) - 1, 0)] for f in target_frames]
+
+    try:
+        if mode == "sequential":
+            # Read the video once, start to end, only converting the frames we keep
+            frame_number = 0
+            for t, target in zip(sample_times, target_frames):
+                while frame_number <= target:
+                    if not cap.grab():
+                        return
+                    frame_number += 1
+                success, frame = cap.retrieve()
+                if success:
+                    # Calculate the exact timestamp of this frame
+                    yield video_creation_time + timedelta(seconds=t), frame
+        else:
+            for t, frame_number in zip(sample_times, target_frames):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+                success, frame = cap.read()
+                if success:
+                    yield video_creation_time + timedelta(seconds=t), frame
+    finally:
+        cap.release()
+
+def extract_frames(video_path, output_dir, interval_seconds=60, mode="seek", store="files"):
+    """ Extracts a frame every `interval_seconds` from the given video with accurate timestamps in filenames. Returns the number of frames saved. """
+    if store not in FRAME_STORES:
+        raise ValueError(f"Unknown frame store '{store}', expected one of {FRAME_STORES}")
     os.makedirs(output_dir, exist_ok=True)
 
-    # Get video creation timestamp
-    video_creation_time = datetime.fromtimestamp(os.stat(video_path).st_birthtime)
+    saved = 0
+    if store == "archive":
+        with FrameArchiveWriter(output_dir) as writer:
+            for frame_timestamp, frame in iter_frames(video_path, interval_seconds, mode):
+                # Encoded the same way cv2.imwrite would, so exported frames match the per-file layout
+                success, buffer = cv2.imencode(".jpg", frame)
+                if success:
+                    writer.append(frame_timestamp, buffer.tobytes())
+                    saved += 1
+        return saved
 
-    for t in range(0, int(duration), interval_seconds):
-        frame_number = int(t * fps)
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-        success, frame = cap.read()
-        if success:
-            # Calculate the exact timestamp of this frame
-            frame_timestamp = video_creation_time + timedelta(seconds=t)
-            formatted_timestamp = frame_timestamp.strftime("%Y-%m-%d_%H-%M-%S")
+    for frame_timestamp, frame in iter_frames(video_path, interval_seconds, mode):
+        if save_frame(frame, output_dir, frame_timestamp):
+            saved += 1
+    return saved
 
-            # Save frame with only timestamp in the filename
-            frame_filename = os.path.join(output_dir, f"{formatted_timestamp}.jpg")
-            cv2.imwrite(frame_filename, frame)
+def has_frames(output_dir, store="files"):
+    """True if `output_dir` holds extracted frames in the given store."""
+    if store == "archive":
+        return archive_exists(output_dir)
+    return any(name.lower().endswith(".jpg") for name in os.listdir(output_dir))
 
-    cap.release()
+def _extract_job(video_path, output_dir, interval_seconds, mode, store="files"):
+    """Runs one extraction job in a worker process, returning (frames saved, seconds taken, error message)."""
+    start = time.perf_counter()
+    try:
+        return extract_frames(video_path, output_dir, interval_seconds, mode, store), time.perf_counter() - start, None
+    except Exception:
+        return 0, time.perf_counter() - start, traceback.format_exc()
+
+def _record_result(video_path, interval_seconds, mode, saved, seconds, failed):
+    """Records one video's extraction in the telemetry and the video catalog."""
+    get_telemetry().record_item("extract_frames", seconds, video=os.path.basename(video_path), frames=saved, failed=failed)
+    get_catalog().mark(video_path, "failed" if failed else "done", interval_seconds, mode, saved)
 
-def process_videos(directory, interval_seconds=60):
+def run_extraction_jobs(jobs, workers=None):
+    """Runs (video_path, output_dir, interval_seconds, mode, store) jobs in a process pool and reports per-video progress.
+
+    A failing video is reported and skipped without aborting the others. Returns the list of failed video paths.
+    """
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_extract_job, *job): job for job in jobs}
+        for done, future in enumerate(as_completed(futures), start=1):
+            video, _, interval_seconds, mode, _ = futures[future]
+            saved, seconds, error = future.result()
+            _record_result(video, interval_seconds, mode, saved, seconds, bool(error))
+            if error:
+                failed.append(video)
+                print(f"[{done}/{len(jobs)}] Failed: {video}\n{error}")
+            else:
+                print(f"[{done}/{len(jobs)}] Extracted {saved} frame(s): {video}")
+
+    if failed:
+        print(f"{len(failed)} video(s) failed to extract.")
+    return failed
+
+def process_videos(directory, interval_seconds=60, mode="seek", workers=1, force=False, store="files"):
     """Processes all videos in a directory, extracting frames at a set interval."""
-    video_files = get_sorted_videos(directory)
-    print(f"Found {len(video_files)} video(s) in '{directory}'.")
+    return process_days([directory], interval_seconds, mode, workers, force, store)
+
+def process_days(directories, interval_seconds=60, mode="seek", workers=1, force=False, store="files"):
+    """Extracts frames from every video in every directory, running videos in parallel when `workers` > 1.
+
+    Videos the catalog records as already extracted at this interval, and unchanged since, are skipped unless
+    `force` is set. `workers=None` uses one process per CPU core. `store` is one of FRAME_STORES.
+    Returns the list of videos that failed.
+    """
+    catalog = get_catalog()
+    jobs = []
+    output_folders = []
+    for directory in directories:
+        video_files = get_sorted_videos(directory)
+        print(f"Found {len(video_files)} video(s) in '{directory}'.")
+
+        output_folder = os.path.join(directory, "extracted_frames")  # Single output folder for all frames
+        os.makedirs(output_folder, exist_ok=True)
+        output_folders.append(output_folder)
+
+        # An emptied output folder means the frames are gone, whatever the catalog says
+        if not force and has_frames(output_folder, store):
+            pending = [video for video in video_files if not catalog.is_extracted(video, interval_seconds)]
+            if len(pending) < len(video_files):
+                print(f"Skipping {len(video_files) - len(pending)} video(s) already extracted at {interval_seconds}s intervals.")
+            video_files = pending
+
+        jobs += [(video, output_folder, interval_seconds, mode, store) for video in video_files]
+
+    if workers == 1:
+        failed = []
+        for video, output_folder, interval, job_mode, job_store in jobs:
+            print(f"Processing: {video}")
+            start = time.perf_counter()
+            saved = 0
+            try:
+                saved = extract_frames(video, output_folder, interval, job_mode, job_store)
+            except Exception as e:
+                print(f"Error processing {video}: {e}")
+                failed.append(video)
+            _record_result(video, interval, job_mode, saved, time.perf_counter() - start, video in failed)
+    else:
+        failed = run_extraction_jobs(jobs, workers)
+
+    for output_folder in output_folders:
+        if store == "archive":
+            # Videos finish out of order when run in parallel, so put the index back in timestamp order
+            sort_index(output_folder)
+        print(f"All frames extracted and saved inside '{output_folder}'")
+    return failed
+
+def benchmark_extraction(video_path, interval_seconds=60, modes=EXTRACTION_MODES):
+    """Times each extraction mode on one video and checks they produce the same frame filenames."""
+    results = {}
+    filenames = {}
+
+    for mode in modes:
+        output_dir = tempfile.mkdtemp(prefix=f"frames_{mode}_")
+        try:
+            start = time.perf_counter()
+            extract_frames(video_path, output_dir, interval_seconds, mode)
+            results[mode] = time.perf_counter() - start
+            filenames[mode] = sorted(os.listdir(output_dir))
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
 
-    output_folder = os.path.join(directory, "extracted_frames")  # Single output folder for all frames
-    os.makedirs(output_folder, exist_ok=True)
+    baseline = results.get("seek")
+    for mode, elapsed in results.items():
+        speedup = f" ({baseline / elapsed:.1f}x vs seek)" if baseline and elapsed else ""
+        print(f"{mode:>10}: {elapsed:.2f}s, {len(filenames[mode])} frames{speedup}")
 
-    for video in video_files:
-        print(f"Processing: {video}")
-        extract_frames(video, output_folder, interval_seconds)
+    reference = filenames[modes[0]]
+    for mode in modes[1:]:
+        if filenames[mode] != reference:
+            print(f"Warning: '{mode}' produced different frame timestamps than '{modes[0]}'.")
 
-    print(f"All frames extracted and saved inside '{output_folder}'")
+    return results
 
 if __name__ == "__main__":
     N = 30  # Extract an image every N seconds
+    MODE = "sequential"  # "seek", "sequential" or "keyframe"
+    STORE = "files"  # "files" or "archive" (run frame_archive.py to export an archive as files)
+    WORKERS = None  # Number of extraction processes (None = one per CPU core, 1 = run serially)
     day_list = ["Tuesday", "Wednesday", "Thursday", "Friday", "Saturday 2", "Sunday 2"]
-    for day in day_list:
-        video_directory = f"/Users/keeganh/Documents/{day}"
-        process_videos(video_directory, interval_seconds=N)
\ No newline at end of file
+    video_directories = [f"/Users/keeganh/Documents/{day}" for day in day_list]
+    with get_telemetry().stage("extract_frames"):
+        process_days(video_directories, interval_seconds=N, mode=MODE, workers=WORKERS, store=STORE)
+    get_telemetry().report()
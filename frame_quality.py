@@ -0,0 +1,183 @@
+import os
+import json
+import cv2
+import numpy as np
+from datetime import datetime, timedelta
+from frame_dedup import load_thumbnails
+from frame_archive import list_frames
+from frame_extracter import get_sorted_videos, get_video_start_time, get_video_duration, save_frame
+
+# Manifest written next to the frames, listing rejected frames and the substitutes found for them
+MANIFEST_FILENAME = "quality_manifest.json"
+
+# Frames are scored as grayscale thumbnails of this (width, height), so the thresholds don't depend on resolution
+THUMBNAIL_SIZE = (160, 90)
+BATCH_SIZE = 256
+
+# A frame is rejected if any score falls outside these bounds
+THRESHOLDS = {
+    "min_brightness": 25,         # Mean pixel value; below this the frame is too dark (e.g. lens covered at night)
+    "max_brightness": 240,        # Above this it is washed out
+    "min_sharpness": 20,          # Variance of the Laplacian; low values mean motion blur or defocus
+    "min_entropy": 1.5,           # Bits over a 32-bin histogram; low values mean there is little to describe
+    "max_uniform_fraction": 0.8,  # Fraction of flat pixels; high values mean the lens is occluded
+}
+
+# Pixels whose horizontal plus vertical gradient is below this count as flat
+UNIFORM_TOLERANCE = 2
+
+# Candidate frames tried, evenly spaced through the interval, when looking for a substitute for a rejected frame
+SUBSTITUTE_CANDIDATES = 4
+
+# Function to score a batch of thumbnails
+def score_thumbnails(thumbnails):
+    """Scores (N, h, w) grayscale thumbnails. Returns a dict of (N,) arrays: brightness, sharpness, entropy, uniform."""
+    n = len(thumbnails)
+    brightness = thumbnails.mean(axis=(1, 2))
+
+    # 4-neighbour Laplacian over every thumbnail at once
+    laplacian = (thumbnails[:, :-2, 1:-1] + thumbnails[:, 2:, 1:-1] + thumbnails[:, 1:-1, :-2] + thumbnails[:, 1:-1, 2:]
+                 - 4 * thumbnails[:, 1:-1, 1:-1])
+    sharpness = laplacian.reshape(n, -1).var(axis=1)
+
+    # Per-thumbnail 32-bin histograms in one bincount, offsetting each thumbnail's bins
+    bins = np.clip(thumbnails, 0, 255).astype(np.int64).reshape(n, -1) // 8
+    counts = np.bincount((bins + np.arange(n)[:, None] * 32).ravel(), minlength=n * 32).reshape(n, 32)
+    probabilities = counts / counts.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entropy = -np.nansum(probabilities * np.log2(probabilities), axis=1)
+
+    gradient = np.abs(np.diff(thumbnails, axis=2))[:, :-1, :] + np.abs(np.diff(thumbnails, axis=1))[:, :, :-1]
+    uniform = (gradient < UNIFORM_TOLERANCE).reshape(n, -1).mean(axis=1)
+
+    return {"brightness": brightness, "sharpness": sharpness, "entropy": entropy, "uniform": uniform}
+
+# Function to check scores against the thresholds
+def rejection_reasons(scores, thresholds=THRESHOLDS):
+    """Returns a list of reasons per frame; an empty list means the frame is good enough to describe."""
+    checks = [
+        ("too dark", scores["brightness"] < thresholds["min_brightness"]),
+        ("too bright", scores["brightness"] > thresholds["max_brightness"]),
+        ("blurred", scores["sharpness"] < thresholds["min_sharpness"]),
+        ("low detail", scores["entropy"] < thresholds["min_entropy"]),
+        ("occluded", scores["uniform"] > thresholds["max_uniform_fraction"]),
+    ]
+    return [[reason for reason, failed in checks if failed[i]] for i in range(len(scores["brightness"]))]
+
+def to_thumbnail(frame):
+    """Converts a decoded BGR frame to a float32 grayscale thumbnail, scaled the same way as load_thumbnails."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    # load_thumbnails decodes JPEGs at 1/8 scale first, which averages 8x8 blocks; do the same before the final resize
+    height, width = gray.shape
+    gray = cv2.resize(gray, (max(width // 8, 1), max(height // 8, 1)), interpolation=cv2.INTER_AREA)
+    return cv2.resize(gray, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+# Function to look for a usable frame later in the same interval
+def find_substitute(video_path, offset_seconds, interval_seconds, thresholds=THRESHOLDS):
+    """Tries SUBSTITUTE_CANDIDATES frames between `offset_seconds` and the next sample.
+
+    Returns (offset seconds, frame) for the sharpest one that passes every threshold, or None.
+    """
+    cap = cv2.VideoCapture(video_path)
+    candidates = []
+    try:
+        for k in range(1, SUBSTITUTE_CANDIDATES + 1):
+            offset = offset_seconds + k * interval_seconds / (SUBSTITUTE_CANDIDATES + 1)
+            cap.set(cv2.CAP_PROP_POS_MSEC, offset * 1000)
+            success, frame = cap.read()
+            if success:
+                candidates.append((offset, frame))
+    finally:
+        cap.release()
+
+    if not candidates:
+        return None
+
+    scores = score_thumbnails(np.stack([to_thumbnail(frame) for _, frame in candidates]))
+    passing = [i for i, reasons in enumerate(rejection_reasons(scores, thresholds)) if not reasons]
+    if not passing:
+        return None
+    return candidates[max(passing, key=lambda i: scores["sharpness"][i])]
+
+# Function to find the video and offset a frame was extracted from
+def locate_frame(videos, frame_timestamp):
+    """Returns (video path, offset seconds) for the video covering `frame_timestamp`, or (None, None)."""
+    for video_path, start, duration in videos:
+        offset = (frame_timestamp - start).total_seconds()
+        if 0 <= offset < duration:
+            return video_path, offset
+    return None, None
+
+# Function to score every extracted frame of a day and replace the unusable ones where possible
+def filter_frames(directory, interval_seconds=60, thresholds=THRESHOLDS, substitute=True):
+    """Scores <directory>/extracted_frames in batches and writes a manifest of rejected frames.
+
+    With `substitute`, each rejected frame's interval is searched in the source video for a usable frame, which is
+    saved alongside the others. image_summarizer skips rejected frames. Returns the manifest.
+    """
+    image_folder = os.path.join(directory, "extracted_frames")
+    image_files = list_frames(image_folder)
+
+    rejected = {}
+    for start in range(0, len(image_files), BATCH_SIZE):
+        batch = image_files[start:start + BATCH_SIZE]
+        thumbnails, valid = load_thumbnails([os.path.join(image_folder, f) for f in batch], THUMBNAIL_SIZE)
+        scores = score_thumbnails(thumbnails)
+        for i, reasons in enumerate(rejection_reasons(scores, thresholds)):
+            if valid[i] and reasons:
+                rejected[batch[i]] = {"reasons": reasons, "scores": {name: round(float(values[i]), 2) for name, values in scores.items()}}
+
+    # Substitutes saved by an earlier run are in the folder now, but may be overwritten with the same frame
+    manifest_path = os.path.join(image_folder, MANIFEST_FILENAME)
+    previous_substitutes = set()
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as f:
+            previous_substitutes = set(json.load(f)["substitutes"].values())
+
+    substitutes = {}
+    if substitute and rejected:
+        videos = [(path, get_video_start_time(path), get_video_duration(path)) for path in get_sorted_videos(directory)]
+        for image_file in rejected:
+            try:
+                frame_timestamp = datetime.strptime(os.path.splitext(image_file)[0], "%Y-%m-%d_%H-%M-%S")
+            except ValueError:
+                continue
+            video_path, offset = locate_frame(videos, frame_timestamp)
+            found = find_substitute(video_path, offset, interval_seconds, thresholds) if video_path else None
+            if found:
+                substitute_time = frame_timestamp + timedelta(seconds=found[0] - offset)
+                substitute_file = f"{substitute_time.strftime('%Y-%m-%d_%H-%M-%S')}.jpg"
+                # Never overwrite a frame that was extracted in its own right
+                extracted = substitute_file in image_files and substitute_file not in previous_substitutes
+                if not extracted and save_frame(found[1], image_folder, substitute_time):
+                    substitutes[image_file] = substitute_file
+
+    manifest = {"thresholds": thresholds, "rejected": rejected, "substitutes": substitutes}
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Per-run report
+    print(f"Scored {len(image_files)} frames in '{image_folder}': {len(rejected)} rejected, {len(substitutes)} replaced with a better nearby frame")
+    reason_counts = {}
+    for entry in rejected.values():
+        for reason in entry["reasons"]:
+            reason_counts[reason] = reason_counts.get(reason, 0) + 1
+    for reason, count in sorted(reason_counts.items()):
+        print(f"  {reason}: {count}")
+    print(f"  Vision calls avoided: {len(rejected) - len(substitutes)}. Manifest saved: {manifest_path}")
+    return manifest
+
+def load_rejected(image_folder):
+    """Returns the set of rejected frame filenames for a folder (empty if it has not been filtered)."""
+    manifest_path = os.path.join(image_folder, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return set()
+    with open(manifest_path, "r") as f:
+        return set(json.load(f)["rejected"])
+
+# Run the script
+if __name__ == "__main__":
+    N = 30  # The interval frames were extracted at
+    day_list = ["Monday"]
+    for day in day_list:
+        filter_frames(f"/Users/keeganh/Documents/{day}", interval_seconds=N)
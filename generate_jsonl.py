@@ -1,6 +1,8 @@
 import os
 import json
+import time
 from datetime import datetime
+from telemetry import get_telemetry
 
 # Define main directory (update this path)
 main_directory = "/Users/keeganh/Documents"
@@ -10,20 +12,30 @@ days_to_process = ["Sunday", "Monday"]
 
 minute = True  # Set to True to include minute summaries
 
+include_context = False  # Set to True to add the covering coarser-level summaries to each example's system prompt
+
+# Function to name the training file after the last day it covers
+def default_output_path(directory, days, include_minute=minute):
+    """Returns the output JSONL path for fine-tuning on `days`."""
+    if include_minute:
+        return os.path.join(directory, f"keegangpt_training_minute_{days[-1]}.jsonl")
+    return os.path.join(directory, f"keegangpt_training_{days[-1]}.jsonl")
+
 # Output JSONL file for fine-tuning
-if minute:
-    output_jsonl_file = os.path.join(main_directory, f"keegangpt_training_minute_{days_to_process[-1]}.jsonl")
-else:
-    output_jsonl_file = os.path.join(main_directory, f"keegangpt_training_{days_to_process[-1]}.jsonl")
+output_jsonl_file = default_output_path(main_directory, days_to_process)
 
 def read_text_file(filepath):
     """Reads text content from a file."""
     with open(filepath, "r") as f:
         return f.read().strip()
 
-def extract_summaries(summary_folder, question_format, summary_type):
+# Index used to look up retrieval context (opened below when include_context is set)
+summary_index = None
+
+def extract_summaries(summary_folder, question_format, summary_type, context_levels=()):
     """Extracts summaries from a given folder and structures them as JSONL entries."""
     training_data = []
+    start = time.perf_counter()
 
     if not os.path.exists(summary_folder):
         print(f"Skipping missing folder: {summary_folder}")
@@ -46,56 +58,67 @@ def extract_summaries(summary_folder, question_format, summary_type):
                 day=timestamp.strftime("%A")
             )
 
+            system_prompt = f"You are KeeganGPT, trained on Keegan's personal {summary_type} summaries. Answer questions accurately based on past events."
+            if summary_index and context_levels:
+                context = summary_index.context_for(timestamp, context_levels)
+                if context:
+                    system_prompt += f"\n\nContext:\n{context}"
+
             training_data.append({
                 "messages": [
-                    {"role": "system", "content": f"You are KeeganGPT, trained on Keegan's personal {summary_type} summaries. Answer questions accurately based on past events."},
+                    {"role": "system", "content": system_prompt},
                     {"role": "user", "content": question},
                     {"role": "assistant", "content": summary}
                 ]
             })
 
+    get_telemetry().record_item("generate_jsonl", time.perf_counter() - start, folder=summary_folder, examples=len(training_data))
     return training_data
 
-def extract_ten_minute_summaries():
+def extract_ten_minute_summaries(directory=None, days=None):
     """Extracts 10-minute summaries for fine-tuning."""
     training_data = []
-    for day in days_to_process:
-        summary_folder = os.path.join(main_directory, day, "ten_minute_summaries")
+    for day in days or days_to_process:
+        summary_folder = os.path.join(directory or main_directory, day, "ten_minute_summaries")
         training_data += extract_summaries(
             summary_folder,
             "What was Keegan doing around {time} on {day}, {date}?",
-            "10-minute"
+            "10-minute",
+            context_levels=("hour", "day")
         )
     return training_data
 
-def extract_minute_summaries():
+def extract_minute_summaries(directory=None, days=None):
     """Extracts minute summaries for fine-tuning."""
     training_data = []
-    for day in days_to_process:
-        summary_folder = os.path.join(main_directory, day, "minute_summaries")
+    for day in days or days_to_process:
+        summary_folder = os.path.join(directory or main_directory, day, "minute_summaries")
         training_data += extract_summaries(
             summary_folder,
             "What was Keegan doing at exactly {time} on {day}, {date}?",
-            "minute"
+            "minute",
+            context_levels=("hour", "day")
         )
     return training_data
 
-def extract_hourly_summaries():
+def extract_hourly_summaries(directory=None, days=None):
     """Extracts hourly summaries for fine-tuning."""
     training_data = []
-    for day in days_to_process:
-        summary_folder = os.path.join(main_directory, day, "hour_summaries")
+    for day in days or days_to_process:
+        summary_folder = os.path.join(directory or main_directory, day, "hour_summaries")
         training_data += extract_summaries(
             summary_folder,
             "Summarize Keegan's main activities between {time} and {time} on {day}, {date}.",
-            "hourly"
+            "hourly",
+            context_levels=("day",)
         )
     return training_data
 
-def extract_daily_summaries():
+def extract_daily_summaries(directory=None):
     """Extracts daily summaries for fine-tuning."""
     training_data = []
-    summary_folder = os.path.join(main_directory, "day_summaries")
+    start = time.perf_counter()
+    summary_folder = os.path.join(directory or main_directory, "day_summaries")
 
     if not os.path.exists(summary_folder):
         print(f"No day_summaries folder found.")
@@ -115,6 +138,7 @@ def extract_daily_summaries():
                 ]
             })
 
+    get_telemetry().record_item("generate_jsonl", time.perf_counter() - start, folder=summary_folder, examples=len(training_data))
     return training_data
 
 def save_jsonl(data, output_path):
@@ -126,18 +150,43 @@ def save_jsonl(data, output_path):
 
     print(f"JSONL file saved: {output_path}")
 
+# Function to build the whole training file
+def generate_training_file(directory=None, days=None, output_path=None, include_minute=None, context=None):
+    """Extracts every summary level for `days` and saves them as one JSONL file. Returns the output path.
+
+    Arguments left as None use the settings at the top of this file.
+    """
+    global summary_index
+    directory = directory or main_directory
+    days = days or days_to_process
+    include_minute = minute if include_minute is None else include_minute
+    context = include_context if context is None else context
+    output_path = output_path or default_output_path(directory, days, include_minute)
+
+    summary_index = None
+    if context:
+        # Only needed for context, and it pulls in numpy
+        from summary_index import build_index, SummaryIndex
+        summary_index = SummaryIndex(build_index(directory, days))
+
+    ten_minute_data = extract_ten_minute_summaries(directory, days)
+    hourly_data = extract_hourly_summaries(directory, days)
+    daily_data = extract_daily_summaries(directory)
+
+    if include_minute:
+        minute_data = extract_minute_summaries(directory, days)
+    else:
+        minute_data = []
+
+    # Combine all data (excluding weekly summaries)
+    all_data = ten_minute_data + hourly_data + daily_data + minute_data
+    print(len(all_data))
+    # Save to JSONL file
+    save_jsonl(all_data, output_path)
+    return output_path
+
 # Run extraction process
-ten_minute_data = extract_ten_minute_summaries()
-hourly_data = extract_hourly_summaries()
-daily_data = extract_daily_summaries()
-
-if minute:
-    minute_data = extract_minute_summaries()
-else:
-    minute_data = []
-
-# Combine all data (excluding weekly summaries)
-all_data = ten_minute_data + hourly_data + daily_data + minute_data
-print(len(all_data))
-# Save to JSONL file
-save_jsonl(all_data, output_jsonl_file)
\ No newline at end of file
+if __name__ == "__main__":
+    with get_telemetry().stage("generate_jsonl"):
+        generate_training_file()
+    get_telemetry().report()
@@ -3,15 +3,18 @@ from openai import OpenAIError
 import os
 import base64
 import time
-import dotenv
+import asyncio
+import math
+import json
+import cv2
+import numpy as np
 from tqdm import tqdm
-
-# Load API Key from .env file
-dotenv.load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-
-# Initialize OpenAI Client
-client = openai.OpenAI(api_key=api_key)
+from frame_archive import list_frames, read_frame_bytes
+from frame_dedup import load_manifest
+from frame_quality import load_rejected
+from openai_client import get_client, get_async_client
+from response_cache import get_cache, cache_key, is_complete
+from telemetry import get_telemetry
 
 # Set fine-tuned model ID (set to None to use default)
 fine_tuned_model_id = None  # Example: "ft:gpt-4o-mini-2024-07-18:personal::BCQfOpO0"
@@ -19,73 +22,505 @@ fine_tuned_model_id = None  # Example: "ft:gpt-4o-mini-2024-07-18:personal::BCQf
 # Default model if fine-tuned model is not specified
 model_to_use = fine_tuned_model_id if fine_tuned_model_id else "gpt-4o-mini"
 
-# Function to encode an image as base64
-def encode_image(image_path):
-    with open(image_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode("utf-8")
+# Rough prompt-side token cost of one request, used to reserve TPM budget before the real usage is known
+ESTIMATED_PROMPT_TOKENS = 1000
+
+# Request payload settings: frames are resized so their longest side is at most IMAGE_MAX_SIDE pixels
+# (None keeps the full resolution) and re-encoded in memory at JPEG_QUALITY before upload
+IMAGE_MAX_SIDE = 768
+JPEG_QUALITY = 80
+IMAGE_DETAIL = "auto"  # "low", "high" or "auto"
+
+# Pause between sequential requests to respect API rate limits (adjust as needed)
+REQUEST_DELAY_SECONDS = 1.5
+
+# Consecutive frames described per request; above 1, the frames share one prompt and the model answers in JSON
+FRAMES_PER_REQUEST = 1
+
+SYSTEM_PROMPT = "You are an AI trained to generate detailed descriptions of first-person images. These images are generated from a person named Keegan wearing a head-mounted camcorder continuously for a week."
+
+# Running totals of what the payload preprocessing saved on requests actually sent, reported at the end of each run
+payload_stats = {"images": 0, "original_bytes": 0, "sent_bytes": 0, "original_tokens": 0, "sent_tokens": 0}
+
+# Sizes of preprocessed images not yet sent or answered from the cache: {base64 payload: [sizes, ...]}
+_pending_payloads = {}
+
+# Function to estimate how many input tokens an image is billed as
+def estimate_image_tokens(width, height, detail=IMAGE_DETAIL):
+    """Estimates image tokens with OpenAI's tiling rule (85 base + 170 per 512px tile after scaling).
+
+    Some models (e.g. gpt-4o-mini) bill a fixed multiple of this, so it is most useful for comparing sizes.
+    """
+    if detail == "low":
+        return 85
+
+    # Fit within 2048x2048, then scale the shortest side down to 768
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    if min(width, height) > 768:
+        scale = 768 / min(width, height)
+        width, height = width * scale, height * scale
+
+    tiles = math.ceil(width / 512) * math.ceil(height / 512)
+    return 85 + 170 * tiles
+
+# Function to shrink and JPEG-encode a decoded frame in memory
+def encode_frame(image, max_side=IMAGE_MAX_SIDE, quality=JPEG_QUALITY):
+    """Returns (JPEG bytes or None, resized image) for a frame resized to at most `max_side` pixels."""
+    height, width = image.shape[:2]
+    if max_side and max(width, height) > max_side:
+        scale = max_side / max(width, height)
+        image = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+    success, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return (buffer.tobytes() if success else None), image
+
+# Function to shrink and re-encode an image in memory before sending it
+def preprocess_image(image_path, max_side=IMAGE_MAX_SIDE, quality=JPEG_QUALITY):
+    """Returns base64 JPEG bytes for an image resized to at most `max_side` pixels, without writing any files.
+
+    Frames in a packed archive are decoded straight from its memory map.
+    """
+    data = read_frame_bytes(image_path)
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR) if len(data) else None
+    if image is None:
+        # Fall back to sending the file untouched if OpenCV can't decode it
+        return base64.b64encode(data).decode("utf-8")
+
+    height, width = image.shape[:2]
+    buffer, image = encode_frame(image, max_side, quality)
+    if buffer is None:
+        return base64.b64encode(data).decode("utf-8")
+
+    encoded = base64.b64encode(buffer).decode("utf-8")
+    _pending_payloads.setdefault(encoded, []).append({
+        "original_bytes": len(data), "sent_bytes": len(buffer),
+        "original_tokens": estimate_image_tokens(width, height), "sent_tokens": estimate_image_tokens(image.shape[1], image.shape[0]),
+    })
+    return encoded
+
+# Function to count a request's images in payload_stats once we know whether it is sent
+def settle_payloads(messages, sent):
+    """Drops the messages' images from the pending sizes, adding them to payload_stats only if the request is `sent`.
+
+    A request answered from the cache sends nothing, so it saves nothing either.
+    """
+    for message in messages:
+        if not isinstance(message["content"], list):
+            continue
+        for part in message["content"]:
+            if part.get("type") != "image_url":
+                continue
+            encoded = part["image_url"]["url"].split(",", 1)[-1]
+            pending = _pending_payloads.get(encoded)
+            if not pending:
+                continue
+            sizes = pending.pop()
+            if not pending:
+                del _pending_payloads[encoded]
+            if sent:
+                payload_stats["images"] += 1
+                for field, value in sizes.items():
+                    payload_stats[field] += value
+
+# Function to print how much the payload preprocessing saved
+def report_payload_savings():
+    """Prints bytes and estimated image tokens saved by resizing frames this run."""
+    stats = payload_stats
+    if not stats["images"]:
+        return
+    saved_bytes = stats["original_bytes"] - stats["sent_bytes"]
+    saved_tokens = stats["original_tokens"] - stats["sent_tokens"]
+    print(f"Image payloads: sent {stats['sent_bytes'] / 1024 / 1024:.1f} MB instead of {stats['original_bytes'] / 1024 / 1024:.1f} MB "
+          f"({saved_bytes / max(stats['original_bytes'], 1):.0%} smaller), ~{stats['sent_tokens']} image tokens instead of "
+          f"~{stats['original_tokens']} ({saved_tokens} saved) over {stats['images']} images")
+
+# Function to build the chat messages for one image
+def build_messages(image_path):
+    """Builds the system and user messages asking for a description of one image file."""
+    return build_image_messages(preprocess_image(image_path))
+
+# Function to build the chat messages for an already base64-encoded JPEG
+def build_image_messages(encoded_image):
+    """Builds the system and user messages asking for a description of one base64 JPEG."""
+    prompt = "Describe this image from Keegan's camcorder in 3-4 sentences, focusing on details and context."
+
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": [
+            {"type": "text", "text": prompt},
+            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{encoded_image}", "detail": IMAGE_DETAIL}}
+        ]}
+    ]
+
+# Function to build one request describing several consecutive frames
+def build_multi_frame_messages(encoded_images, labels):
+    """Builds messages asking for a JSON description of each base64 JPEG, labelled with its timestamp."""
+    prompt = (f"These are {len(encoded_images)} consecutive frames from Keegan's camcorder. Describe each frame in 3-4 sentences, "
+              "focusing on details and context. Reply with a JSON object of the form "
+              '{"frames": [{"frame": 1, "timestamp": "...", "description": "..."}, ...]} with one entry per frame, in order.')
+
+    content = [{"type": "text", "text": prompt}]
+    for number, (encoded_image, label) in enumerate(zip(encoded_images, labels), start=1):
+        content.append({"type": "text", "text": f"Frame {number} ({label}):"})
+        content.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{encoded_image}", "detail": IMAGE_DETAIL}})
+
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": content}
+    ]
+
+# Function to split a multi-frame response into per-frame descriptions
+def parse_frame_descriptions(content, count):
+    """Returns `count` descriptions in frame order, with None for any frame the response didn't cover."""
+    try:
+        frames = json.loads(content)["frames"]
+    except (ValueError, KeyError, TypeError):
+        return [None] * count
+
+    descriptions = [None] * count
+    for frame in frames if isinstance(frames, list) else []:
+        if not isinstance(frame, dict):
+            continue
+        number, description = frame.get("frame"), frame.get("description")
+        if isinstance(number, int) and 1 <= number <= count and isinstance(description, str) and description.strip():
+            descriptions[number - 1] = description.strip()
+    return descriptions
+
+# Function to decide whether a response can be reused on later runs
+def is_cacheable(choice, images=1, response_format=None):
+    """True if the model finished normally and, for a multi-frame JSON request, described every frame.
+
+    A truncated (finish_reason "length") or malformed reply would otherwise be replayed on every rerun.
+    """
+    if not is_complete(choice.finish_reason, choice.message.content):
+        return False
+    return not response_format or None not in parse_frame_descriptions(choice.message.content, images)
 
 # Function to generate a summary using the specified model
 def generate_summary(image_path, max_tokens=150):
     """Generates a 3-4 sentence summary for an image using the specified model."""
-    encoded_image = encode_image(image_path)
+    return summarize_messages(build_messages(image_path), image_path, max_tokens)
 
-    prompt = "Describe this image from Keegan's camcorder in 3-4 sentences, focusing on details and context."
+# Function to generate a summary for JPEG bytes held in memory
+def generate_summary_from_jpeg(jpeg_bytes, label, max_tokens=150):
+    """Generates a summary for an in-memory JPEG; `label` names it in error messages."""
+    encoded_image = base64.b64encode(jpeg_bytes).decode("utf-8")
+    return summarize_messages(build_image_messages(encoded_image), label, max_tokens)
+
+# Function to describe several consecutive images in one request
+def generate_summaries(image_paths, max_tokens=150):
+    """Returns one summary per image, from a single JSON-mode request covering all of them.
 
+    Frames the response leaves out are described with their own single-frame request.
+    """
+    labels = [os.path.splitext(os.path.basename(path))[0] for path in image_paths]
+    messages = build_multi_frame_messages([preprocess_image(path) for path in image_paths], labels)
+    # Room for every frame's description plus the JSON around them
+    content = summarize_messages(messages, ", ".join(labels), max_tokens * len(image_paths) + 100, {"type": "json_object"}, len(image_paths))
+    if content == "Error generating summary":
+        return [content] * len(image_paths)
+
+    descriptions = parse_frame_descriptions(content, len(image_paths))
+    return [description or generate_summary(path, max_tokens) for path, description in zip(image_paths, descriptions)]
+
+# Function to send image messages to the model
+def summarize_messages(messages, label, max_tokens=150, response_format=None, images=1):
+    """Returns the model's description for prepared image messages, consulting the response cache first."""
+    # Reuse the response from an earlier run if the image, prompt, model and max_tokens are unchanged
+    cache = get_cache()
+    key = cache_key(model_to_use, messages, max_tokens)
+    cached = cache.get(key)
+    settle_payloads(messages, sent=cached is None)
+    if cached is not None:
+        return cached
+
+    telemetry = get_telemetry()
+    start = time.perf_counter()
     try:
-        response = client.chat.completions.create(
+        # The raw response also says how many automatic retries the client needed
+        raw_response = get_client().chat.completions.with_raw_response.create(
             model=model_to_use,
-            messages=[
-                {"role": "system", "content": "You are an AI trained to generate detailed descriptions of first-person images. These images are generated from a person named Keegan wearing a head-mounted camcorder continuously for a week."},
-                {"role": "user", "content": [
-                    {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{encoded_image}"}}
-                ]}
-            ],
-            max_tokens=max_tokens
+            messages=messages,
+            max_tokens=max_tokens,
+            **({"response_format": response_format} if response_format else {})
         )
-        return response.choices[0].message.content
-    
+        response = raw_response.parse()
+        telemetry.record_api_call("chat.completions", model_to_use, time.perf_counter() - start,
+                                  response.usage, getattr(raw_response, "retries_taken", 0))
+        summary = response.choices[0].message.content
+        if is_cacheable(response.choices[0], images, response_format):
+            cache.put(key, summary)
+        return summary
+
     except OpenAIError as e:
-        print(f"Error processing {image_path}: {e}")
+        telemetry.record_api_call("chat.completions", model_to_use, time.perf_counter() - start, error=e)
+        print(f"Error processing {label}: {e}")
         return "Error generating summary"
 
-# Function to process all images in a folder and save each summary separately
-def process_images(image_folder):
-    """Processes all images in a folder and saves each summary in a text file."""
+class TokenBucketLimiter:
+    """Async rate limiter with one token bucket for requests per minute and one for tokens per minute."""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.capacity = {"requests": requests_per_minute, "tokens": tokens_per_minute}
+        self.available = dict(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        for bucket, capacity in self.capacity.items():
+            self.available[bucket] = min(capacity, self.available[bucket] + elapsed * capacity / 60)
+
+    async def acquire(self, tokens):
+        """Waits until one request and `tokens` tokens are available, then takes them."""
+        # A single request larger than the whole bucket would otherwise wait forever
+        tokens = min(tokens, self.capacity["tokens"])
+        while True:
+            async with self.lock:
+                self._refill()
+                if self.available["requests"] >= 1 and self.available["tokens"] >= tokens:
+                    self.available["requests"] -= 1
+                    self.available["tokens"] -= tokens
+                    return
+                wait = max(
+                    (1 - self.available["requests"]) * 60 / self.capacity["requests"],
+                    (tokens - self.available["tokens"]) * 60 / self.capacity["tokens"],
+                )
+            # Sleep without the lock so other waiters can take whatever frees up first, then check again
+            await asyncio.sleep(wait)
+
+    def refund(self, tokens):
+        """Returns unused reserved tokens (or charges extra ones, if negative) once the real usage is known."""
+        self._refill()
+        self.available["tokens"] = min(self.capacity["tokens"], self.available["tokens"] + tokens)
+
+    def pause(self, seconds):
+        """Drains the request bucket so nothing is sent for roughly `seconds`, e.g. after a 429."""
+        self._refill()
+        self.available["requests"] = min(self.available["requests"], 1 - seconds * self.capacity["requests"] / 60)
+
+def get_retry_after(error, attempt):
+    """Returns how long to wait after a rate limit error, preferring the server's Retry-After header."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for header in ("retry-after-ms", "retry-after"):
+        value = headers.get(header)
+        if value:
+            try:
+                seconds = float(value)
+                return seconds / 1000 if header == "retry-after-ms" else seconds
+            except ValueError:
+                pass
+    return min(2 ** attempt, 60)
+
+# Async version of generate_summary that respects a shared rate limiter
+async def generate_summary_async(image_path, limiter, max_tokens=150, max_retries=6):
+    """Generates a summary for an image, waiting on `limiter` and backing off on 429s."""
+    return await summarize_messages_async(build_messages(image_path), image_path, limiter, max_tokens, max_retries)
+
+# Async version of generate_summaries
+async def generate_summaries_async(image_paths, limiter, max_tokens=150, max_retries=6):
+    """Returns one summary per image from a single JSON-mode request, falling back to single-frame requests for gaps."""
+    labels = [os.path.splitext(os.path.basename(path))[0] for path in image_paths]
+    messages = build_multi_frame_messages([preprocess_image(path) for path in image_paths], labels)
+    content = await summarize_messages_async(messages, ", ".join(labels), limiter, max_tokens * len(image_paths) + 100,
+                                             max_retries, len(image_paths), {"type": "json_object"})
+    if content == "Error generating summary":
+        return [content] * len(image_paths)
+
+    descriptions = parse_frame_descriptions(content, len(image_paths))
+    return [description or await generate_summary_async(path, limiter, max_tokens, max_retries)
+            for path, description in zip(image_paths, descriptions)]
+
+# Function to send image messages to the model under a shared rate limiter
+async def summarize_messages_async(messages, label, limiter, max_tokens=150, max_retries=6, images=1, response_format=None):
+    """Returns the model's response for prepared image messages, waiting on `limiter` and backing off on 429s."""
+    reserved = ESTIMATED_PROMPT_TOKENS * images + max_tokens
+
+    cache = get_cache()
+    key = cache_key(model_to_use, messages, max_tokens)
+    cached = cache.get(key)
+    settle_payloads(messages, sent=cached is None)
+    if cached is not None:
+        return cached
+
+    telemetry = get_telemetry()
+    error = None
+    for attempt in range(max_retries + 1):
+        await limiter.acquire(reserved)
+        start = time.perf_counter()
+        try:
+            # The SDK's own retries are off so that 429s feed the rate limiter
+            response = await get_async_client(max_retries=0).chat.completions.create(
+                model=model_to_use,
+                messages=messages,
+                max_tokens=max_tokens,
+                **({"response_format": response_format} if response_format else {})
+            )
+            telemetry.record_api_call("chat.completions", model_to_use, time.perf_counter() - start, response.usage, attempt)
+            if response.usage:
+                limiter.refund(reserved - response.usage.total_tokens)
+            summary = response.choices[0].message.content
+            if is_cacheable(response.choices[0], images, response_format):
+                cache.put(key, summary)
+            return summary
+
+        except openai.RateLimitError as e:
+            error = e
+            # A refused or failed request used none of the tokens it reserved, so give them back
+            limiter.refund(reserved)
+            wait = get_retry_after(e, attempt)
+            print(f"Rate limited on {label}, retrying in {wait:.1f}s")
+            limiter.pause(wait)
+            await asyncio.sleep(wait)
+        except (openai.APIConnectionError, openai.InternalServerError) as e:
+            error = e
+            limiter.refund(reserved)
+            await asyncio.sleep(min(2 ** attempt, 60))
+        except OpenAIError as e:
+            limiter.refund(reserved)
+            telemetry.record_api_call("chat.completions", model_to_use, time.perf_counter() - start, retries=attempt, error=e)
+            print(f"Error processing {label}: {e}")
+            return "Error generating summary"
+
+    telemetry.record_api_call("chat.completions", model_to_use, time.perf_counter() - start, retries=max_retries, error=error)
+    print(f"Error processing {label}: gave up after {max_retries + 1} attempts")
+    return "Error generating summary"
+
+# Function to find where summaries for an image folder are saved
+def get_output_folder(image_folder):
+    """Returns the raw summaries folder next to `image_folder`, named after the model if fine-tuned."""
     base_output_folder = os.path.dirname(image_folder)
-    
+
     # Include model ID in folder name if a fine-tuned model is used
     if fine_tuned_model_id:
         model_id_safe = fine_tuned_model_id.replace(":", "_")  # Replace colons to make it a valid folder name
-        output_folder = os.path.join(base_output_folder, f"raw_summaries_{model_id_safe}")
-    else:
-        output_folder = os.path.join(base_output_folder, "raw_summaries")
+        return os.path.join(base_output_folder, f"raw_summaries_{model_id_safe}")
+    return os.path.join(base_output_folder, "raw_summaries")
 
-    os.makedirs(output_folder, exist_ok=True)
+# Function to list the images that need a summary
+def get_image_files(image_folder):
+    """Returns the sorted images to summarize and the {representative: [duplicates]} dedup mapping.
 
-    image_files = sorted([f for f in os.listdir(image_folder) if f.lower().endswith(('.png', '.jpg', '.jpeg'))])
+    Frames rejected by frame_quality are left out, along with any near-duplicates they represent.
+    """
+    image_files = list_frames(image_folder)
 
     print(f"Found {len(image_files)} images in '{image_folder}'. Processing with model: {model_to_use}...")
 
-    for img_file in tqdm(image_files, desc="Processing Images"):
-        img_path = os.path.join(image_folder, img_file)
+    # If frame_quality has been run, skip frames too dark, blurred or occluded to be worth describing
+    rejected = load_rejected(image_folder)
+    if rejected:
+        image_files = [f for f in image_files if f not in rejected]
+        print(f"Using quality manifest: skipping {len(rejected)} unusable frames.")
+
+    # If frame_dedup has been run, only summarize one representative per group of near-duplicate frames
+    duplicates = load_manifest(image_folder) or {}
+    if duplicates:
+        skipped = {dup for dups in duplicates.values() for dup in dups}
+        image_files = [f for f in image_files if f not in skipped]
+        print(f"Using dedup manifest: summarizing {len(image_files)} representative frames, reusing summaries for {len(skipped)} near-duplicates.")
 
-        # Generate a text summary
-        summary = generate_summary(img_path)
+    return image_files, duplicates
 
-        # Save the summary in raw_summaries/ with the same name as the image
-        summary_filename = os.path.join(output_folder, f"{os.path.splitext(img_file)[0]}.txt")
-        with open(summary_filename, "w") as f:
+# Function to save one image's summary
+def save_summary(output_folder, img_file, summary, duplicates):
+    """Saves a summary in raw_summaries/ with the same name as the image, and for any near-duplicates it represents."""
+    summary_filename = os.path.join(output_folder, f"{os.path.splitext(img_file)[0]}.txt")
+    with open(summary_filename, "w") as f:
+        f.write(summary)
+
+    # Give skipped near-duplicates the representative's summary so the timeline stays complete
+    for dup_file in duplicates.get(img_file, []):
+        with open(os.path.join(output_folder, f"{os.path.splitext(dup_file)[0]}.txt"), "w") as f:
             f.write(summary)
 
-        print(f"Summary saved: {summary_filename}")
+    return summary_filename
+
+# Function to process all images in a folder and save each summary separately
+def process_images(image_folder):
+    """Processes all images in a folder and saves each summary in a text file. Returns the number that failed."""
+    output_folder = get_output_folder(image_folder)
+    os.makedirs(output_folder, exist_ok=True)
+
+    image_files, duplicates = get_image_files(image_folder)
+    cache = get_cache()
+    telemetry = get_telemetry()
+
+    # Runs of FRAMES_PER_REQUEST consecutive frames, each described by one request
+    chunks = [image_files[i:i + FRAMES_PER_REQUEST] for i in range(0, len(image_files), FRAMES_PER_REQUEST)]
+    failed = 0
+
+    for chunk in tqdm(chunks, desc="Processing Images"):
+        img_paths = [os.path.join(image_folder, img_file) for img_file in chunk]
+
+        # Generate a text summary per frame
+        hits = cache.hits
+        with telemetry.item("process_images", image=chunk[0], frames=len(chunk)):
+            summaries = generate_summaries(img_paths) if len(chunk) > 1 else [generate_summary(img_paths[0])]
+
+        for img_file, summary in zip(chunk, summaries):
+            summary_filename = save_summary(output_folder, img_file, summary, duplicates)
+            print(f"Summary saved: {summary_filename}")
+            failed += summary == "Error generating summary"
+
+        # Respect API rate limits; cached summaries made no API call
+        if cache.hits == hits:
+            time.sleep(REQUEST_DELAY_SECONDS)
+
+    print(f"All summaries saved in '{output_folder}/'")
+    cache.report()
+    report_payload_savings()
+    return failed
+
+# Concurrent version of process_images, limited by concurrency and the account's RPM/TPM limits
+async def process_images_async(image_folder, concurrency=16, requests_per_minute=500, tokens_per_minute=200000):
+    """Summarizes all images in a folder concurrently, saving each summary as soon as it completes.
+
+    Returns the number of images whose summary failed.
+    """
+    output_folder = get_output_folder(image_folder)
+    os.makedirs(output_folder, exist_ok=True)
+
+    image_files, duplicates = get_image_files(image_folder)
+
+    limiter = TokenBucketLimiter(requests_per_minute, tokens_per_minute)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def summarize(chunk):
+        img_paths = [os.path.join(image_folder, img_file) for img_file in chunk]
+        async with semaphore:
+            start = time.perf_counter()
+            if len(chunk) > 1:
+                summaries = await generate_summaries_async(img_paths, limiter)
+            else:
+                summaries = [await generate_summary_async(img_paths[0], limiter)]
+            get_telemetry().record_item("process_images", time.perf_counter() - start, image=chunk[0], frames=len(chunk))
+        return chunk, summaries
 
-        # Respect API rate limits (adjust delay as needed)
-        time.sleep(1.5)
+    chunks = [image_files[i:i + FRAMES_PER_REQUEST] for i in range(0, len(image_files), FRAMES_PER_REQUEST)]
+    tasks = [asyncio.create_task(summarize(chunk)) for chunk in chunks]
+    failed = 0
+    for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Processing Images"):
+        chunk, summaries = await task
+        for img_file, summary in zip(chunk, summaries):
+            save_summary(output_folder, img_file, summary, duplicates)
+            failed += summary == "Error generating summary"
 
     print(f"All summaries saved in '{output_folder}/'")
+    get_cache().report()
+    report_payload_savings()
+    return failed
 
 # Run the script
 if __name__ == "__main__":
     image_folder = "/Users/keeganh/Documents/Monday/extracted_frames"
-    process_images(image_folder)
+    use_async = True  # Set to False to summarize one image at a time
+    with get_telemetry().stage("process_images"):
+        if use_async:
+            asyncio.run(process_images_async(image_folder, concurrency=16))
+        else:
+            process_images(image_folder)
+    get_telemetry().report()
@@ -0,0 +1,28 @@
+import re
+import hashlib
+import numpy as np
+
+# MinHash over word shingles, used to estimate how similar two texts are without comparing them word by word
+NUM_PERMUTATIONS = 64
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = np.random.default_rng(0)
+_PERM_A = _rng.integers(1, _MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, _MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+
+# Function to compute a MinHash signature for near-duplicate detection
+def minhash_signature(text, shingle_size):
+    """Returns a NUM_PERMUTATIONS MinHash signature over `shingle_size`-word shingles of the normalized text."""
+    words = re.sub(r"[^a-z0-9 ]", " ", text.lower()).split()
+    shingles = {" ".join(words[i:i + shingle_size]) for i in range(max(len(words) - shingle_size + 1, 1))}
+    hashes = np.array([int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles], dtype=np.uint64)
+    hashes %= np.uint64(_MERSENNE_PRIME)
+
+    # Multiply-add hash (wrapping at 64 bits) for every permutation at once, then the minimum per permutation
+    with np.errstate(over="ignore"):
+        permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % np.uint64(_MERSENNE_PRIME)
+    return permuted.min(axis=1)
+
+def estimated_similarity(signature, other):
+    """Estimates the Jaccard similarity of two texts' shingle sets from their signatures."""
+    return np.mean(signature == other)
@@ -0,0 +1,30 @@
+import os
+import asyncio
+import openai
+import dotenv
+
+# OpenAI clients, created on first use so importing a module doesn't read .env or build a client
+# (set OPENAI_BASE_URL to point them at a local stand-in, e.g. benchmark.py's mock server)
+_client = None
+_async_clients = {}
+
+def get_client():
+    """Returns the shared OpenAI client, loading the API key from .env on first use."""
+    global _client
+    if _client is None:
+        dotenv.load_dotenv()
+        _client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
+
+def get_async_client(max_retries=openai.DEFAULT_MAX_RETRIES):
+    """Returns an async client for the running event loop (its connections can't be shared between loops).
+
+    Callers that retry requests themselves can pass max_retries=0; each setting gets its own client.
+    """
+    loop = asyncio.get_running_loop()
+    cached = _async_clients.get(max_retries)
+    if cached is None or cached[0] is not loop:
+        dotenv.load_dotenv()
+        cached = (loop, openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=max_retries))
+        _async_clients[max_retries] = cached
+    return cached[1]
@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import fcntl
+import asyncio
+import hashlib
+import argparse
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import frame_extracter
+import frame_quality
+import frame_dedup
+import image_summarizer
+import summary_hierarchy
+import generate_jsonl
+import fine_tune
+from frame_archive import IMAGE_EXTENSIONS, ARCHIVE_FILENAME, INDEX_FILENAME
+from telemetry import get_telemetry
+
+# Fingerprints of every stage that last completed, kept in the main directory: {node: fingerprint}
+STATE_FILENAME = ".pipeline_state.json"
+
+# Stages run for each day, in order (quality and dedup only when enabled), then the stages that combine every day
+DAY_STAGES = ("extract", "quality", "dedup", "describe", "summarize")
+GLOBAL_STAGES = ("jsonl", "fine_tune")
+
+# Files that make up a folder's frames, whether stored one per file or packed into an archive
+FRAME_FILES = IMAGE_EXTENSIONS + (ARCHIVE_FILENAME, INDEX_FILENAME)
+
+# Function to fingerprint a set of files without reading them
+def fingerprint_files(sources):
+    """Hashes the name, size and modification time of every matching file in each (folder or file, suffixes) source.
+
+    `suffixes` of None matches every file. Missing paths are part of the fingerprint too.
+    """
+    digest = hashlib.sha256()
+    for path, suffixes in sources:
+        entries = None
+        if os.path.isdir(path):
+            with os.scandir(path) as it:
+                entries = sorted(
+                    (entry.name, entry.stat().st_size, entry.stat().st_mtime_ns) for entry in it
+                    if entry.is_file() and (suffixes is None or entry.name.lower().endswith(suffixes))
+                )
+        elif os.path.isfile(path):
+            stat_result = os.stat(path)
+            entries = [(os.path.basename(path), stat_result.st_size, stat_result.st_mtime_ns)]
+        digest.update(json.dumps([path, entries]).encode("utf-8"))
+    return digest.hexdigest()
+
+def day_folders(config, day):
+    """Returns (day directory, frames folder, raw summaries folder) for a day."""
+    day_dir = os.path.join(config["main_directory"], day)
+    frames_folder = os.path.join(day_dir, "extracted_frames")
+    return day_dir, frames_folder, image_summarizer.get_output_folder(frames_folder)
+
+def training_file(config):
+    return config["output"] or generate_jsonl.default_output_path(config["main_directory"], config["days"], config["minute"])
+
+def fine_tuning_log(config):
+    return os.path.splitext(training_file(config))[0].replace("keegangpt_training", "fine_tuning_log") + ".txt"
+
+# Function to describe what a stage reads, writes and depends on
+def stage_spec(config, stage, day):
+    """Returns (input sources for fingerprint_files, outputs that must exist, settings that change the outputs)."""
+    main_directory = config["main_directory"]
+    if day is not None:
+        day_dir, frames_folder, raw_folder = day_folders(config, day)
+
+    if stage == "extract":
+        return [(day_dir, (".mp4",))], [frames_folder], [config["interval"], config["mode"], config["store"]]
+    elif stage == "quality":
+        return [(frames_folder, FRAME_FILES)], [os.path.join(frames_folder, frame_quality.MANIFEST_FILENAME)], [config["interval"], frame_quality.THRESHOLDS]
+    elif stage == "dedup":
+        # Rejected frames are left out of the groups, so the quality manifest is an input too
+        sources = [(frames_folder, FRAME_FILES + (frame_quality.MANIFEST_FILENAME,))]
+        return sources, [os.path.join(frames_folder, frame_dedup.MANIFEST_FILENAME)], [config["dedup_threshold"]]
+    elif stage == "describe":
+        # The quality and dedup manifests decide which frames get described
+        settings = [image_summarizer.model_to_use, image_summarizer.FRAMES_PER_REQUEST, image_summarizer.IMAGE_MAX_SIDE]
+        return [(frames_folder, FRAME_FILES + (".json",))], [raw_folder], settings
+    elif stage == "summarize":
+        day_summary = os.path.join(main_directory, "day_summaries", f"{day}.txt")
+        outputs = [os.path.join(day_dir, output_name) for _, output_name, _, _ in summary_hierarchy.HIERARCHY_LEVELS] + [day_summary]
+        return [(os.path.join(day_dir, "raw_summaries"), (".txt",))], outputs, [summary_hierarchy.ADAPTIVE_GROUPING, summary_hierarchy.COLLAPSE_DUPLICATES]
+    elif stage == "jsonl":
+        sources = [(os.path.join(main_directory, d, output_name), (".txt",)) for d in config["days"] for _, output_name, _, _ in summary_hierarchy.HIERARCHY_LEVELS]
+        sources.append((os.path.join(main_directory, "day_summaries"), (".txt",)))
+        return sources, [training_file(config)], [config["days"], config["minute"], config["include_context"]]
+    elif stage == "fine_tune":
+        return [(training_file(config), None)], [fine_tuning_log(config)], []
+    raise ValueError(f"Unknown stage '{stage}'")
+
+def node_fingerprint(config, stage, day):
+    sources, _, settings = stage_spec(config, stage, day)
+    return hashlib.sha256(json.dumps([fingerprint_files(sources), settings], default=str).encode("utf-8")).hexdigest()
+
+def is_up_to_date(config, state, node, stage, day):
+    """True if the stage last completed with the same inputs and settings, and its outputs are still there."""
+    _, outputs, _ = stage_spec(config, stage, day)
+    return state.get(node) == node_fingerprint(config, stage, day) and all(os.path.exists(path) for path in outputs)
+
+def load_state(main_directory):
+    state_path = os.path.join(main_directory, STATE_FILENAME)
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, "r") as f:
+        return json.load(f)
+
+def save_state(main_directory, state):
+    state_path = os.path.join(main_directory, STATE_FILENAME)
+    with open(state_path + ".tmp", "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(state_path + ".tmp", state_path)
+
+# Function to summarize one day's hierarchy, including its day summary
+async def summarize_day(config, day):
+    """Runs every summary level for a day concurrently. Returns the day summary's manifest entry, or None if it failed."""
+    day_summaries_dir = os.path.join(config["main_directory"], "day_summaries")
+    os.makedirs(day_summaries_dir, exist_ok=True)
+    day_manifest = summary_hierarchy.load_manifest(day_summaries_dir)
+    semaphore = asyncio.Semaphore(config["concurrency"])
+    stats = {"calls": 0, "api_seconds": 0.0}
+    await summary_hierarchy.generate_day_hierarchy_async(config["main_directory"], day, day_manifest, semaphore, stats)
+    return day_manifest.get(f"{day}.txt")
+
+def update_day_manifest(day_summaries_dir, day, fingerprint):
+    """Records one day's summary in the shared day_summaries manifest, which other days may be updating too."""
+    with open(os.path.join(day_summaries_dir, ".manifest.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        manifest = summary_hierarchy.load_manifest(day_summaries_dir)
+        if fingerprint:
+            manifest[f"{day}.txt"] = fingerprint
+        else:
+            manifest.pop(f"{day}.txt", None)
+        summary_hierarchy.save_manifest(day_summaries_dir, manifest)
+
+def all_recorded(folder):
+    """True if every summary in a folder is in its manifest, i.e. none of them failed."""
+    names = {f for f in os.listdir(folder) if f.endswith(".txt")}
+    return names <= summary_hierarchy.load_manifest(folder).keys()
+
+# Function to run one stage for one day (or for every day), in a worker process
+def run_stage(config, stage, day):
+    """Runs a stage. Returns True if it finished cleanly, False if some items failed and should be retried next run."""
+    with get_telemetry().stage(stage):
+        if day is not None:
+            day_dir, frames_folder, raw_folder = day_folders(config, day)
+
+        if stage == "extract":
+            failed = frame_extracter.process_videos(day_dir, config["interval"], config["mode"], config["extract_workers"],
+                                                    store=config["store"])
+            return not failed
+        elif stage == "quality":
+            frame_quality.filter_frames(day_dir, config["interval"])
+        elif stage == "dedup":
+            frame_dedup.dedup_frames(frames_folder, config["dedup_threshold"])
+        elif stage == "describe":
+            if config["concurrency"] > 1:
+                failed = asyncio.run(image_summarizer.process_images_async(frames_folder, config["concurrency"],
+                                                                           config["rpm"], config["tpm"]))
+            else:
+                failed = image_summarizer.process_images(frames_folder)
+            return not failed
+        elif stage == "summarize":
+            fingerprint = asyncio.run(summarize_day(config, day))
+            update_day_manifest(os.path.join(config["main_directory"], "day_summaries"), day, fingerprint)
+            folders = [os.path.join(day_dir, output_name) for _, output_name, _, _ in summary_hierarchy.HIERARCHY_LEVELS]
+            return fingerprint is not None and all(all_recorded(folder) for folder in folders)
+        elif stage == "jsonl":
+            generate_jsonl.generate_training_file(config["main_directory"], config["days"], training_file(config),
+                                                  config["minute"], config["include_context"])
+        elif stage == "fine_tune":
+            return fine_tune.run_fine_tune(training_file(config), fine_tuning_log(config)) is not None
+    return True
+
+def _run_node(config, stage, day):
+    """Worker entry point: runs a stage and returns (finished cleanly, seconds taken)."""
+    start = time.perf_counter()
+    complete = run_stage(config, stage, day)
+    return complete, time.perf_counter() - start
+
+# Function to lay out the stage graph
+def build_graph(config):
+    """Returns {node: (stage, day or None, dependencies)} for the enabled stages, in topological order.
+
+    Each day's stages form a chain; the global stages wait for every day's last stage.
+    """
+    enabled = [stage for stage in DAY_STAGES + GLOBAL_STAGES if stage in config["stages"]]
+    graph = {}
+    day_ends = []
+    for day in config["days"]:
+        previous = []
+        for stage in enabled:
+            if stage in DAY_STAGES:
+                node = f"{day}/{stage}"
+                graph[node] = (stage, day, previous)
+                previous = [node]
+        day_ends += previous
+
+    previous = day_ends
+    for stage in enabled:
+        if stage in GLOBAL_STAGES:
+            graph[stage] = (stage, None, previous)
+            previous = [stage]
+    return graph
+
+def split_rate_limits(config, jobs):
+    """Returns the config with its API rate limits divided between the describe stages that can run at once.
+
+    Each stage runs in its own process with its own limiter, so only an even share keeps them within the account's limits.
+    """
+    describers = max(1, min(jobs or os.cpu_count() or 1, len(config["days"])))
+    return dict(config, rpm=max(1, config["rpm"] / describers), tpm=max(1, config["tpm"] / describers))
+
+# Function to run every out-of-date stage, days in parallel
+def run_pipeline(config, jobs=None, force=False, dry_run=False):
+    """Runs the stage graph, starting each stage as soon as its dependencies finish and skipping up-to-date ones.
+
+    Up to `jobs` stages run at once in separate processes (None = one per CPU core), so different days can be in
+    different stages at the same time. Returns the set of nodes that failed.
+    """
+    config = split_rate_limits(config, jobs)
+    main_directory = config["main_directory"]
+    graph = build_graph(config)
+    state = {} if force else load_state(main_directory)
+    telemetry = get_telemetry()
+
+    if dry_run:
+        # A stage whose dependency runs may get new inputs, so assume it runs too
+        will_run = set()
+        for node, (stage, day, deps) in graph.items():
+            if any(dep in will_run for dep in deps) or not is_up_to_date(config, state, node, stage, day):
+                will_run.add(node)
+            print(f"{'run' if node in will_run else 'up to date':>10}  {node}")
+        return set()
+
+    pending = dict(graph)
+    finished = set()
+    failed = set()
+    running = {}
+
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as executor:
+        while pending or running:
+            # Start (or skip) every stage whose dependencies are done; skipping can make more stages ready
+            progress = True
+            while progress:
+                progress = False
+                for node, (stage, day, deps) in list(pending.items()):
+                    if any(dep in failed for dep in deps):
+                        print(f"Skipping {node}: a dependency failed")
+                        failed.add(node)
+                    elif not all(dep in finished for dep in deps):
+                        continue
+                    elif is_up_to_date(config, state, node, stage, day):
+                        print(f"Up to date: {node}")
+                        finished.add(node)
+                    else:
+                        print(f"Starting: {node}")
+                        running[executor.submit(_run_node, config, stage, day)] = node
+                    del pending[node]
+                    progress = True
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                stage, day, _ = graph[node]
+                try:
+                    complete, seconds = future.result()
+                except Exception:
+                    print(f"Failed: {node}\n{traceback.format_exc()}")
+                    failed.add(node)
+                    state.pop(node, None)
+                    save_state(main_directory, state)
+                    continue
+
+                telemetry.record_item("pipeline", seconds, node=node, complete=complete)
+                finished.add(node)
+                # Fingerprint the inputs as the stage left them; an unclean run is left unrecorded so it is retried
+                if complete:
+                    state[node] = node_fingerprint(config, stage, day)
+                    print(f"Finished: {node} ({seconds:.1f}s)")
+                else:
+                    state.pop(node, None)
+                    print(f"Finished with errors: {node} ({seconds:.1f}s), will retry next run")
+                save_state(main_directory, state)
+
+    if failed:
+        print(f"{len(failed)} stage(s) failed or were skipped: {', '.join(sorted(failed))}")
+    return failed
+
+# Run the script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the KeeganGPT pipeline, skipping stages whose outputs are up to date.")
+    parser.add_argument("days", nargs="+", help="Day folders to process, in order (e.g. Sunday Monday)")
+    parser.add_argument("--main-directory", default="/Users/keeganh/Documents", help="Folder containing the day folders")
+    parser.add_argument("--stages", nargs="+", choices=DAY_STAGES + GLOBAL_STAGES, default=["extract", "describe", "summarize", "jsonl"],
+                        help="Stages to run (fine_tune, quality and dedup are opt-in)")
+    parser.add_argument("--jobs", type=int, default=None, help="Stages run at once (default: one per CPU core)")
+    parser.add_argument("--force", action="store_true", help="Rerun every stage, ignoring the saved fingerprints")
+    parser.add_argument("--dry-run", action="store_true", help="Only print which stages would run")
+    parser.add_argument("--interval", type=int, default=30, help="Extract a frame every N seconds")
+    parser.add_argument("--mode", default="sequential", choices=frame_extracter.EXTRACTION_MODES, help="Frame extraction mode")
+    parser.add_argument("--store", default="files", choices=frame_extracter.FRAME_STORES, help="How extracted frames are stored")
+    parser.add_argument("--extract-workers", type=int, default=1, help="Extraction processes per day")
+    parser.add_argument("--dedup-threshold", type=int, default=5, help="Hash distance under which frames are near-duplicates")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent API requests per day (1 = one at a time)")
+    parser.add_argument("--rpm", type=int, default=500, help="API requests per minute, shared by the days described at once")
+    parser.add_argument("--tpm", type=int, default=200000, help="API tokens per minute, shared by the days described at once")
+    parser.add_argument("--no-minute", dest="minute", action="store_false", help="Leave minute summaries out of the training file")
+    parser.add_argument("--include-context", action="store_true", help="Add coarser-level summaries to each example's system prompt")
+    parser.add_argument("--output", help="Training file path (default: keegangpt_training[_minute]_<last day>.jsonl)")
+    args = parser.parse_args()
+
+    config = {
+        "main_directory": args.main_directory, "days": args.days, "stages": args.stages, "interval": args.interval,
+        "mode": args.mode, "store": args.store, "extract_workers": args.extract_workers, "dedup_threshold": args.dedup_threshold,
+        "concurrency": args.concurrency, "rpm": args.rpm, "tpm": args.tpm, "minute": args.minute, "include_context": args.include_context, "output": args.output,
+    }
+    with get_telemetry().stage("pipeline"):
+        run_pipeline(config, args.jobs, args.force, args.dry_run)
+    get_telemetry().report()
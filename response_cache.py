@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+# Default cache location (override with the KEEGANGPT_CACHE environment variable)
+CACHE_PATH = os.getenv("KEEGANGPT_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "keegangpt", "responses.sqlite"))
+
+# Evict least recently used responses once the cached text exceeds this many bytes
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Function to build a cache key for one chat completion request
+def cache_key(model, messages, max_tokens):
+    """Hashes everything that determines a response: model, full messages (prompt template and content) and max_tokens."""
+    payload = json.dumps({"model": model, "messages": messages, "max_tokens": max_tokens}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# Function to check that a response is worth caching
+def is_complete(finish_reason, content):
+    """True if the model finished on its own. A reply cut off at max_tokens, or with no content, would be replayed forever."""
+    return finish_reason == "stop" and content is not None
+
+class ResponseCache:
+    """Persistent SQLite cache of API responses with size-based LRU eviction and hit/miss counters."""
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.conn.commit()
+        # Running size of the cached text, so put doesn't have to add up the whole table
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        """Returns the cached response for `key`, or None on a miss."""
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            return row[0]
+
+    def put(self, key, value):
+        """Stores a response, then evicts the least recently used entries if the cache is over its size limit.
+
+        None (a refusal or empty response) is not cached, so the request is made again next time.
+        """
+        if value is None:
+            return
+        size = len(value.encode("utf-8"))
+        with self.lock:
+            replaced = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time())
+            )
+            self.total_bytes += size - (replaced[0] if replaced else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        # Other processes share the file, so recount before deciding what to evict
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if self.total_bytes <= self.max_bytes:
+            return
+        freed = 0
+        stale = []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if self.total_bytes - freed <= self.max_bytes:
+                break
+            stale.append((key,))
+            freed += size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        self.total_bytes -= freed
+
+    def stats(self):
+        """Returns hit/miss counters for this run and the current size of the cache."""
+        with self.lock:
+            entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def report(self):
+        """Prints the hit/miss counters."""
+        stats = self.stats()
+        print(f"Response cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), "
+              f"{stats['entries']} entries / {stats['bytes'] / 1024 / 1024:.1f} MB in {self.path}")
+
+_cache = None
+
+# Function to get the shared cache, opening it on first use
+def get_cache():
+    """Returns the process-wide ResponseCache."""
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
@@ -0,0 +1,164 @@
+import os
+import time
+import queue
+import threading
+import frame_extracter
+import image_summarizer
+from response_cache import get_cache
+from telemetry import get_telemetry
+import summary_hierarchy
+from summary_hierarchy import iter_groups, summarize_text, summary_path, interval_fingerprint, load_manifest, save_manifest, collapse_near_duplicates
+
+# Bounded queue sizes and worker count; together they cap how many frames are held in memory at once
+FRAME_QUEUE_SIZE = 16
+SUMMARY_WORKERS = 8
+MAX_IN_FLIGHT = 64
+
+# Stage 1: decode sampled frames and hand them on as in-memory JPEG bytes
+def decode_videos(video_files, interval_seconds, mode, frame_queue, in_flight, num_workers, frames_folder=None):
+    """Decodes every video in order, putting (seq, timestamp, jpeg bytes, decode time) on `frame_queue`."""
+    seq = 0
+    for video in video_files:
+        print(f"Streaming: {video}")
+        try:
+            for frame_timestamp, frame in frame_extracter.iter_frames(video, interval_seconds, mode):
+                if frames_folder:
+                    frame_extracter.save_frame(frame, frames_folder, frame_timestamp)
+
+                jpeg_bytes, _ = image_summarizer.encode_frame(frame)
+                if jpeg_bytes is None:
+                    continue
+
+                # Both of these block when downstream stages fall behind, which keeps memory flat
+                in_flight.acquire()
+                frame_queue.put((seq, frame_timestamp, jpeg_bytes, time.perf_counter()))
+                seq += 1
+        except Exception as e:
+            print(f"Error streaming {video}: {e}")
+
+    for _ in range(num_workers):
+        frame_queue.put(None)
+
+# Stage 2: describe each frame and save its raw summary
+def summarize_frames(frame_queue, summary_queue, raw_folder):
+    """Takes frames off `frame_queue`, writes raw_summaries/<timestamp>.txt and passes the summary on."""
+    while True:
+        item = frame_queue.get()
+        if item is None:
+            summary_queue.put(None)
+            return
+
+        seq, frame_timestamp, jpeg_bytes, decoded_at = item
+        name = frame_timestamp.strftime("%Y-%m-%d_%H-%M-%S")
+        try:
+            summary = image_summarizer.generate_summary_from_jpeg(jpeg_bytes, name)
+        except Exception as e:
+            print(f"Error processing {name}: {e}")
+            summary = "Error generating summary"
+
+        with open(os.path.join(raw_folder, f"{name}.txt"), "w") as f:
+            f.write(summary)
+
+        summary_queue.put((seq, frame_timestamp, summary, decoded_at))
+
+# Function to put worker results back into decode order
+def ordered_summaries(summary_queue, in_flight, num_workers, decode_times):
+    """Yields (timestamp, summary) in decode order, buffering results that finish early.
+
+    Each frame's decode time goes in `decode_times` under its sequence number, which is also its position in the output.
+    """
+    pending = {}
+    next_seq = 0
+    finished = 0
+
+    while finished < num_workers:
+        item = summary_queue.get()
+        if item is None:
+            finished += 1
+            continue
+
+        pending[item[0]] = item
+        while next_seq in pending:
+            seq, frame_timestamp, summary, decoded_at = pending.pop(next_seq)
+            next_seq += 1
+            in_flight.release()
+            decode_times[seq] = decoded_at
+            yield frame_timestamp, summary
+
+# Run the streaming pipeline for one day's directory
+def stream_day(directory, interval_seconds=30, mode="sequential", workers=SUMMARY_WORKERS, save_frames=False):
+    """Decodes, describes and minute-summarizes a day's videos in one pass through bounded queues.
+
+    Raw summaries and minute summaries are written as soon as they are ready. With `save_frames`, the sampled
+    frames are also written to extracted_frames/ for the other stages.
+    """
+    video_files = frame_extracter.get_sorted_videos(directory)
+    print(f"Found {len(video_files)} video(s) in '{directory}'.")
+
+    frames_folder = os.path.join(directory, "extracted_frames")
+    raw_folder = image_summarizer.get_output_folder(frames_folder)
+    minute_folder = os.path.join(directory, "minute_summaries")
+    for folder in ([frames_folder] if save_frames else []) + [raw_folder, minute_folder]:
+        os.makedirs(folder, exist_ok=True)
+
+    frame_queue = queue.Queue(maxsize=FRAME_QUEUE_SIZE)
+    summary_queue = queue.Queue(maxsize=FRAME_QUEUE_SIZE)
+    in_flight = threading.BoundedSemaphore(MAX_IN_FLIGHT)
+    decode_times = {}
+
+    threads = [threading.Thread(
+        target=decode_videos,
+        args=(video_files, interval_seconds, mode, frame_queue, in_flight, workers, frames_folder if save_frames else None),
+        daemon=True
+    )]
+    threads += [threading.Thread(target=summarize_frames, args=(frame_queue, summary_queue, raw_folder), daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    # Stage 3: minute summaries, written as soon as the next minute's first frame closes the interval
+    manifest = load_manifest(minute_folder)
+    latencies = []
+    start = time.perf_counter()
+    # Sequence number of the first frame of the next group; frames sharing a timestamp still get their own entry
+    next_seq = 0
+
+    for start_time, group, group_timestamps in iter_groups(ordered_summaries(summary_queue, in_flight, workers, decode_times), 1):
+        summary_filename = summary_path(minute_folder, start_time)
+        texts, timestamps = group, group_timestamps
+        if summary_hierarchy.COLLAPSE_DUPLICATES:
+            texts, timestamps = collapse_near_duplicates(group, group_timestamps, "minute")
+        if len(texts) == 1:
+            summarized_text = texts[0]
+        else:
+            summarized_text = summarize_text(texts, timestamps, "minute")
+        with open(summary_filename, "w") as f:
+            f.write(summarized_text)
+
+        if summarized_text != "Error generating summary.":
+            manifest[os.path.basename(summary_filename)] = interval_fingerprint(group, group_timestamps, "minute")
+
+        last_seq = next_seq + len(group) - 1
+        latencies.append(time.perf_counter() - decode_times[last_seq])
+        for seq in range(next_seq, last_seq + 1):
+            del decode_times[seq]
+        next_seq = last_seq + 1
+        print(f"Saved minute summary: {summary_filename} ({latencies[-1]:.1f}s after its last frame was decoded)")
+
+    for thread in threads:
+        thread.join()
+    save_manifest(minute_folder, manifest)
+
+    if latencies:
+        latencies.sort()
+        print(f"{len(latencies)} minute summaries in {time.perf_counter() - start:.1f}s; decode-to-summary latency "
+              f"median {latencies[len(latencies) // 2]:.1f}s, max {latencies[-1]:.1f}s")
+    get_cache().report()
+
+# Run the script
+if __name__ == "__main__":
+    N = 30  # Sample a frame every N seconds
+    day_list = ["Monday"]
+    for day in day_list:
+        with get_telemetry().stage("stream_day"):
+            stream_day(f"/Users/keeganh/Documents/{day}", interval_seconds=N, save_frames=True)
+    get_telemetry().report()
@@ -1,14 +1,53 @@
 import os
+import json
+import time
+import asyncio
+import hashlib
 import openai
-import dotenv
+from openai_client import get_client, get_async_client
+from response_cache import get_cache, cache_key, is_complete
+from minhash import minhash_signature, estimated_similarity
+from telemetry import get_telemetry
 from datetime import datetime, timedelta
 
-# Load API Key from .env file
-dotenv.load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-
-# Initialize OpenAI Client
-client = openai.OpenAI(api_key=api_key)
+# Tokenizer for budget-aware grouping; falls back to a ~4 characters per token estimate without tiktoken
+try:
+    import tiktoken
+    encoding = tiktoken.get_encoding("o200k_base")
+except ImportError:
+    encoding = None
+
+# Adaptive grouping (off by default): per level, merge adjacent groups under `min_input` prompt tokens, split
+# groups over `max_input` prompt tokens into sub-summaries, and cap each response at `max_tokens`
+ADAPTIVE_GROUPING = False
+TOKEN_BUDGETS = {
+    "minute": {"min_input": 200, "max_input": 4000, "max_tokens": 300},
+    "ten_minute": {"min_input": 400, "max_input": 8000, "max_tokens": 600},
+    "hour": {"min_input": 800, "max_input": 16000, "max_tokens": 1000},
+    "day": {"min_input": 0, "max_input": 32000, "max_tokens": 1000},
+}
+# Merged groups never span more than this many of their level's intervals
+MAX_MERGED_INTERVALS = 3
+
+# Near-duplicate collapsing (off by default): within each group, runs of consecutive entries whose estimated
+# Jaccard similarity (MinHash over word shingles) to the run's first entry is at least DUPLICATE_THRESHOLD are
+# sent as that one entry, noting how long it lasted. A group that collapses to one entry is copied, not summarized.
+COLLAPSE_DUPLICATES = False
+DUPLICATE_THRESHOLD = 0.7
+SHINGLE_SIZE = 3
+
+# Per-level collapsing for the current run: {summary_type: {"entries", "collapsed", "calls_avoided"}}
+collapse_stats = {}
+
+# Levels built inside each day's directory: (input folder, output folder, interval minutes, summary type)
+HIERARCHY_LEVELS = [
+    ("raw_summaries", "minute_summaries", 1, "minute"),
+    ("minute_summaries", "ten_minute_summaries", 10, "ten_minute"),
+    ("ten_minute_summaries", "hour_summaries", 60, "hour"),
+]
+
+# Manifest kept in each output folder, recording which inputs (and content hashes) fed each output file
+MANIFEST_FILENAME = ".hierarchy_manifest.json"
 
 # Function to read summaries from a folder
 def read_summaries(folder):
@@ -31,9 +70,9 @@ def read_summaries(folder):
 
     return timestamps, summaries
 
-# Function to send summaries to GPT-4o-mini
-def summarize_text(text_list, timestamps, summary_type):
-    """Summarizes a list of text entries into a coherent summary with timestamps."""
+# Function to build the summarization prompt for a group of entries
+def build_prompt(text_list, timestamps, summary_type):
+    """Builds the prompt asking for a summary of timestamped text entries at the given level."""
     entries = "\n".join([f"[{timestamps[i].strftime('%Y-%m-%d %H:%M:%S')}]\n{text}" for i, text in enumerate(text_list)])
 
     if summary_type == "minute":
@@ -47,30 +86,97 @@ def summarize_text(text_list, timestamps, summary_type):
     elif summary_type == "week":
         prompt = f"You are summarizing a week's worth of daily summaries of a person named Keegan. Extract key themes and trends while maintaining chronological context:\n\n{entries}"
 
+    return prompt
+
+def count_tokens(text):
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(text) // 4 + 1
+
+# Telemetry label that a level's API calls are totalled under, so its report shows tokens per call for each level
+def usage_label(summary_type):
+    return f"{summary_type} summaries"
+
+# Function to print how much near-duplicate collapsing saved at each level
+def report_collapse_stats():
+    """Prints the entries collapsed and API calls avoided per level for this run."""
+    for summary_type, stats in collapse_stats.items():
+        print(f"{summary_type}: collapsed {stats['collapsed']} of {stats['entries']} near-duplicate entries, "
+              f"{stats['calls_avoided']} call(s) avoided")
+
+# Function to collapse runs of near-identical entries in a group
+def collapse_near_duplicates(group, group_timestamps, summary_type):
+    """Returns (texts, timestamps) with each run of near-duplicates replaced by its first entry.
+
+    A collapsed entry notes when its run ended, so the model (or a copied single entry) still shows the time span.
+    """
+    if len(group) < 2:
+        return group, group_timestamps
+
+    # Compare against the run's first entry rather than the previous one, so slow drift still splits runs
+    signatures = [minhash_signature(text, SHINGLE_SIZE) for text in group]
+    runs = []
+    start = 0
+    for i in range(1, len(group)):
+        if estimated_similarity(signatures[i], signatures[start]) < DUPLICATE_THRESHOLD:
+            runs.append((start, i))
+            start = i
+    runs.append((start, len(group)))
+
+    stats = collapse_stats.setdefault(summary_type, {"entries": 0, "collapsed": 0, "calls_avoided": 0})
+    stats["entries"] += len(group)
+    stats["collapsed"] += len(group) - len(runs)
+    if len(runs) == 1:
+        stats["calls_avoided"] += 1
+
+    texts = []
+    for start, end in runs:
+        text = group[start]
+        if end - start > 1:
+            text += f"\n(Unchanged through {group_timestamps[end - 1].strftime('%Y-%m-%d %H:%M:%S')}.)"
+        texts.append(text)
+    return texts, [group_timestamps[start] for start, _ in runs]
+
+# Function to send summaries to GPT-4o-mini
+def summarize_text(text_list, timestamps, summary_type, max_tokens=1000):
+    """Summarizes a list of text entries into a coherent summary with timestamps."""
+    prompt = build_prompt(text_list, timestamps, summary_type)
+    messages = [{"role": "user", "content": prompt}]
+
+    # Reuse the response from an earlier run if the entries, prompt, model and max_tokens are unchanged
+    cache = get_cache()
+    key = cache_key("gpt-4o-mini", messages, max_tokens)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    telemetry = get_telemetry()
+    start = time.perf_counter()
     try:
-        response = client.chat.completions.create(
+        # The raw response also says how many automatic retries the client needed
+        raw_response = get_client().chat.completions.with_raw_response.create(
             model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=1000
+            messages=messages,
+            max_tokens=max_tokens
         )
-        return response.choices[0].message.content
+        response = raw_response.parse()
+        telemetry.record_api_call("chat.completions", "gpt-4o-mini", time.perf_counter() - start,
+                                  response.usage, getattr(raw_response, "retries_taken", 0), label=usage_label(summary_type))
+        choice = response.choices[0]
+        if is_complete(choice.finish_reason, choice.message.content):
+            cache.put(key, choice.message.content)
+        return choice.message.content
     except openai.OpenAIError as e:
+        telemetry.record_api_call("chat.completions", "gpt-4o-mini", time.perf_counter() - start, error=e, label=usage_label(summary_type))
         print(f"OpenAI API error: {e}")
         return "Error generating summary."
 
-# Function to process summaries into time-based chunks
-def process_summaries(input_folder, output_folder, interval_minutes, summary_type):
-    """Groups text files into time-based intervals and summarizes them."""
-    if not os.path.exists(input_folder):
-        print(f"Skipping missing folder: {input_folder}")
-        return
-
-    timestamps, summaries = read_summaries(input_folder)
-
-    os.makedirs(output_folder, exist_ok=True)
+# Function to group summaries into time-based chunks as they arrive
+def iter_groups(summaries, interval_minutes):
+    """Yields (start_time, texts, timestamps) for each interval of `interval_minutes` as soon as it is complete.
 
-    grouped_summaries = []
-    grouped_timestamps = []
+    `summaries` can be any iterable of (timestamp, text) pairs in time order, including a live stream.
+    """
     current_group = []
     current_timestamps = []
     current_start_time = None
@@ -79,37 +185,192 @@ def process_summaries(input_folder, output_folder, interval_minutes, summary_typ
         if current_start_time is None:
             current_start_time = timestamp
 
-        # If new interval, summarize the previous group
+        # If new interval, close off the previous group
         if timestamp >= current_start_time + timedelta(minutes=interval_minutes):
-            # Summarize last group OR copy directly if it's already spaced by a minute
             if current_group:
-                summary_filename = os.path.join(output_folder, f"{current_start_time.strftime('%Y-%m-%d_%H-%M-%S')}.txt")
-
-                # If there's exactly 1 summary in this group, just copy it (avoid unnecessary API calls)
-                if len(current_group) == 1:
-                    with open(summary_filename, "w") as f:
-                        f.write(current_group[0])
-                    print(f"Copied summary without modification: {summary_filename}")
-                else:
-                    summarized_text = summarize_text(current_group, grouped_timestamps, summary_type)
-                    with open(summary_filename, "w") as f:
-                        f.write(summarized_text)
-                    print(f"Saved summarized text: {summary_filename}")
+                yield current_start_time, current_group, current_timestamps
 
             current_group = []
-            grouped_timestamps = []
+            current_timestamps = []
             current_start_time = timestamp
 
         current_group.append(text)
-        grouped_timestamps.append(timestamp)
+        current_timestamps.append(timestamp)
 
-    # Summarize last group
     if current_group:
-        summarized_text = summarize_text(current_group, grouped_timestamps, summary_type)
-        summary_filename = os.path.join(output_folder, f"{current_start_time.strftime('%Y-%m-%d_%H-%M-%S')}.txt")
-        with open(summary_filename, "w") as f:
-            f.write(summarized_text)
-        print(f"Saved summary: {summary_filename}")
+        yield current_start_time, current_group, current_timestamps
+
+# Function to group summaries into time-based chunks
+def group_summaries(summaries, interval_minutes):
+    """Groups (timestamp, text) pairs into consecutive intervals of `interval_minutes`.
+
+    Returns a list of (start_time, texts, timestamps) tuples, one per interval.
+    """
+    return list(iter_groups(summaries, interval_minutes))
+
+# Function to merge sparse neighbouring groups under the level's token budget
+def merge_sparse_groups(groups, interval_minutes, summary_type):
+    """Merges adjacent groups while either side is under `min_input` tokens and the result fits in `max_input`."""
+    budget = TOKEN_BUDGETS[summary_type]
+    merged = []
+    merged_tokens = []
+
+    for start_time, group, group_timestamps in groups:
+        tokens = sum(count_tokens(text) for text in group)
+        if merged:
+            previous_start, previous_group, previous_timestamps = merged[-1]
+            sparse = merged_tokens[-1] < budget["min_input"] or tokens < budget["min_input"]
+            fits = merged_tokens[-1] + tokens <= budget["max_input"]
+            span = group_timestamps[-1] - previous_start < timedelta(minutes=interval_minutes * MAX_MERGED_INTERVALS)
+            if sparse and fits and span:
+                merged[-1] = (previous_start, previous_group + group, previous_timestamps + group_timestamps)
+                merged_tokens[-1] += tokens
+                continue
+        merged.append((start_time, group, group_timestamps))
+        merged_tokens.append(tokens)
+
+    return merged
+
+# Function to split a group into consecutive chunks under a token budget
+def split_by_budget(group, group_timestamps, max_input):
+    """Returns [(texts, timestamps), ...] chunks of at most `max_input` tokens (a single oversized entry stays whole)."""
+    chunks = [([], [])]
+    chunk_tokens = 0
+    for text, timestamp in zip(group, group_timestamps):
+        tokens = count_tokens(text)
+        if chunks[-1][0] and chunk_tokens + tokens > max_input:
+            chunks.append(([], []))
+            chunk_tokens = 0
+        chunks[-1][0].append(text)
+        chunks[-1][1].append(timestamp)
+        chunk_tokens += tokens
+    return chunks
+
+# Function to summarize a group, splitting it into sub-summaries if it's over the level's token budget
+def summarize_group(group, group_timestamps, summary_type):
+    """Summarizes a group within TOKEN_BUDGETS: oversized groups are summarized in chunks, then combined."""
+    budget = TOKEN_BUDGETS[summary_type]
+    chunks = split_by_budget(group, group_timestamps, budget["max_input"])
+
+    if len(chunks) == 1:
+        return summarize_text(group, group_timestamps, summary_type, budget["max_tokens"])
+
+    print(f"Splitting {summary_type} group at {group_timestamps[0]} into {len(chunks)} sub-summaries")
+    partials = [summarize_text(texts, timestamps, summary_type, budget["max_tokens"]) for texts, timestamps in chunks]
+    partial_timestamps = [timestamps[0] for _, timestamps in chunks]
+
+    # Partials may themselves be too long to combine in one call; recurse while that still shrinks the input
+    if len(partials) < len(group):
+        return summarize_group(partials, partial_timestamps, summary_type)
+    return summarize_text(partials, partial_timestamps, summary_type, budget["max_tokens"])
+
+# Function to find the output file for an interval
+def summary_path(output_folder, start_time):
+    """Returns the summary file for an interval starting at `start_time`."""
+    return os.path.join(output_folder, f"{start_time.strftime('%Y-%m-%d_%H-%M-%S')}.txt")
+
+# Function to load the manifest of an output folder
+def load_manifest(output_folder):
+    """Returns {output filename: fingerprint} for a folder, or an empty dict if it has no manifest yet."""
+    manifest_path = os.path.join(output_folder, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+# Function to save the manifest of an output folder
+def save_manifest(output_folder, manifest):
+    manifest_path = os.path.join(output_folder, MANIFEST_FILENAME)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+# Function to fingerprint everything that determines an interval's output
+def interval_fingerprint(group, group_timestamps, summary_type):
+    """Returns the input files with their content hashes, plus a hash of the prompt template for this level."""
+    fingerprint = {
+        "inputs": {ts.strftime('%Y-%m-%d_%H-%M-%S'): content_hash(text) for ts, text in zip(group_timestamps, group)},
+        "prompt": content_hash(build_prompt([], [], summary_type)),
+    }
+    if COLLAPSE_DUPLICATES:
+        fingerprint["collapse"] = {"threshold": DUPLICATE_THRESHOLD, "shingle_size": SHINGLE_SIZE}
+    return fingerprint
+
+# Function to process summaries into time-based chunks
+def process_summaries(input_folder, output_folder, interval_minutes, summary_type, incremental=True, adaptive=None):
+    """Groups text files into time-based intervals and summarizes them.
+
+    With `incremental`, intervals whose inputs and prompt are unchanged since the last run are left alone, so
+    only changed intervals are recomputed, and (through their new content) only their ancestors at higher levels.
+    With `adaptive` (default: ADAPTIVE_GROUPING), groups are merged and split to fit TOKEN_BUDGETS.
+    """
+    if adaptive is None:
+        adaptive = ADAPTIVE_GROUPING
+
+    if not os.path.exists(input_folder):
+        print(f"Skipping missing folder: {input_folder}")
+        return
+
+    timestamps, summaries = read_summaries(input_folder)
+
+    os.makedirs(output_folder, exist_ok=True)
+
+    old_manifest = load_manifest(output_folder) if incremental else {}
+    manifest = {}
+    unchanged = 0
+
+    groups = group_summaries(summaries, interval_minutes)
+    if adaptive:
+        groups = merge_sparse_groups(groups, interval_minutes, summary_type)
+
+    for start_time, group, group_timestamps in groups:
+        summary_filename = summary_path(output_folder, start_time)
+        output_name = os.path.basename(summary_filename)
+        fingerprint = interval_fingerprint(group, group_timestamps, summary_type)
+        if adaptive:
+            fingerprint["budget"] = TOKEN_BUDGETS[summary_type]
+
+        if old_manifest.get(output_name) == fingerprint and os.path.exists(summary_filename):
+            manifest[output_name] = fingerprint
+            unchanged += 1
+            continue
+
+        if COLLAPSE_DUPLICATES:
+            group, group_timestamps = collapse_near_duplicates(group, group_timestamps, summary_type)
+
+        # If there's exactly 1 summary in this group (or they're all near-duplicates), just copy it (avoid unnecessary API calls)
+        if len(group) == 1:
+            with open(summary_filename, "w") as f:
+                f.write(group[0])
+            print(f"Copied summary without modification: {summary_filename}")
+            manifest[output_name] = fingerprint
+        else:
+            with get_telemetry().item("process_summaries", level=summary_type, interval=output_name):
+                if adaptive:
+                    summarized_text = summarize_group(group, group_timestamps, summary_type)
+                else:
+                    summarized_text = summarize_text(group, group_timestamps, summary_type)
+            with open(summary_filename, "w") as f:
+                f.write(summarized_text)
+            print(f"Saved summarized text: {summary_filename}")
+
+            # Leave failed intervals out of the manifest so the next run retries them
+            if summarized_text != "Error generating summary.":
+                manifest[output_name] = fingerprint
+
+    # Remove outputs for intervals that no longer exist (e.g. when new inputs shift the grouping)
+    for output_name in old_manifest.keys() - manifest.keys():
+        stale_path = os.path.join(output_folder, output_name)
+        if os.path.exists(stale_path):
+            os.remove(stale_path)
+            print(f"Removed stale summary: {stale_path}")
+
+    save_manifest(output_folder, manifest)
+    if unchanged:
+        print(f"{unchanged} unchanged interval(s) in '{output_folder}' left as-is.")
 
 # Generate minute summaries (inside each day's directory)
 def generate_minute_summaries(main_directory, days):
@@ -136,9 +397,10 @@ def generate_hour_summaries(main_directory, days):
         process_summaries(ten_minute_summaries, hour_summaries, interval_minutes=60, summary_type="hour")
 
 # Generate day summaries (saved in main_directory)
-def generate_day_summaries(main_directory, days):
+def generate_day_summaries(main_directory, days, incremental=True):
     day_summaries_dir = os.path.join(main_directory, "day_summaries")
     os.makedirs(day_summaries_dir, exist_ok=True)
+    manifest = load_manifest(day_summaries_dir)
 
     for day in days:
         day_dir = os.path.join(main_directory, day)
@@ -152,29 +414,241 @@ def generate_day_summaries(main_directory, days):
         if not summaries:
             continue
 
-        day_summary_text = summarize_text([text for _, text in summaries], timestamps, summary_type="day")
         summary_filename = os.path.join(day_summaries_dir, f"{day}.txt")
+        texts = [text for _, text in summaries]
+        fingerprint = interval_fingerprint(texts, timestamps, "day")
+        if ADAPTIVE_GROUPING:
+            fingerprint["budget"] = TOKEN_BUDGETS["day"]
+        if incremental and manifest.get(f"{day}.txt") == fingerprint and os.path.exists(summary_filename):
+            print(f"Day summary for {day} is up to date.")
+            continue
+
+        if COLLAPSE_DUPLICATES:
+            texts, timestamps = collapse_near_duplicates(texts, timestamps, "day")
+
+        with get_telemetry().item("process_summaries", level="day", interval=f"{day}.txt"):
+            if len(texts) == 1 and len(summaries) > 1:
+                day_summary_text = texts[0]
+            elif ADAPTIVE_GROUPING:
+                day_summary_text = summarize_group(texts, timestamps, summary_type="day")
+            else:
+                day_summary_text = summarize_text(texts, timestamps, summary_type="day")
 
         with open(summary_filename, "w") as f:
             f.write(day_summary_text)
 
         print(f"Day summary saved: {summary_filename}")
 
+        if day_summary_text != "Error generating summary.":
+            manifest[f"{day}.txt"] = fingerprint
+            save_manifest(day_summaries_dir, manifest)
+
+# Async version of summarize_text, limited by a shared semaphore
+async def summarize_text_async(text_list, timestamps, summary_type, semaphore, stats, max_tokens=1000):
+    """Summarizes a list of text entries, recording the call count and time spent waiting on the API in `stats`."""
+    prompt = build_prompt(text_list, timestamps, summary_type)
+    messages = [{"role": "user", "content": prompt}]
+
+    cache = get_cache()
+    key = cache_key("gpt-4o-mini", messages, max_tokens)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    telemetry = get_telemetry()
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            raw_response = await get_async_client().chat.completions.with_raw_response.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                max_tokens=max_tokens
+            )
+            response = raw_response.parse()
+        except openai.OpenAIError as e:
+            telemetry.record_api_call("chat.completions", "gpt-4o-mini", time.perf_counter() - start, error=e, label=usage_label(summary_type))
+            print(f"OpenAI API error: {e}")
+            return "Error generating summary."
+        finally:
+            stats["calls"] += 1
+            stats["api_seconds"] += time.perf_counter() - start
+
+    telemetry.record_api_call("chat.completions", "gpt-4o-mini", time.perf_counter() - start,
+                              response.usage, getattr(raw_response, "retries_taken", 0), label=usage_label(summary_type))
+    choice = response.choices[0]
+    if is_complete(choice.finish_reason, choice.message.content):
+        cache.put(key, choice.message.content)
+    return choice.message.content
+
+# Async version of summarize_group: the chunks of an oversized group are summarized concurrently
+async def summarize_group_async(group, group_timestamps, summary_type, semaphore, stats):
+    """Summarizes a group within TOKEN_BUDGETS: oversized groups are summarized in chunks, then combined."""
+    budget = TOKEN_BUDGETS[summary_type]
+    chunks = split_by_budget(group, group_timestamps, budget["max_input"])
+
+    if len(chunks) == 1:
+        return await summarize_text_async(group, group_timestamps, summary_type, semaphore, stats, budget["max_tokens"])
+
+    print(f"Splitting {summary_type} group at {group_timestamps[0]} into {len(chunks)} sub-summaries")
+    partials = list(await asyncio.gather(*(summarize_text_async(texts, timestamps, summary_type, semaphore, stats, budget["max_tokens"])
+                                           for texts, timestamps in chunks)))
+    partial_timestamps = [timestamps[0] for _, timestamps in chunks]
+
+    if len(partials) < len(group):
+        return await summarize_group_async(partials, partial_timestamps, summary_type, semaphore, stats)
+    return await summarize_text_async(partials, partial_timestamps, summary_type, semaphore, stats, budget["max_tokens"])
+
+# Function to summarize one interval as soon as all of its children are done
+async def summarize_interval_async(summary_filename, children, child_timestamps, summary_type, old_manifest, manifest, semaphore, stats,
+                                   copy_single=True, adaptive=False):
+    """Waits for the child summaries, then writes this interval's summary and returns its text."""
+    group = list(await asyncio.gather(*children))
+    output_name = os.path.basename(summary_filename)
+    fingerprint = interval_fingerprint(group, child_timestamps, summary_type)
+    if adaptive:
+        fingerprint["budget"] = TOKEN_BUDGETS[summary_type]
+
+    if old_manifest.get(output_name) == fingerprint and os.path.exists(summary_filename):
+        manifest[output_name] = fingerprint
+        with open(summary_filename, "r") as f:
+            return f.read()
+
+    texts, timestamps = group, child_timestamps
+    if COLLAPSE_DUPLICATES:
+        texts, timestamps = collapse_near_duplicates(group, child_timestamps, summary_type)
+
+    # If there's exactly 1 summary in this group (or they're all near-duplicates), just copy it (avoid unnecessary API calls)
+    if (copy_single or len(group) > 1) and len(texts) == 1:
+        summarized_text = texts[0]
+    else:
+        start = time.perf_counter()
+        if adaptive:
+            summarized_text = await summarize_group_async(texts, timestamps, summary_type, semaphore, stats)
+        else:
+            summarized_text = await summarize_text_async(texts, timestamps, summary_type, semaphore, stats)
+        get_telemetry().record_item("process_summaries", time.perf_counter() - start, level=summary_type, interval=output_name)
+
+    with open(summary_filename, "w") as f:
+        f.write(summarized_text)
+    print(f"Saved summarized text: {summary_filename}")
+
+    # Leave failed intervals out of the manifest so the next run retries them
+    if summarized_text != "Error generating summary.":
+        manifest[output_name] = fingerprint
+    else:
+        manifest.pop(output_name, None)
+    return summarized_text
+
+def completed_future(loop, value):
+    future = loop.create_future()
+    future.set_result(value)
+    return future
+
+# Function to schedule every interval of one day, from minutes up to the day summary
+async def generate_day_hierarchy_async(main_directory, day, day_manifest, semaphore, stats, incremental=True, adaptive=None):
+    """Builds the interval dependency graph for a day and runs each interval once its children are done.
+
+    With `adaptive` (default: ADAPTIVE_GROUPING), groups are merged and split to fit TOKEN_BUDGETS as in
+    process_summaries. Merging needs the lower level's text, so each level then waits for the one below it.
+    """
+    if adaptive is None:
+        adaptive = ADAPTIVE_GROUPING
+
+    day_dir = os.path.join(main_directory, day)
+    raw_summaries = os.path.join(day_dir, "raw_summaries")
+    if not os.path.exists(raw_summaries):
+        print(f"Skipping missing folder: {raw_summaries}")
+        return
+
+    # Interval start times only depend on timestamps, so the whole graph is known before any summary exists
+    loop = asyncio.get_running_loop()
+    items = [(timestamp, completed_future(loop, text)) for timestamp, text in read_summaries(raw_summaries)[1]]
+
+    manifests = []
+    for _, output_name, interval_minutes, summary_type in HIERARCHY_LEVELS:
+        output_folder = os.path.join(day_dir, output_name)
+        os.makedirs(output_folder, exist_ok=True)
+        old_manifest = load_manifest(output_folder) if incremental else {}
+        manifest = {}
+        manifests.append((output_folder, old_manifest, manifest))
+
+        groups = group_summaries(items, interval_minutes)
+        if adaptive:
+            texts = await asyncio.gather(*(child for _, child in items))
+            groups = merge_sparse_groups(group_summaries([(timestamp, text) for (timestamp, _), text in zip(items, texts)], interval_minutes),
+                                         interval_minutes, summary_type)
+            groups = [(start_time, [completed_future(loop, text) for text in group], group_timestamps)
+                      for start_time, group, group_timestamps in groups]
+
+        items = [
+            (start_time, asyncio.create_task(summarize_interval_async(
+                summary_path(output_folder, start_time), children, child_timestamps,
+                summary_type, old_manifest, manifest, semaphore, stats, adaptive=adaptive)))
+            for start_time, children, child_timestamps in groups
+        ]
+
+    if items:
+        day_summaries_dir = os.path.join(main_directory, "day_summaries")
+        summary_filename = os.path.join(day_summaries_dir, f"{day}.txt")
+        await summarize_interval_async(
+            summary_filename, [task for _, task in items], [start_time for start_time, _ in items],
+            "day", dict(day_manifest) if incremental else {}, day_manifest, semaphore, stats, copy_single=False, adaptive=adaptive)
+
+    # Save each level's manifest and remove outputs for intervals that no longer exist
+    for output_folder, old_manifest, manifest in manifests:
+        for output_name in old_manifest.keys() - manifest.keys():
+            stale_path = os.path.join(output_folder, output_name)
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+        save_manifest(output_folder, manifest)
+
+# Concurrent version of the whole pipeline: no barrier between levels or days
+async def generate_hierarchy_async(main_directory, days, concurrency=16, incremental=True, adaptive=None):
+    """Generates all summary levels for all days, running up to `concurrency` summarize calls at once.
+
+    Prints the wall-clock time next to the summed API time, which is roughly what the sequential run would take.
+    """
+    day_summaries_dir = os.path.join(main_directory, "day_summaries")
+    os.makedirs(day_summaries_dir, exist_ok=True)
+    day_manifest = load_manifest(day_summaries_dir)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"calls": 0, "api_seconds": 0.0}
+    start = time.perf_counter()
+
+    await asyncio.gather(*(generate_day_hierarchy_async(main_directory, day, day_manifest, semaphore, stats, incremental, adaptive) for day in days))
+    save_manifest(day_summaries_dir, day_manifest)
+
+    wall_seconds = time.perf_counter() - start
+    speedup = stats["api_seconds"] / wall_seconds if wall_seconds else 0.0
+    print(f"{stats['calls']} API call(s) in {wall_seconds:.1f}s wall-clock; {stats['api_seconds']:.1f}s of summed API time "
+          f"(~{speedup:.1f}x faster than running them one at a time)")
+    return stats
+
 # Run the script
 if __name__ == "__main__":
     main_directory = "/Users/keeganh/Documents"
     days_to_summarize = ["Monday"]  # Days to process
+    concurrency = 16  # Set to None to run level by level, one summary at a time
 
-    print("Generating minute summaries...")
-    generate_minute_summaries(main_directory, days_to_summarize)
+    with get_telemetry().stage("process_summaries"):
+        if concurrency:
+            print("Generating all summary levels concurrently...")
+            asyncio.run(generate_hierarchy_async(main_directory, days_to_summarize, concurrency))
+        else:
+            print("Generating minute summaries...")
+            generate_minute_summaries(main_directory, days_to_summarize)
 
-    print("Generating ten-minute summaries...")
-    generate_ten_minute_summaries(main_directory, days_to_summarize)
+            print("Generating ten-minute summaries...")
+            generate_ten_minute_summaries(main_directory, days_to_summarize)
 
-    print("Generating hour summaries...")
-    generate_hour_summaries(main_directory, days_to_summarize)
+            print("Generating hour summaries...")
+            generate_hour_summaries(main_directory, days_to_summarize)
 
-    print("Generating day summaries...")
-    generate_day_summaries(main_directory, days_to_summarize)
+            print("Generating day summaries...")
+            generate_day_summaries(main_directory, days_to_summarize)
 
-    print("Summarization pipeline completed!")
\ No newline at end of file
+    print("Summarization pipeline completed!")
+    get_cache().report()
+    report_collapse_stats()
+    get_telemetry().report()
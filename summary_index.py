@@ -0,0 +1,161 @@
+import os
+import json
+import mmap
+import numpy as np
+from timestamps import to_seconds, from_seconds, parse_timestamp
+
+# Summary levels in the index, finest first: (name, folder inside each day, interval minutes)
+INDEX_LEVELS = [
+    ("minute", "minute_summaries", 1),
+    ("ten_minute", "ten_minute_summaries", 10),
+    ("hour", "hour_summaries", 60),
+]
+
+INDEX_FILENAME = "summary_index.bin"
+MAGIC = b"KGPTIDX1"
+
+# Function to read one level of one day as (start seconds, text) pairs
+def read_level(folder):
+    entries = []
+    if not os.path.exists(folder):
+        return entries
+    for filename in sorted(os.listdir(folder)):
+        if filename.endswith(".txt"):
+            timestamp = parse_timestamp(filename[:-4])
+            if timestamp is not None:
+                with open(os.path.join(folder, filename), "r") as f:
+                    entries.append((to_seconds(timestamp), f.read()))
+    return entries
+
+# Function to turn sorted interval starts into non-overlapping [start, end) intervals
+def interval_ends(starts, interval_seconds):
+    """Each interval lasts `interval_seconds` but never runs into the next one, so ends stay sorted."""
+    ends = starts + interval_seconds
+    ends[:-1] = np.minimum(ends[:-1], starts[1:])
+    return ends
+
+# Function to build the index file from the summary folders
+def build_index(main_directory, days, index_path=None):
+    """Loads every summary level for `days` into sorted arrays and writes them to one memory-mappable file."""
+    index_path = index_path or os.path.join(main_directory, INDEX_FILENAME)
+    levels = {}
+
+    for name, folder_name, interval_minutes in INDEX_LEVELS:
+        entries = sorted(entry for day in days for entry in read_level(os.path.join(main_directory, day, folder_name)))
+        starts = np.array([start for start, _ in entries], dtype=np.int64)
+        levels[name] = (starts, interval_ends(starts, interval_minutes * 60), [text for _, text in entries])
+
+    # Day summaries are named after the day, so their span comes from that day's hour summaries
+    day_entries = []
+    for day in days:
+        day_file = os.path.join(main_directory, "day_summaries", f"{day}.txt")
+        hours = read_level(os.path.join(main_directory, day, "hour_summaries"))
+        if os.path.exists(day_file) and hours:
+            with open(day_file, "r") as f:
+                day_entries.append((hours[0][0], hours[-1][0] + 3600, f.read()))
+    day_entries.sort()
+    day_starts = np.array([start for start, _, _ in day_entries], dtype=np.int64)
+    day_ends = np.array([end for _, end, _ in day_entries], dtype=np.int64)
+    if len(day_ends):
+        day_ends[:-1] = np.minimum(day_ends[:-1], day_starts[1:])
+    levels["day"] = (day_starts, day_ends, [text for _, _, text in day_entries])
+
+    # Layout: magic, header length, JSON header, then 8-byte aligned arrays per level, then one UTF-8 text blob
+    arrays = []
+    header = {"levels": {}}
+    blob = bytearray()
+    for name, (starts, ends, texts) in levels.items():
+        encoded = [text.encode("utf-8") for text in texts]
+        lengths = np.array([len(b) for b in encoded], dtype=np.int64)
+        offsets = np.cumsum(np.concatenate(([0], lengths[:-1]))).astype(np.int64) + len(blob) if len(lengths) else lengths
+        for b in encoded:
+            blob += b
+        header["levels"][name] = {"count": len(starts)}
+        arrays += [(name, "starts", starts), (name, "ends", ends), (name, "offsets", offsets), (name, "lengths", lengths)]
+
+    # Header size depends on the offsets it contains, so lay it out with a fixed-width placeholder first
+    header_size = 4096
+    position = len(MAGIC) + 8 + header_size
+    for name, field, array in arrays:
+        header["levels"][name][field] = position
+        position += array.nbytes
+    header["text"] = position
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    if len(header_bytes) > header_size:
+        raise ValueError("Index header too large")
+
+    with open(index_path + ".tmp", "wb") as f:
+        f.write(MAGIC)
+        f.write(np.int64(header_size).tobytes())
+        f.write(header_bytes.ljust(header_size, b" "))
+        for _, _, array in arrays:
+            f.write(array.tobytes())
+        f.write(bytes(blob))
+    os.replace(index_path + ".tmp", index_path)
+
+    print(f"Indexed {sum(len(v[0]) for v in levels.values())} summaries across {len(levels)} levels: {index_path}")
+    return index_path
+
+class SummaryIndex:
+    """Read-only, memory-mapped view of an index file answering point and range queries at every level."""
+
+    def __init__(self, index_path):
+        self.file = open(index_path, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{index_path} is not a summary index")
+        header_size = int(np.frombuffer(self.mm, dtype=np.int64, count=1, offset=len(MAGIC))[0])
+        header = json.loads(self.mm[len(MAGIC) + 8:len(MAGIC) + 8 + header_size])
+        self.text_offset = header["text"]
+
+        # Arrays are views straight into the mapped file; nothing is copied or parsed up front
+        self.levels = {}
+        for name, level in header["levels"].items():
+            count = level["count"]
+            self.levels[name] = {
+                field: np.frombuffer(self.mm, dtype=np.int64, count=count, offset=level[field])
+                for field in ("starts", "ends", "offsets", "lengths")
+            }
+
+    def _text(self, level, i):
+        start = self.text_offset + int(level["offsets"][i])
+        return self.mm[start:start + int(level["lengths"][i])].decode("utf-8")
+
+    def lookup(self, timestamp):
+        """Returns {level: (start datetime, text)} for the summary covering `timestamp` at each level."""
+        t = to_seconds(timestamp)
+        result = {}
+        for name, level in self.levels.items():
+            i = int(np.searchsorted(level["starts"], t, side="right")) - 1
+            if i >= 0 and t < level["ends"][i]:
+                result[name] = (from_seconds(level["starts"][i]), self._text(level, i))
+        return result
+
+    def lookup_range(self, start, end):
+        """Returns {level: [(start datetime, text), ...]} for every summary overlapping [start, end)."""
+        lo_t, hi_t = to_seconds(start), to_seconds(end)
+        result = {}
+        for name, level in self.levels.items():
+            # Intervals don't overlap, so both starts and ends are sorted
+            lo = int(np.searchsorted(level["ends"], lo_t, side="right"))
+            hi = int(np.searchsorted(level["starts"], hi_t, side="left"))
+            result[name] = [(from_seconds(level["starts"][i]), self._text(level, i)) for i in range(lo, hi)]
+        return result
+
+    def context_for(self, timestamp, levels=("hour", "day")):
+        """Formats the covering summaries at coarser levels as retrieval context for a prompt."""
+        covering = self.lookup(timestamp)
+        lines = [f"{name.replace('_', '-')} summary: {covering[name][1].strip()}" for name in levels if name in covering]
+        return "\n\n".join(lines)
+
+    def close(self):
+        self.levels = {}
+        self.mm.close()
+        self.file.close()
+
+# Run the script
+if __name__ == "__main__":
+    main_directory = "/Users/keeganh/Documents"
+    days_to_index = ["Sunday", "Monday"]
+    build_index(main_directory, days_to_index)
@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import bisect
+import sqlite3
+import summary_hierarchy
+from summary_hierarchy import summarize_text, summarize_group, merge_sparse_groups, interval_fingerprint, collapse_near_duplicates, HIERARCHY_LEVELS, TOKEN_BUDGETS
+from response_cache import get_cache
+from timestamps import to_seconds, from_seconds, parse_timestamp
+from telemetry import get_telemetry
+
+# Default location of the single-file store holding every summary level
+STORE_FILENAME = "summaries.sqlite"
+
+class SummaryStore:
+    """All summary levels for all days in one SQLite file, indexed by (day, level, start time)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "day TEXT NOT NULL, level TEXT NOT NULL, start INTEGER NOT NULL, text TEXT NOT NULL, fingerprint TEXT, "
+            "PRIMARY KEY (day, level, start)) WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    def get_level(self, day, level):
+        """Returns {start seconds: (text, fingerprint)} for one level of one day."""
+        rows = self.conn.execute("SELECT start, text, fingerprint FROM summaries WHERE day = ? AND level = ?", (day, level))
+        return {start: (text, fingerprint) for start, text, fingerprint in rows}
+
+    def put_level(self, day, level, rows):
+        """Replaces one level of one day with (start seconds, text, fingerprint) rows in a single transaction."""
+        with self.conn:
+            self.conn.execute("DELETE FROM summaries WHERE day = ? AND level = ?", (day, level))
+            self.conn.executemany(
+                "INSERT INTO summaries (day, level, start, text, fingerprint) VALUES (?, ?, ?, ?, ?)",
+                [(day, level, start, text, fingerprint) for start, text, fingerprint in rows]
+            )
+
+    def days(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT day FROM summaries ORDER BY day")]
+
+    def close(self):
+        self.conn.close()
+
+# Function to load a folder of raw summaries once into sorted, timestamp-indexed arrays
+def load_raw_summaries(folder):
+    """Returns (seconds, timestamps, texts), sorted by time, for every timestamped .txt file in a folder."""
+    entries = []
+    with os.scandir(folder) as it:
+        for entry in it:
+            if not entry.name.endswith(".txt"):
+                continue
+            timestamp = parse_timestamp(entry.name[:-4])
+            if timestamp is None:
+                continue
+            with open(entry.path, "r") as f:
+                entries.append((timestamp, f.read()))
+
+    entries.sort(key=lambda e: e[0])
+    timestamps = [timestamp for timestamp, _ in entries]
+    return [to_seconds(t) for t in timestamps], timestamps, [text for _, text in entries]
+
+# Function to split a sorted time index into intervals
+def group_indices(seconds, interval_minutes):
+    """Returns (start, end) index ranges, each starting at an entry and spanning `interval_minutes` from it.
+
+    Produces the same groups as summary_hierarchy.group_summaries, but jumps a whole interval per bisect
+    instead of walking every entry.
+    """
+    groups = []
+    start = 0
+    interval = interval_minutes * 60
+    while start < len(seconds):
+        end = bisect.bisect_left(seconds, seconds[start] + interval, lo=start + 1)
+        groups.append((start, end))
+        start = end
+    return groups
+
+# Function to compute every level of one day in memory and persist it to the store
+def build_day(main_directory, day, store, incremental=True, adaptive=None):
+    """Loads a day's raw summaries once and builds the minute, ten-minute, hour and day levels into `store`.
+
+    With `incremental`, intervals whose fingerprint matches the stored one reuse the stored text.
+    With `adaptive` (default: summary_hierarchy.ADAPTIVE_GROUPING), groups are merged and split to fit TOKEN_BUDGETS.
+    """
+    if adaptive is None:
+        adaptive = summary_hierarchy.ADAPTIVE_GROUPING
+
+    raw_summaries = os.path.join(main_directory, day, "raw_summaries")
+    if not os.path.exists(raw_summaries):
+        print(f"Skipping missing folder: {raw_summaries}")
+        return
+
+    seconds, timestamps, texts = load_raw_summaries(raw_summaries)
+    print(f"Loaded {len(texts)} raw summaries for {day}.")
+
+    levels = [(summary_type, interval_minutes, True) for _, _, interval_minutes, summary_type in HIERARCHY_LEVELS]
+    levels.append(("day", None, False))
+
+    for summary_type, interval_minutes, copy_single in levels:
+        if not texts:
+            break
+
+        stored = store.get_level(day, summary_type) if incremental else {}
+        indices = group_indices(seconds, interval_minutes) if interval_minutes else [(0, len(texts))]
+        groups = [(timestamps[start], texts[start:end], timestamps[start:end]) for start, end in indices]
+        if adaptive and interval_minutes:
+            groups = merge_sparse_groups(groups, interval_minutes, summary_type)
+        rows = []
+        recomputed = 0
+
+        for start_time, group, group_timestamps in groups:
+            start = to_seconds(start_time)
+            fingerprint = interval_fingerprint(group, group_timestamps, summary_type)
+            if adaptive:
+                fingerprint["budget"] = TOKEN_BUDGETS[summary_type]
+            fingerprint = json.dumps(fingerprint, sort_keys=True)
+            previous = stored.get(start)
+            entries = len(group)
+
+            if previous and previous[1] == fingerprint:
+                rows.append((start, previous[0], fingerprint))
+                continue
+
+            if summary_hierarchy.COLLAPSE_DUPLICATES:
+                group, group_timestamps = collapse_near_duplicates(group, group_timestamps, summary_type)
+
+            # A single entry, or a group of near-duplicates, is copied rather than summarized
+            if (copy_single or entries > 1) and len(group) == 1:
+                text = group[0]
+            else:
+                text = summarize_group(group, group_timestamps, summary_type) if adaptive else summarize_text(group, group_timestamps, summary_type)
+                recomputed += 1
+                # Leave failed intervals without a fingerprint so the next run retries them
+                if text == "Error generating summary.":
+                    fingerprint = None
+            rows.append((start, text, fingerprint))
+
+        store.put_level(day, summary_type, rows)
+        print(f"{day} {summary_type}: {len(rows)} interval(s), {recomputed} summarized")
+
+        # This level's outputs are the next level's inputs
+        seconds = [row[0] for row in rows]
+        timestamps = [from_seconds(s) for s in seconds]
+        texts = [row[1] for row in rows]
+
+# Function to write a day's levels from the store back out in the usual folder layout
+def export_day(store, main_directory, day):
+    """Writes minute/ten-minute/hour summaries under <day>/ and the day summary under day_summaries/."""
+    for _, output_name, _, summary_type in HIERARCHY_LEVELS:
+        output_folder = os.path.join(main_directory, day, output_name)
+        os.makedirs(output_folder, exist_ok=True)
+        for start, (text, _) in sorted(store.get_level(day, summary_type).items()):
+            with open(os.path.join(output_folder, f"{from_seconds(start).strftime('%Y-%m-%d_%H-%M-%S')}.txt"), "w") as f:
+                f.write(text)
+
+    day_level = store.get_level(day, "day")
+    if day_level:
+        day_summaries_dir = os.path.join(main_directory, "day_summaries")
+        os.makedirs(day_summaries_dir, exist_ok=True)
+        with open(os.path.join(day_summaries_dir, f"{day}.txt"), "w") as f:
+            f.write(next(iter(day_level.values()))[0])
+
+    print(f"Exported {day} summaries to '{main_directory}'")
+
+# Run the script
+if __name__ == "__main__":
+    main_directory = "/Users/keeganh/Documents"
+    days_to_summarize = ["Monday"]  # Days to process
+    export = True  # Also write the per-file folder layout used by generate_jsonl.py
+
+    store = SummaryStore(os.path.join(main_directory, STORE_FILENAME))
+    start = time.perf_counter()
+    for day in days_to_summarize:
+        build_day(main_directory, day, store)
+        if export:
+            export_day(store, main_directory, day)
+    store.close()
+
+    print(f"Summary store built in {time.perf_counter() - start:.1f}s")
+    get_cache().report()
+    get_telemetry().report()
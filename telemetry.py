@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import bisect
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+# Where telemetry is written (override with the KEEGANGPT_TELEMETRY environment variable). A path ending in
+# .prom gets a Prometheus text snapshot at the end of the run; anything else gets one JSON line per event.
+TELEMETRY_PATH = os.getenv("KEEGANGPT_TELEMETRY", os.path.join(os.path.expanduser("~"), ".cache", "keegangpt", "telemetry.jsonl"))
+
+# Upper bounds, in seconds, of the API latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf"))
+
+# Price per million (input, output) tokens, matched by model name prefix (check the current pricing page)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "ft:gpt-4o-mini": (0.30, 1.20),
+}
+BATCH_DISCOUNT = 0.5  # Batch API requests are billed at half price
+
+def usage_tokens(usage):
+    """Returns (prompt tokens, completion tokens) from an API usage object or a usage dict from a batch result."""
+    if not usage:
+        return 0, 0
+    if isinstance(usage, dict):
+        return usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0
+    return getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+
+def token_cost(model, prompt_tokens, completion_tokens, endpoint=None):
+    """Estimates the cost in dollars of the given tokens, or 0 for models without a known price."""
+    prefixes = [prefix for prefix in MODEL_PRICES if model and model.startswith(prefix)]
+    if not prefixes:
+        return 0.0
+    input_price, output_price = MODEL_PRICES[max(prefixes, key=len)]
+    cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    return cost * BATCH_DISCOUNT if endpoint == "batch" else cost
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+class Telemetry:
+    """Collects wall time per stage and item, API latency histograms, token usage, retries and errors for one run."""
+
+    def __init__(self, path=TELEMETRY_PATH):
+        self.path = path
+        self.prometheus = path.endswith(".prom")
+        self.run_id = datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + f"_{os.getpid()}"
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.api = {}
+        self.labels = {}
+        self.file = None
+
+    def _emit(self, event):
+        if self.prometheus:
+            return
+        event = {"time": round(time.time(), 3), "run": self.run_id, **event}
+        with self.lock:
+            if self.file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self.file = open(self.path, "a")
+            self.file.write(json.dumps(event) + "\n")
+            self.file.flush()
+
+    def _stage(self, name):
+        return self.stages.setdefault(name, {"seconds": 0.0, "items": 0, "item_seconds": []})
+
+    @contextmanager
+    def stage(self, name):
+        """Times a block of work as (part of) a pipeline stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self.lock:
+                self._stage(name)["seconds"] += seconds
+            self._emit({"event": "stage", "stage": name, "seconds": round(seconds, 4)})
+
+    def record_item(self, stage, seconds, **fields):
+        """Records the wall time of one item (a video, an image, an interval, ...) within a stage."""
+        with self.lock:
+            stats = self._stage(stage)
+            stats["items"] += 1
+            stats["item_seconds"].append(seconds)
+        self._emit({"event": "item", "stage": stage, "seconds": round(seconds, 4), **fields})
+
+    @contextmanager
+    def item(self, stage, **fields):
+        """Times one item within a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_item(stage, time.perf_counter() - start, **fields)
+
+    def record_api_call(self, endpoint, model, seconds, usage=None, retries=0, error=None, label=None):
+        """Records one API call: its latency, token usage, how many retries it took and the error, if it failed.
+
+        Calls given a `label` (e.g. a summary level) also have their tokens totalled under it.
+        """
+        prompt_tokens, completion_tokens = usage_tokens(usage)
+        with self.lock:
+            if label:
+                totals = self.labels.setdefault(label, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+                totals["calls"] += 1
+                totals["prompt_tokens"] += prompt_tokens
+                totals["completion_tokens"] += completion_tokens
+            stats = self.api.setdefault((endpoint, model or ""), {
+                "calls": 0, "errors": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "seconds": 0.0, "latencies": [], "buckets": [0] * len(LATENCY_BUCKETS),
+            })
+            stats["calls"] += 1
+            stats["errors"] += 1 if error else 0
+            stats["retries"] += retries
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            stats["seconds"] += seconds
+            stats["latencies"].append(seconds)
+            stats["buckets"][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self._emit({
+            "event": "api_call", "endpoint": endpoint, "model": model, "seconds": round(seconds, 4),
+            "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "retries": retries,
+            "error": type(error).__name__ if error else None, **({"label": label} if label else {}),
+        })
+
+    def timed_call(self, endpoint, func, *args, **kwargs):
+        """Calls an API function, recording its latency and any error (which is re-raised)."""
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.record_api_call(endpoint, kwargs.get("model"), time.perf_counter() - start, error=e)
+            raise
+        self.record_api_call(endpoint, kwargs.get("model"), time.perf_counter() - start, getattr(result, "usage", None))
+        return result
+
+    def summary(self):
+        """Returns per-stage and per-endpoint totals for this run."""
+        with self.lock:
+            stages = {}
+            for name, stats in self.stages.items():
+                item_seconds = sorted(stats["item_seconds"])
+                stages[name] = {
+                    "seconds": round(stats["seconds"], 3), "items": stats["items"],
+                    "item_p50": round(percentile(item_seconds, 0.5), 4), "item_p99": round(percentile(item_seconds, 0.99), 4),
+                }
+
+            api = {}
+            for (endpoint, model), stats in self.api.items():
+                latencies = sorted(stats["latencies"])
+                api[f"{endpoint} {model}".strip()] = {
+                    "calls": stats["calls"], "errors": stats["errors"], "retries": stats["retries"],
+                    "prompt_tokens": stats["prompt_tokens"], "completion_tokens": stats["completion_tokens"],
+                    "cost": round(token_cost(model, stats["prompt_tokens"], stats["completion_tokens"], endpoint), 4),
+                    "p50": round(percentile(latencies, 0.5), 4), "p99": round(percentile(latencies, 0.99), 4),
+                }
+            labels = {label: dict(totals) for label, totals in self.labels.items()}
+        return {"run": self.run_id, "stages": stages, "api": api, "labels": labels}
+
+    def prometheus_text(self):
+        """Formats the run's metrics in the Prometheus text exposition format."""
+        lines = [
+            "# TYPE keegangpt_stage_seconds gauge",
+            "# TYPE keegangpt_stage_items_total counter",
+        ]
+        with self.lock:
+            for name, stats in self.stages.items():
+                lines.append(f'keegangpt_stage_seconds{{stage="{name}"}} {stats["seconds"]:.4f}')
+                lines.append(f'keegangpt_stage_items_total{{stage="{name}"}} {stats["items"]}')
+
+            lines += [
+                "# TYPE keegangpt_api_request_duration_seconds histogram",
+                "# TYPE keegangpt_api_tokens_total counter",
+                "# TYPE keegangpt_api_retries_total counter",
+                "# TYPE keegangpt_api_errors_total counter",
+                "# TYPE keegangpt_api_cost_dollars gauge",
+            ]
+            for (endpoint, model), stats in self.api.items():
+                labels = f'endpoint="{endpoint}",model="{model}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, stats["buckets"]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else bound
+                    lines.append(f'keegangpt_api_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"keegangpt_api_request_duration_seconds_sum{{{labels}}} {stats['seconds']:.4f}")
+                lines.append(f"keegangpt_api_request_duration_seconds_count{{{labels}}} {stats['calls']}")
+                lines.append(f'keegangpt_api_tokens_total{{{labels},type="prompt"}} {stats["prompt_tokens"]}')
+                lines.append(f'keegangpt_api_tokens_total{{{labels},type="completion"}} {stats["completion_tokens"]}')
+                lines.append(f"keegangpt_api_retries_total{{{labels}}} {stats['retries']}")
+                lines.append(f"keegangpt_api_errors_total{{{labels}}} {stats['errors']}")
+                cost = token_cost(model, stats["prompt_tokens"], stats["completion_tokens"], endpoint)
+                lines.append(f"keegangpt_api_cost_dollars{{{labels}}} {cost:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def report(self):
+        """Prints the end-of-run summary and writes the final snapshot (or summary event) to the telemetry file."""
+        summary = self.summary()
+        if not summary["stages"] and not summary["api"]:
+            return
+
+        print("Telemetry:")
+        for name, stats in summary["stages"].items():
+            per_item = f", {stats['items']} item(s), p50 {stats['item_p50']:.2f}s / p99 {stats['item_p99']:.2f}s per item" if stats["items"] else ""
+            print(f"  {name}: {stats['seconds']:.1f}s{per_item}")
+        total_cost = 0.0
+        for name, stats in summary["api"].items():
+            total_cost += stats["cost"]
+            print(f"  {name}: {stats['calls']} call(s), p50 {stats['p50']:.2f}s / p99 {stats['p99']:.2f}s, "
+                  f"{stats['prompt_tokens']} prompt + {stats['completion_tokens']} completion tokens (~${stats['cost']:.2f}), "
+                  f"{stats['retries']} retries, {stats['errors']} errors")
+        if summary["api"]:
+            print(f"  Estimated API cost this run: ${total_cost:.2f}")
+        for label, totals in summary["labels"].items():
+            print(f"  {label}: {totals['calls']} call(s), {totals['prompt_tokens'] / totals['calls']:.0f} prompt + "
+                  f"{totals['completion_tokens'] / totals['calls']:.0f} completion tokens per call")
+
+        if self.prometheus:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path + ".tmp", "w") as f:
+                f.write(self.prometheus_text())
+            os.replace(self.path + ".tmp", self.path)
+        else:
+            self._emit({"event": "summary", **summary})
+        print(f"  Telemetry written to {self.path}")
+
+_telemetry = None
+
+# Function to get the shared telemetry collector, creating it on first use
+def get_telemetry():
+    """Returns the process-wide Telemetry."""
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = Telemetry()
+    return _telemetry
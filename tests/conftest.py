@@ -0,0 +1,35 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# Keep test runs' response cache and telemetry out of ~/.cache (both paths are read when the modules are imported)
+SCRATCH_DIR = tempfile.mkdtemp(prefix="keegangpt_tests_")
+os.environ["KEEGANGPT_CACHE"] = os.path.join(SCRATCH_DIR, "responses.sqlite")
+os.environ["KEEGANGPT_TELEMETRY"] = os.path.join(SCRATCH_DIR, "telemetry.jsonl")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark
+import openai_client
+import response_cache
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    """Serves the OpenAI endpoints from benchmark's mock server and points new clients at it."""
+    server, base_url = benchmark.start_mock_server(latency=0.05)
+    monkeypatch.setenv("OPENAI_BASE_URL", base_url)
+    monkeypatch.setenv("OPENAI_API_KEY", "mock")
+    monkeypatch.setattr(openai_client, "_client", None)
+    monkeypatch.setattr(openai_client, "_async_clients", {})
+    benchmark.MockOpenAIHandler.stats.update(requests=0, rate_limited=0)
+    yield base_url
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def fresh_cache(tmp_path, monkeypatch):
+    """Gives the test an empty response cache, so every request reaches the server."""
+    cache = response_cache.ResponseCache(str(tmp_path / "responses.sqlite"))
+    monkeypatch.setattr(response_cache, "_cache", cache)
+    return cache
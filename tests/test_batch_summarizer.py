@@ -0,0 +1,68 @@
+import os
+import types
+import batch_summarizer
+import benchmark
+from test_image_summarizer import write_frames
+
+def test_batch_round_trip(tmp_path, mock_server, fresh_cache):
+    requests = [batch_summarizer.make_request(f"req-{i}", [{"role": "user", "content": f"Summarize {i}"}], "gpt-4o-mini", 50)
+                for i in range(5)]
+    paths = batch_summarizer.write_batch_files(iter(requests), str(tmp_path), "text")
+
+    batch_ids = [batch_summarizer.submit_batch(path) for path in paths]
+    batches = batch_summarizer.wait_for_batches(batch_ids, poll_seconds=0.01)
+    assert [batch.status for batch in batches] == ["completed"]
+
+    results = batch_summarizer.download_results(batches[0])
+    assert sorted(results) == [f"req-{i}" for i in range(5)]
+    assert all(summary.startswith("Keegan was working") and finish_reason == "stop" for summary, finish_reason in results.values())
+
+def test_batch_process_images_streams_requests(tmp_path, mock_server, fresh_cache, monkeypatch):
+    image_folder = write_frames(tmp_path / "extracted_frames", 6)
+
+    # Requests must reach write_batch_files lazily, not as a list of every frame's payload
+    write_batch_files = batch_summarizer.write_batch_files
+    received = []
+    def spy(requests, work_dir, prefix):
+        received.append(requests)
+        return write_batch_files(requests, work_dir, prefix)
+    monkeypatch.setattr(batch_summarizer, "write_batch_files", spy)
+
+    batch_summarizer.batch_process_images(image_folder, poll_seconds=0.01)
+    assert isinstance(received[0], types.GeneratorType)
+    raw_summaries = tmp_path / "raw_summaries"
+    assert len(os.listdir(raw_summaries)) == 6
+
+    # A second run over the same requests is answered entirely from the cache
+    requests_before = benchmark.MockOpenAIHandler.stats["requests"]
+    for summary_file in raw_summaries.iterdir():
+        summary_file.unlink()
+    batch_summarizer.batch_process_images(image_folder, poll_seconds=0.01)
+    assert len(os.listdir(raw_summaries)) == 6
+    assert benchmark.MockOpenAIHandler.stats["requests"] == requests_before
+
+def test_failed_frames_are_resubmitted(tmp_path, mock_server, fresh_cache, monkeypatch):
+    image_folder = write_frames(tmp_path / "extracted_frames", 4)
+    failing = sorted(os.listdir(image_folder))[0]
+    monkeypatch.setattr(benchmark.MockOpenAIHandler, "failing_requests", {failing})
+
+    # The failed frame gets no summary file rather than the error placeholder
+    assert batch_summarizer.batch_process_images(image_folder, poll_seconds=0.01) == 1
+    raw_summaries = tmp_path / "raw_summaries"
+    assert sorted(os.listdir(raw_summaries)) == sorted(f"{os.path.splitext(f)[0]}.txt" for f in os.listdir(image_folder) if f != failing)
+
+    monkeypatch.setattr(benchmark.MockOpenAIHandler, "failing_requests", set())
+    assert batch_summarizer.batch_process_images(image_folder, poll_seconds=0.01) == 0
+    assert len(os.listdir(raw_summaries)) == 4
+
+def test_truncated_batch_results_are_not_cached(tmp_path, mock_server, fresh_cache, monkeypatch):
+    requests = [batch_summarizer.make_request(f"req-{i}", [{"role": "user", "content": f"Summarize {i}"}], "gpt-4o-mini", 50)
+                for i in range(3)]
+    monkeypatch.setattr(benchmark.MockOpenAIHandler, "finish_reason", "length")
+    results = batch_summarizer.run_batch(iter(requests), str(tmp_path), "text", poll_seconds=0.01)
+    assert len(results) == 3
+    assert fresh_cache.stats()["entries"] == 0
+
+    monkeypatch.setattr(benchmark.MockOpenAIHandler, "finish_reason", "stop")
+    batch_summarizer.run_batch(iter(requests), str(tmp_path), "text", poll_seconds=0.01)
+    assert fresh_cache.stats()["entries"] == 3
@@ -0,0 +1,93 @@
+import os
+import json
+import pytest
+import benchmark
+import fine_tune
+
+@pytest.fixture
+def client(mock_server):
+    return fine_tune.get_client()
+
+@pytest.fixture
+def training_file(tmp_path, monkeypatch):
+    # Small parts, sent one at a time, so an upload of a few KB has several parts in a known order
+    monkeypatch.setattr(fine_tune, "MULTIPART_THRESHOLD", 1024)
+    monkeypatch.setattr(fine_tune, "PART_SIZE", 1024)
+    monkeypatch.setattr(fine_tune, "UPLOAD_WORKERS", 1)
+    path = tmp_path / "training.jsonl"
+    with open(path, "w") as f:
+        for i in range(100):
+            f.write(json.dumps({"messages": [{"role": "user", "content": f"Question {i}"}, {"role": "assistant", "content": f"Answer {i}"}]}) + "\n")
+    return str(path)
+
+def interrupt_after(client, monkeypatch, parts):
+    """Makes the upload fail (as if the process died) once `parts` parts have been sent."""
+    create = client.uploads.parts.create
+    sent = []
+    def flaky_create(**kwargs):
+        if len(sent) == parts:
+            raise KeyboardInterrupt
+        sent.append(kwargs["upload_id"])
+        return create(**kwargs)
+    monkeypatch.setattr(client.uploads.parts, "create", flaky_create)
+    return create
+
+def test_upload_resumes_from_saved_parts(client, training_file, monkeypatch):
+    num_parts = (os.path.getsize(training_file) + 1023) // 1024
+    create = interrupt_after(client, monkeypatch, 2)
+    with pytest.raises(KeyboardInterrupt):
+        fine_tune.upload_training_file_multipart(training_file)
+
+    with open(training_file + ".upload.json") as f:
+        upload_id = json.load(f)["upload_id"]
+    monkeypatch.setattr(client.uploads.parts, "create", create)
+    assert fine_tune.upload_training_file_multipart(training_file)
+
+    # Only the missing parts were sent the second time, to the same upload
+    upload = benchmark.MockOpenAIHandler.uploads[upload_id]
+    assert upload["status"] == "completed"
+    assert len(upload["parts"]) == num_parts
+    assert upload["completed_parts"] == upload["parts"]
+    assert not os.path.exists(training_file + ".upload.json")
+
+def test_cancelled_upload_starts_over(client, training_file, monkeypatch):
+    create = interrupt_after(client, monkeypatch, 2)
+    with pytest.raises(KeyboardInterrupt):
+        fine_tune.upload_training_file_multipart(training_file)
+
+    with open(training_file + ".upload.json") as f:
+        stale_id = json.load(f)["upload_id"]
+    client.uploads.cancel(stale_id)
+    monkeypatch.setattr(client.uploads.parts, "create", create)
+    assert fine_tune.upload_training_file_multipart(training_file)
+
+    completed = [upload for upload in benchmark.MockOpenAIHandler.uploads.values() if upload["status"] == "completed"]
+    assert benchmark.MockOpenAIHandler.uploads[stale_id]["status"] == "cancelled"
+    assert completed and completed[-1]["completed_parts"] == completed[-1]["parts"]
+
+def test_events_are_paged(client, monkeypatch):
+    monkeypatch.setattr(benchmark.MockOpenAIHandler, "events_per_check", 150)
+    job_id = client.fine_tuning.jobs.create(training_file="file-0", model="gpt-4o-mini-2024-07-18").id
+    seen = set()
+
+    # 300 events between polls: more than one page of 100
+    client.fine_tuning.jobs.retrieve(job_id)
+    client.fine_tuning.jobs.retrieve(job_id)
+    assert fine_tune.print_new_events(job_id, seen) == 300
+    assert fine_tune.print_new_events(job_id, seen) == 0
+
+    client.fine_tuning.jobs.retrieve(job_id)
+    assert fine_tune.print_new_events(job_id, seen) == 150
+    assert len(seen) == 450
+
+def test_monitoring_sees_every_event(client, monkeypatch, capsys):
+    monkeypatch.setattr(benchmark.MockOpenAIHandler, "events_per_check", 120)
+    monkeypatch.setattr(fine_tune, "MIN_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(fine_tune, "MAX_POLL_SECONDS", 0.05)
+    job_id = client.fine_tuning.jobs.create(training_file="file-0", model="gpt-4o-mini-2024-07-18").id
+
+    assert fine_tune.check_fine_tuning_status(job_id, os.devnull) == "ft:gpt-4o-mini:bench"
+    steps = [line for line in capsys.readouterr().out.splitlines() if line.startswith("[")]
+    # Every event up to the last status check was printed once, oldest first
+    checks = benchmark.MockOpenAIHandler.job_polls
+    assert [line.rsplit(" ", 1)[1] for line in steps] == [str(i) for i in range(120 * (checks - 1))]
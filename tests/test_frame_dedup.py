@@ -0,0 +1,24 @@
+import json
+import cv2
+import numpy as np
+import frame_dedup
+import frame_quality
+import image_summarizer
+
+def test_rejected_frame_does_not_hide_its_group(tmp_path):
+    # Three near-identical frames, the first of which frame_quality rejected
+    folder = tmp_path / "extracted_frames"
+    folder.mkdir()
+    frame = np.random.default_rng(0).integers(0, 255, (90, 160, 3), dtype=np.uint8)
+    names = [f"2025-03-03_09-00-{second:02d}.jpg" for second in (0, 30, 59)]
+    for name in names:
+        cv2.imwrite(str(folder / name), frame)
+    with open(folder / frame_quality.MANIFEST_FILENAME, "w") as f:
+        json.dump({"thresholds": {}, "rejected": {names[0]: {"reasons": ["blurred"], "scores": {}}}, "substitutes": {}}, f)
+
+    manifest = frame_dedup.dedup_frames(str(folder))
+    assert manifest["groups"] == {names[1]: [names[2]]}
+
+    image_files, duplicates = image_summarizer.get_image_files(str(folder))
+    assert image_files == [names[1]]
+    assert duplicates == {names[1]: [names[2]]}
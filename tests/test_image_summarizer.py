@@ -0,0 +1,76 @@
+import time
+import asyncio
+import cv2
+import numpy as np
+import benchmark
+import response_cache
+import image_summarizer
+
+def write_frames(folder, count):
+    folder.mkdir()
+    rng = np.random.default_rng(0)
+    for i in range(count):
+        frame = rng.integers(0, 255, (90, 160, 3), dtype=np.uint8)
+        cv2.imwrite(str(folder / f"2025-03-03_09-{i // 60:02d}-{i % 60:02d}.jpg"), frame)
+    return str(folder)
+
+def test_throughput_scales_with_concurrency(tmp_path, mock_server, monkeypatch):
+    image_folder = write_frames(tmp_path / "extracted_frames", 24)
+    # Enough latency per request that waiting on the server, not local encoding, dominates
+    monkeypatch.setattr(benchmark.MockOpenAIHandler, "latency", 0.2)
+
+    frames_per_second = {}
+    for concurrency in (1, 4, 16):
+        # A fresh cache each time, so every frame is sent to the mock server again
+        monkeypatch.setattr(response_cache, "_cache", response_cache.ResponseCache(str(tmp_path / f"cache_{concurrency}.sqlite")))
+        start = time.perf_counter()
+        failed = asyncio.run(image_summarizer.process_images_async(image_folder, concurrency=concurrency,
+                                                                   requests_per_minute=100000, tokens_per_minute=100000000))
+        frames_per_second[concurrency] = 24 / (time.perf_counter() - start)
+        assert failed == 0
+
+    assert frames_per_second[1] < frames_per_second[4] < frames_per_second[16]
+    # With 200ms of server latency, 4 requests in flight should be well over twice as fast as one
+    assert frames_per_second[4] > 2 * frames_per_second[1]
+
+def test_limiter_waiters_do_not_queue_behind_a_sleeper():
+    async def run():
+        limiter = image_summarizer.TokenBucketLimiter(requests_per_minute=60, tokens_per_minute=1000000)
+        limiter.available["requests"] = 0
+        # This waiter needs a second of request budget; a small one should still get through as soon as it is refunded
+        slow = asyncio.create_task(limiter.acquire(10))
+        await asyncio.sleep(0.01)
+        limiter.available["requests"] = 1
+        start = time.perf_counter()
+        await asyncio.wait_for(limiter.acquire(10), timeout=0.5)
+        slow.cancel()
+        return time.perf_counter() - start
+
+    assert asyncio.run(run()) < 0.1
+
+def test_failed_requests_refund_their_tokens(mock_server, fresh_cache, monkeypatch):
+    # Every request is refused; the tokens reserved for it must go back to the bucket
+    monkeypatch.setattr(benchmark.MockOpenAIHandler, "rate_limit_fraction", 1.0)
+    limiter = image_summarizer.TokenBucketLimiter(100, 10000)
+    messages = [{"role": "user", "content": "Describe nothing."}]
+
+    async def run():
+        return await image_summarizer.summarize_messages_async(messages, "refund", limiter, max_retries=1)
+
+    assert asyncio.run(run()) == "Error generating summary"
+    limiter._refill()
+    assert limiter.available["tokens"] == limiter.capacity["tokens"]
+
+def test_cached_frames_are_not_counted_as_sent(tmp_path, mock_server, fresh_cache, monkeypatch):
+    image_folder = write_frames(tmp_path / "extracted_frames", 3)
+    monkeypatch.setattr(image_summarizer, "payload_stats", dict.fromkeys(image_summarizer.payload_stats, 0))
+    monkeypatch.setattr(image_summarizer, "REQUEST_DELAY_SECONDS", 0)
+
+    image_summarizer.process_images(image_folder)
+    sent = dict(image_summarizer.payload_stats)
+    assert sent["images"] == 3
+
+    # The rerun is answered from the cache, so no payload was sent and nothing was saved
+    image_summarizer.process_images(image_folder)
+    assert image_summarizer.payload_stats == sent
+    assert not image_summarizer._pending_payloads
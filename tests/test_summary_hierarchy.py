@@ -0,0 +1,30 @@
+import asyncio
+import pytest
+import benchmark
+import summary_hierarchy
+from datetime import datetime
+
+TEXTS = ["Keegan is writing code.", "Keegan is reading email."]
+TIMESTAMPS = [datetime(2025, 3, 3, 9, 0), datetime(2025, 3, 3, 9, 1)]
+
+def summarize_sync():
+    return summary_hierarchy.summarize_text(TEXTS, TIMESTAMPS, "ten_minute")
+
+def summarize_async():
+    stats = {"calls": 0, "api_seconds": 0.0}
+    async def run():
+        return await summary_hierarchy.summarize_text_async(TEXTS, TIMESTAMPS, "ten_minute", asyncio.Semaphore(1), stats)
+    return asyncio.run(run())
+
+@pytest.mark.parametrize("summarize", [summarize_sync, summarize_async])
+def test_only_complete_summaries_are_cached(mock_server, fresh_cache, monkeypatch, summarize):
+    # A reply cut off at max_tokens is returned but asked for again next time
+    monkeypatch.setattr(benchmark.MockOpenAIHandler, "finish_reason", "length")
+    summarize()
+    summarize()
+    assert benchmark.MockOpenAIHandler.stats["requests"] == 2
+
+    monkeypatch.setattr(benchmark.MockOpenAIHandler, "finish_reason", "stop")
+    summarize()
+    summarize()
+    assert benchmark.MockOpenAIHandler.stats["requests"] == 3
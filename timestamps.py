@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta
+
+# Timestamps are stored as whole seconds since this (naive, local-time) epoch
+EPOCH = datetime(1970, 1, 1)
+
+def to_seconds(timestamp):
+    return int((timestamp - EPOCH).total_seconds())
+
+def from_seconds(seconds):
+    return EPOCH + timedelta(seconds=int(seconds))
+
+# Function to parse a "%Y-%m-%d_%H-%M-%S" filename stem without going through strptime
+def parse_timestamp(stem):
+    """Returns the datetime encoded in a frame or summary filename stem, or None if it isn't a timestamp."""
+    if len(stem) != 19 or stem[4] != "-" or stem[10] != "_":
+        return None
+    try:
+        return datetime(int(stem[0:4]), int(stem[5:7]), int(stem[8:10]), int(stem[11:13]), int(stem[14:16]), int(stem[17:19]))
+    except ValueError:
+        return None
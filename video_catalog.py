@@ -0,0 +1,155 @@
+import os
+import time
+import struct
+import sqlite3
+import threading
+import cv2
+
+# Default catalog location (override with the KEEGANGPT_CATALOG environment variable)
+CATALOG_PATH = os.getenv("KEEGANGPT_CATALOG", os.path.join(os.path.expanduser("~"), ".cache", "keegangpt", "video_catalog.sqlite"))
+
+VIDEO_EXTENSIONS = (".mp4",)
+
+# Seconds between the MP4 epoch (1904-01-01 UTC) and the Unix epoch
+MP4_EPOCH_OFFSET = 2082844800
+
+def _iter_boxes(f, start, end):
+    """Yields (type, payload start, end) for the MP4 boxes between `start` and `end`, seeking past their contents."""
+    position = start
+    while position + 8 <= end:
+        f.seek(position)
+        size, box_type = struct.unpack(">I4s", f.read(8))
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - position
+        if size < header_size:
+            return
+        yield box_type, position + header_size, position + size
+        position += size
+
+# Function to read the recording start time from the container
+def read_mp4_creation_time(video_path):
+    """Returns the creation time stored in the MP4 movie header (moov/mvhd) as a Unix timestamp, or None."""
+    try:
+        with open(video_path, "rb") as f:
+            file_size = os.fstat(f.fileno()).st_size
+            for box_type, start, end in _iter_boxes(f, 0, file_size):
+                if box_type != b"moov":
+                    continue
+                for child_type, child_start, _ in _iter_boxes(f, start, end):
+                    if child_type == b"mvhd":
+                        f.seek(child_start)
+                        version = f.read(4)[0]  # Version byte, then 3 bytes of flags
+                        seconds = int.from_bytes(f.read(8 if version == 1 else 4), "big")
+                        return seconds - MP4_EPOCH_OFFSET if seconds > MP4_EPOCH_OFFSET else None
+                return None
+    except (OSError, struct.error, IndexError):
+        return None
+    return None
+
+# Function to read everything the pipeline needs to know about a video, once
+def probe_video(video_path, stat_result):
+    """Returns (created_at, fps, frame_count, duration) for a video.
+
+    The start time comes from the container metadata, then the file's birth time where the filesystem has one
+    (macOS), then its modification time minus the duration (the recording ends when the file is last written).
+    """
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    duration = frame_count / fps if fps else 0.0
+
+    created_at = read_mp4_creation_time(video_path)
+    if created_at is None:
+        created_at = getattr(stat_result, "st_birthtime", None)
+    if created_at is None:
+        created_at = stat_result.st_mtime - duration
+    return created_at, fps, frame_count, duration
+
+class VideoCatalog:
+    """Persistent SQLite record of every video's fingerprint, metadata and extraction status."""
+
+    def __init__(self, path=CATALOG_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.pid = os.getpid()
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            "path TEXT PRIMARY KEY, directory TEXT NOT NULL, size INTEGER NOT NULL, mtime REAL NOT NULL, "
+            "created_at REAL NOT NULL, fps REAL, frame_count INTEGER, duration REAL, "
+            "status TEXT NOT NULL DEFAULT 'new', interval_seconds INTEGER, mode TEXT, frames_saved INTEGER, extracted_at REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS videos_directory ON videos (directory, created_at)")
+        self.conn.commit()
+
+    def refresh(self, directory):
+        """Brings a directory's entries up to date and returns its video paths in recording order.
+
+        Only videos that are new or whose size/mtime changed are opened; everything else comes from the catalog.
+        """
+        directory = os.path.abspath(directory)
+        stored = {row[0]: (row[1], row[2]) for row in self.conn.execute(
+            "SELECT path, size, mtime FROM videos WHERE directory = ?", (directory,))}
+
+        seen = set()
+        with self.conn:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if not entry.name.lower().endswith(VIDEO_EXTENSIONS) or not entry.is_file():
+                        continue
+                    stat_result = entry.stat()
+                    seen.add(entry.path)
+                    if stored.get(entry.path) == (stat_result.st_size, stat_result.st_mtime):
+                        continue
+
+                    # New or changed video: probe it and reset its extraction status
+                    created_at, fps, frame_count, duration = probe_video(entry.path, stat_result)
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO videos (path, directory, size, mtime, created_at, fps, frame_count, duration, status) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'new')",
+                        (entry.path, directory, stat_result.st_size, stat_result.st_mtime, created_at, fps, frame_count, duration)
+                    )
+
+            self.conn.executemany("DELETE FROM videos WHERE path = ?", [(path,) for path in stored.keys() - seen])
+
+        return [row[0] for row in self.conn.execute(
+            "SELECT path FROM videos WHERE directory = ? ORDER BY created_at, path", (directory,))]
+
+    def get(self, video_path):
+        """Returns the catalog row for a video as a dict, or None if it hasn't been catalogued."""
+        cursor = self.conn.execute("SELECT * FROM videos WHERE path = ?", (os.path.abspath(video_path),))
+        row = cursor.fetchone()
+        return dict(zip([column[0] for column in cursor.description], row)) if row else None
+
+    def is_extracted(self, video_path, interval_seconds):
+        """True if the video was fully extracted at this interval since it last changed."""
+        row = self.get(video_path)
+        return bool(row) and row["status"] == "done" and row["interval_seconds"] == interval_seconds
+
+    def mark(self, video_path, status, interval_seconds=None, mode=None, frames_saved=None):
+        """Records the outcome of an extraction ("done" or "failed")."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE videos SET status = ?, interval_seconds = ?, mode = ?, frames_saved = ?, extracted_at = ? WHERE path = ?",
+                (status, interval_seconds, mode, frames_saved, time.time(), os.path.abspath(video_path))
+            )
+
+    def close(self):
+        self.conn.close()
+
+# SQLite connections can't be shared between threads, so each thread keeps its own
+_local = threading.local()
+
+# Function to get the shared catalog, opening it on first use
+def get_catalog():
+    """Returns this thread's VideoCatalog (other threads and worker processes open their own connection)."""
+    catalog = getattr(_local, "catalog", None)
+    if catalog is None or catalog.pid != os.getpid():
+        catalog = _local.catalog = VideoCatalog()
+    return catalog